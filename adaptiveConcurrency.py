@@ -0,0 +1,155 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+"""
+AIMD concurrency limit for queries to Ollama.
+
+How many prompts the server can take at once depends on the model, the GPU
+memory and OLLAMA_NUM_PARALLEL, none of which the client can see. Instead
+the limiter watches each query: while latency per generated token, leaving
+out the prompt evaluation Ollama reports, stays near the best seen, the limit grows by one per round of completions (additive
+increase). When latency climbs because requests are queueing on the server,
+the limit shrinks by DECREASEFACTOR, and an error halves it (multiplicative
+decrease). Only queries sent after the last decrease can trigger another,
+so a burst of slow responses that were all sent at the old limit counts once.
+"""
+
+# Standard Libraries
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCYTOLERANCE = 2.0      # Slower than this many times the baseline is queueing
+DECREASEFACTOR = 0.75       # Limit multiplier when latency says we are queueing
+ERRORFACTOR = 0.5           # Limit multiplier on a failed query
+BASELINEDECAY = 1.01        # Baseline drifts up 1% per sample so it can recover
+
+
+class AdaptiveLimiter:
+    """
+    Blocking concurrency limit adjusted from per query latency and errors.
+    Use slot() around each query.
+    """
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 64):
+        self.limit: float = float(initial)
+        self.minimum: int = minimum
+        self.maximum: int = maximum
+        self.inFlight: int = 0
+        self.baseline: float = None
+        self.issued: int = 0
+        self.decreaseMark: int = 0
+        self.decreases: int = 0
+        self.peak: float = self.limit
+        self.condition = threading.Condition()
+
+    def setMaximum(self, maximum: int) -> None:
+        with self.condition:
+            self.maximum = maximum
+            self.limit = min(self.limit, float(maximum))
+            self.condition.notify_all()
+
+    def currentLimit(self) -> int:
+        return max(self.minimum, int(self.limit))
+
+    def acquire(self) -> int:
+        """
+        Wait for a free slot. Returns the query's ticket for release.
+        """
+        with self.condition:
+            while self.inFlight >= self.currentLimit():
+                self.condition.wait()
+            self.inFlight += 1
+            self.issued += 1
+            return self.issued
+
+    def release(self, seconds: float, tokens: int = 0, ok: bool = True,
+                ticket: int = None, promptSeconds: float = 0.0) -> None:
+        """
+        Finish a query that took seconds and generated tokens, ok False when
+        it failed. promptSeconds is the part the server spent loading the
+        model and evaluating the prompt, a fixed cost per query that would
+        make every short answer look slow. The rest is compared per
+        generated token when known, since long answers are slow without
+        anything queueing, and what queueing adds stays in it.
+        """
+        with self.condition:
+            self.inFlight -= 1
+            if ticket is None:
+                ticket = self.issued
+            canDecrease = ticket > self.decreaseMark
+
+            if not ok:
+                if canDecrease:
+                    self.decrease(ERRORFACTOR)
+            else:
+                seconds = max(0.0, seconds - promptSeconds)
+                latency = seconds / tokens if tokens else seconds
+                if self.baseline is None or latency < self.baseline:
+                    self.baseline = latency
+                else:
+                    self.baseline *= BASELINEDECAY
+                if latency > self.baseline * LATENCYTOLERANCE:
+                    if canDecrease:
+                        self.decrease(DECREASEFACTOR)
+                else:
+                    self.limit = min(self.maximum, self.limit + 1 / self.limit)
+                    self.peak = max(self.peak, self.limit)
+            self.condition.notify_all()
+
+    def decrease(self, factor: float) -> None:
+        self.limit = max(float(self.minimum), self.limit * factor)
+        self.decreaseMark = self.issued
+        self.decreases += 1
+
+    @contextmanager
+    def slot(self):
+        """
+        Hold one slot for the duration of a query. The body reports what it
+        generated, and the seconds the server spent on the prompt, with the
+        yielded record function, an exception counts as a failed query.
+        """
+        ticket = self.acquire()
+        start = time.perf_counter()
+        outcome: dict = {'tokens': 0, 'ok': True, 'promptSeconds': 0.0}
+
+        def record(tokens: int = 0, ok: bool = True, promptSeconds: float = 0.0):
+            outcome['tokens'] = tokens
+            outcome['ok'] = ok
+            outcome['promptSeconds'] = promptSeconds
+
+        try:
+            yield record
+        except BaseException:
+            outcome['ok'] = False
+            raise
+        finally:
+            self.release(time.perf_counter() - start, outcome['tokens'],
+                         outcome['ok'], ticket, outcome['promptSeconds'])
+
+    def asDict(self) -> dict:
+        with self.condition:
+            return {'limit': self.currentLimit(), 'peak': int(self.peak),
+                    'decreases': self.decreases, 'inFlight': self.inFlight}
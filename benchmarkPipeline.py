@@ -0,0 +1,121 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+"""
+Peak memory of promptFuncs against corpus size, with a stub in place of the
+model so only our side is measured. Each size runs in its own process since
+ru_maxrss only ever grows. "eager" holds every record and response at once
+like the old list based flow, "pipeline" streams windowed records through
+promptFuncs.
+
+    python benchmarkPipeline.py --sizes 1000 10000 50000
+"""
+
+# Standard Libraries
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+FUNCTIONBODY = "\tint total = 0;\n" + "\ttotal += a * b + %d;\n" * 20 + "\treturn total;\n"
+
+STUBRESPONSE = "/**\n * stub - stub\n" + " * - generated text\n" * 40 + " */"
+
+
+def writeCorpus(path: str, functions: int) -> None:
+    with open(path, 'w') as file:
+        for number in range(functions):
+            file.write(f"int func{number}(int a, int b)\n{{\n")
+            file.write(FUNCTIONBODY % tuple(range(20)))
+            file.write("}\n\n")
+
+
+def stubCallAI(prompt: str, code: str, verbose: bool, model: str = None,
+               budget: int = None) -> str:
+    return STUBRESPONSE + " " * (len(code) % 7)
+
+
+def child(path: str, mode: str, workers: int) -> None:
+    import lamacoopDocgen
+    from functionRecord import iterFunctionRecords, iterWindowedRecords
+
+    lamacoopDocgen.callAI = stubCallAI
+    lamacoopDocgen.prompt = "Document this function"
+    lamacoopDocgen.verbose = False
+    lamacoopDocgen.write = False
+    lamacoopDocgen.cascade = False
+    lamacoopDocgen.LIMITER.setMaximum(workers)
+
+    with open(path, 'r') as file:
+        code = file.read()
+    start = time.perf_counter()
+    if mode == 'eager':
+        funcs = list(iterFunctionRecords(code, path))
+        responses = [stubCallAI(lamacoopDocgen.generate(record, lamacoopDocgen.prompt),
+                                record.code, False) for record in funcs]
+        count = len(responses)
+    else:
+        sourceBytes = code.encode('utf8')
+        del code
+        count = lamacoopDocgen.promptFuncs(iterWindowedRecords(sourceBytes, path))
+    seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{count} {seconds:.2f} {peak:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='benchmarkPipeline',
+        description='Peak RSS of the documentation pipeline with a stub model')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 40000],
+                        help="Corpus sizes in functions")
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--child', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], args.child[1], args.workers)
+        return
+
+    print(f"{'functions':>10} {'source MB':>10} {'mode':>9} {'seconds':>8} {'peak MB':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            path = os.path.join(directory, f"corpus{size}.c")
+            writeCorpus(path, size)
+            sourceMB = os.path.getsize(path) / 2**20
+            for mode in ('eager', 'pipeline'):
+                output = subprocess.run(
+                    [sys.executable, __file__, '--child', path, mode,
+                     '--workers', str(args.workers)],
+                    check=True, capture_output=True, text=True).stdout.split()
+                count, seconds, peak = output[-3:]
+                print(f"{count:>10} {sourceMB:>10.1f} {mode:>9} {seconds:>8} {peak:>8}")
+
+
+if __name__ == "__main__":
+    main()
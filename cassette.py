@@ -0,0 +1,105 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+"""
+Record and replay of model queries. In record mode every chat request goes
+to Ollama as usual and the response is saved in the cassette directory under
+a hash of the model, the full message list and the options. In replay mode
+the saved response is served back and nothing touches the network, so tests,
+benchmarks and work on the later stages run offline and give the same
+output every time. A request that was never recorded fails with
+CassetteMiss.
+"""
+
+# Standard Libraries
+import hashlib
+import json
+import os
+import tempfile
+
+# Third-party Libraries
+from ollama import ChatResponse
+
+MODES: tuple = ('record', 'replay')
+
+
+class CassetteMiss(KeyError):
+    """
+    Replay found no recording for a request.
+    """
+
+
+def cassetteKey(model: str, messages: list, options: dict) -> str:
+    """
+    Hash identifying a request. Keys are sorted so dict order doesn't matter.
+    """
+    request = json.dumps({'model': model, 'messages': messages, 'options': options},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(request.encode('utf8')).hexdigest()
+
+
+class Cassette:
+    """
+    A directory of recorded responses, one JSON file per request.
+    """
+
+    def __init__(self, directory: str, mode: str):
+        if mode not in MODES:
+            raise ValueError(f"cassette mode must be one of {MODES}, not {mode!r}")
+        self.directory = directory
+        self.mode = mode
+        if mode == 'record':
+            os.makedirs(directory, exist_ok=True)
+        elif not os.path.isdir(directory):
+            # A mistyped path would otherwise just miss on every query
+            raise FileNotFoundError(f"no cassette to replay at {directory}")
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".json")
+
+    def chat(self, getClient, model: str, messages: list, options: dict,
+             **kwargs) -> ChatResponse:
+        """
+        Answer a chat request. getClient returns the ollama Client and is
+        only called when recording, so replay never builds one.
+        """
+        key = cassetteKey(model, messages, options)
+        if self.mode == 'replay':
+            try:
+                with open(self.path(key), 'r') as file:
+                    return ChatResponse.model_validate(json.load(file)['response'])
+            except FileNotFoundError:
+                raise CassetteMiss(f"no recording of {key} in {self.directory}") from None
+
+        response: ChatResponse = getClient().chat(model=model, messages=messages,
+                                                  options=options, **kwargs)
+        entry: dict = {'model': model, 'prompt': messages[-1]['content'] if messages else "",
+                       'options': options, 'response': response.model_dump(mode='json')}
+        # Write then rename, so a parallel replay never sees half a file
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(handle, 'w') as file:
+            json.dump(entry, file, indent=2, ensure_ascii=False)
+        os.replace(temporary, self.path(key))
+        return response
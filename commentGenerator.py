@@ -27,9 +27,10 @@
 import shutil
 import os
 import re
-from itertools import pairwise
+from itertools import pairwise, zip_longest
 import argparse
 import hashlib
+from bisect import bisect_right
 
 #Third-Party Libraries
 from tree_sitter import Language, Parser, Query
@@ -38,6 +39,28 @@ import tree_sitter_c
 
 # Local Libraries
 from lamacoopDocgen import removeComments
+from functionRecord import parseCode, C_LANGUAGE
+from profiling import span, startProfiling, stopProfiling
+
+# Most the parser reads from spliceComments' pieces in one callback
+READCHUNK = 4096
+
+# Queries are compiled once at import rather than on every lookup
+DEFINITIONQUERY = Query(
+    C_LANGUAGE,
+    """
+    (function_definition
+    declarator: (_)*  @function_definition)
+    """,
+)
+
+NAMEQUERY = Query(
+    C_LANGUAGE,
+    """
+    (function_declarator
+    declarator: (identifier) @name)
+    """,
+)
 
 '''
 This function uses a Tree Sitter query to grab the complete function definition
@@ -66,25 +89,11 @@ code with all other occurances ignored.
 ''' 
 
 def functionDefinition(code: str) -> str:
-    # Build and load the C grammar
-    C_LANGUAGE = Language(tree_sitter_c.language())
-
-    parser = Parser(C_LANGUAGE)
-
     # Parse the input C code
     source_bytes = code.encode('utf8')
-    tree = parser.parse(source_bytes)
-    root_node = tree.root_node
-
-    query = Query(
-        C_LANGUAGE,
-        """
-        (function_definition
-        declarator: (_)*  @function_definition)
-        """,
-    )
-
-    captures = query.captures(tree.root_node)
+    tree = parseCode(source_bytes)
+
+    captures = DEFINITIONQUERY.captures(tree.root_node)
     try:
         return str(captures["function_definition"][0].text.decode('utf8'))
     except KeyError:
@@ -110,25 +119,11 @@ tree sitter api, in this case the identifier specifies the functions name
 as we intend and the declarator acts as the definition as shown above.
 '''
 def functionName(functionDefinition:str) -> str:
-    # Build and load the C grammar
-    C_LANGUAGE = Language(tree_sitter_c.language())
-
-    parser = Parser(C_LANGUAGE)
-
     # Parse the input C code
     source_bytes = functionDefinition.encode('utf8')
-    tree = parser.parse(source_bytes)
-    root_node = tree.root_node
-
-    query = Query(
-        C_LANGUAGE,
-        """
-        (function_declarator
-        declarator: (identifier) @name)
-        """,
-    )
-    
-    captures = query.captures(tree.root_node)
+    tree = parseCode(source_bytes)
+
+    captures = NAMEQUERY.captures(tree.root_node)
     try:
         return str(captures["name"][0].text.decode('utf8'))
     except KeyError:
@@ -241,6 +236,18 @@ as this is where comment blocks are placed in the Linux Kernel
 difficult to resolve why a function was not placed within a given file
 '''
 def writeCacheToFile(lineCache: list, fileName: str):
+    commentText = loadComment(lineCache, fileName)
+    with open("result/" + fileName, 'a') as commentFile:
+        commentFile.write(commentText) 
+        for line in lineCache:
+            commentFile.write(line)
+        commentFile.close()
+
+'''
+    The lookup half of writeCacheToFile, returns the verified comment block
+for the function in lineCache or "" when there is none.
+'''
+def loadComment(lineCache: list, fileName: str) -> str:
     code = ""
     for line in lineCache:
         code = code + line.replace("\n", "").strip()
@@ -259,86 +266,294 @@ def writeCacheToFile(lineCache: list, fileName: str):
         commentText = ""
     except KeyError:
         commentText = ""
-    with open("result/" + fileName, 'a') as commentFile:
-        commentFile.write(commentText) 
-        for line in lineCache:
-            commentFile.write(line)
-        commentFile.close()
+    return commentText
 
 '''
-    This function acts as the main code for the program, taking all of the
-above steps and producing a new file which then can be patched with
-git diff --no-index ./source/ftrace.c ./result/ftrace.c > ftracedoc.patch
+    Walks source/<fileName> line by line the same way parse always has and
+yields an insertion (lineIndex, commentText) for every function that has a
+comment block, lineIndex being the 0 based line the comment goes in front of.
 
     The purpose of the lineCache is to fix the issue introduced by line
 by line parsing, a function cannot be easily identified in a single line
 therefore a list of subsequent lines is used for identification
 '''
-def parse(fileName: str):
-    with open("source/" + fileName, 'r') as file:
-        code = file.read()
-    functions: list = extractFunctions(code)
-    firstLines: list = [] 
+def findInsertions(fileName: str, lines: list = None):
+    if lines is None:
+        with open("source/" + fileName, 'r') as file:
+            lines = file.readlines()
+    functions: list = extractFunctions("".join(lines))
+    firstLines: set = set()
     lineCache: list = []
+    cacheStart: int = 0
     caching: bool = False
 
     for function in functions:
-        firstLines.append(extractFirstLine(function))
+        firstLines.add(extractFirstLine(function))
+
+    for index, line in enumerate(lines):
+
+        '''
+          We check to see if a line contains a } as this may be the end 
+          of a function, but only if the braces match
+        '''
+        if caching and "}" in line:
+            lineCache.append(line)
+            if numForwardBracket(lineCache) == numBackwardBracket(lineCache):
+                commentText = loadComment(lineCache, fileName)
+                if commentText:
+                    yield cacheStart, commentText
+                lineCache.clear()
+                caching = False
+            continue
+
+        '''
+        We have found a flag of a potential function, which then goes under
+        review with the cache and loadComment
+        '''
+        if line.strip() in firstLines and len(lineCache) == 0:
+            lineCache.append(line)
+            cacheStart = index
+            caching = True
+            continue
+
+        if caching:
+            lineCache.append(line)
 
+'''
+    This function acts as the main code for the program, taking all of the
+above steps and producing a new file which then can be patched with
+git diff --no-index ./source/ftrace.c ./result/ftrace.c > ftracedoc.patch
+
+    writePatch produces the same patch straight from the insertions without
+writing result/ at all.
+
+    Returns the line numbers of comments that were left out because they
+would have changed the structure of the file, see spliceComments.
+'''
+def parse(fileName: str) -> list:
     with open("source/" + fileName, 'r') as file:
-        # opens ftrace.c and splits by line
-        for line in file:
-
-            '''
-              We check to see if a line contains a } as this may be the end 
-              of a function, but only if the braces match
-            '''
-            if caching and "}" in line:
-                lineCache.append(line)
-                if numForwardBracket(lineCache) == numBackwardBracket(lineCache):
-                    writeCacheToFile(lineCache, fileName)
-                    lineCache.clear()
-                    caching = False
-                    continue
-                continue
-
-            '''
-            We have found a flag of a potential function, which then goes under
-            review with the cache and writeCacheToFile
-            '''
-            if line.strip() in firstLines:
-                if len(lineCache) == 0:
-                    lineCache.append(line)
-                    caching = True
-                    continue
-
-            if caching:
-                lineCache.append(line)
-            if not caching:
-                with open("result/" + fileName, 'a') as commentFile:
-                    commentFile.write(line)
-    
-    # TODO: This should be in the scope of main. Ran out of time. 
-    try:
-        assert(verifyCommentedFile(fileName, removeComments(str(code))))
-    except AssertionError:
-        print(f"Error verifying AI genned file. See file for any errors when assembling together.")
+        lines = file.readlines()
+    insertions: list = sorted(findInsertions(fileName, lines))
+
+    with span('splice', file=fileName, comments=len(insertions)):
+        pieces, rejected = spliceComments(lines, insertions)
+    with span('write', file=fileName), open("result/" + fileName, 'wb') as commentFile:
+        for piece in pieces:
+            commentFile.write(piece)
+
+    for index in rejected:
+        print(f"Error verifying AI genned comment for source/{fileName}:{index + 1}, left it out")
+    return [index + 1 for index in rejected]
+
+'''
+    Applies the insertions (lineIndex, commentText), sorted by line, to the
+source one at a time. Each insertion is a Tree.edit on the current tree
+followed by an incremental reparse, and is kept only if every range
+tree-sitter reports as changed lies inside the inserted text and that text
+parses as a comment. That means no new ERROR nodes and the same set of
+functions, checked at a cost that scales with the comment and not the file.
+
+    The commented file is never joined into one string, it is kept as a list
+of byte pieces (original slices and comments) that the parser reads through
+a callback and the caller writes out in order.
+
+    Returns the pieces and the line indexes of rejected insertions.
+'''
+def spliceComments(lines: list, insertions: list) -> tuple:
+    source: bytes = "".join(lines).encode('utf8')
+    lineStarts: list = [0]
+    for line in lines:
+        lineStarts.append(lineStarts[-1] + len(line.encode('utf8')))
+
+    pieces: list = [source] if source else []
+    starts: list = [0] if source else []
+
+    def read(offset: int, point) -> bytes:
+        piece = bisect_right(starts, offset) - 1
+        if piece < 0:
+            return b""
+        offset -= starts[piece]
+        return pieces[piece][offset:offset + READCHUNK]
+
+    tree = parseCode(read)
+    insertedBytes: int = 0
+    insertedRows: int = 0
+    rejected: list = []
+
+    for index, commentText in insertions:
+        comment: bytes = commentText.encode('utf8')
+        position: int = lineStarts[index] + insertedBytes
+        row: int = index + insertedRows
+        newRows: int = comment.count(b"\n")
+        if newRows:
+            endPoint = (row + newRows, len(comment) - comment.rfind(b"\n") - 1)
+        else:
+            endPoint = (row, len(comment))
+
+        # Insertions are sorted, so the split always lands in the last piece
+        lastPiece, lastStart = pieces.pop(), starts.pop()
+        cut = position - lastStart
+        for piece in (lastPiece[:cut], comment, lastPiece[cut:]):
+            if piece:
+                starts.append(starts[-1] + len(pieces[-1]) if pieces else 0)
+                pieces.append(piece)
+
+        tree.edit(start_byte=position, old_end_byte=position,
+                  new_end_byte=position + len(comment),
+                  start_point=(row, 0), old_end_point=(row, 0),
+                  new_end_point=endPoint)
+        newTree = parseCode(read, tree)
+
+        end: int = position + len(comment)
+        valid = all(position <= r.start_byte and r.end_byte <= end
+                    for r in tree.changed_ranges(newTree))
+        if valid:
+            leading = len(comment) - len(comment.lstrip())
+            node = newTree.root_node.descendant_for_byte_range(
+                position + leading, position + len(comment.rstrip()))
+            valid = node is not None and node.type == 'comment'
+
+        if valid:
+            tree = newTree
+            insertedBytes += len(comment)
+            insertedRows += newRows
+        else:
+            # Put the pieces back the way they were and undo the edit the same
+            # incremental way, rather than reparsing the whole file
+            while pieces and starts[-1] >= lastStart:
+                pieces.pop()
+                starts.pop()
+            pieces.append(lastPiece)
+            starts.append(lastStart)
+            newTree.edit(start_byte=position, old_end_byte=end,
+                         new_end_byte=position, start_point=(row, 0),
+                         old_end_point=endPoint, new_end_point=(row, 0))
+            tree = parseCode(read, newTree)
+            rejected.append(index)
+
+    return pieces, rejected
+
+'''
+    Streams a git style unified diff for one file to out, built from the
+insertion list instead of a copy of the commented file. Paths are relative
+to source/, so the patch applies with git apply from inside the source tree.
+Insertions closer than twice the context are merged into one hunk.
+
+    The insertions go through spliceComments first and the ones it rejects
+are left out, so the patch never holds a comment that parse would refuse.
+Returns how many comments the patch adds.
+'''
+def writePatch(fileName: str, out, context: int = 3) -> int:
+    with open("source/" + fileName, 'r') as file:
+        lines = file.readlines()
+    insertions: list = sorted(findInsertions(fileName, lines))
+    with span('splice', file=fileName, comments=len(insertions)):
+        _, rejected = spliceComments(lines, insertions)
+    for index in rejected:
+        print(f"Error verifying AI genned comment for source/{fileName}:{index + 1}, left it out")
+    rejected = set(rejected)
+    insertions = [insertion for insertion in insertions if insertion[0] not in rejected]
+    if not insertions:
+        return 0
+
+    out.write(f"diff --git a/{fileName} b/{fileName}\n")
+    out.write(f"--- a/{fileName}\n+++ b/{fileName}\n")
+
+    offset: int = 0
+    current: int = 0
+    while current < len(insertions):
+        # Grow the hunk while the next insertion's context overlaps it
+        last = current
+        while (last + 1 < len(insertions) and
+               insertions[last + 1][0] - context <= insertions[last][0] + context):
+            last += 1
+        hunk: list = insertions[current:last + 1]
+        start = max(0, hunk[0][0] - context)
+        end = min(len(lines), hunk[-1][0] + context)
+        added: dict = {index: text.splitlines(keepends=True) for index, text in hunk}
+        numAdded = sum(len(text) for text in added.values())
+
+        out.write(f"@@ -{start + 1},{end - start} "
+                  f"+{start + 1 + offset},{end - start + numAdded} @@\n")
+        for index in range(start, end):
+            for commentLine in added.get(index, []):
+                out.write("+" + commentLine)
+            out.write(" " + lines[index])
+            if not lines[index].endswith("\n"):
+                out.write("\n\\ No newline at end of file\n")
+        offset += numAdded
+        current = last + 1
+    return len(insertions)
 
 def verifyCommentedFile(fileName : str, codeInMem : str) -> bool:
     """
         Verifies that the new file created from docGen does not change program functionality
+
+        Walks the tree-sitter leaves of codeInMem and of result/<fileName>
+        side by side, skipping comments and ignoring whitespace, and stops at
+        the first token that differs. codeInMem is the original source as
+        it is, comments and all. Both sides lose their comments the same
+        way, by tree-sitter, where removeComments would also eat "//..."
+        inside string literals such as "http://example.com".
     """
 
-    with open(f"result/{fileName}", 'r') as file:
+    with open(f"result/{fileName}", 'rb') as file:
         generatedFile = file.read()
-    generatedFile= removeComments(generatedFile)
-    
-    generatedFile = ''.join(generatedFile.split())
-    codeInMem = ''.join(codeInMem.split())
 
-    # print(f"Code in Memory: {codeInMem[10:]}\nCode in Generated File: {generatedFile[10:]}")
+    divergence = firstDivergence(codeInMem.encode('utf8'), generatedFile)
+    if divergence is None:
+        return True
+    line, column, expected, found = divergence
+    print(f"result/{fileName}:{line}:{column}: expected {expected!r} found {found!r}")
+    return False
 
-    return codeInMem == generatedFile
+'''
+    Yields the leaf nodes of a tree in source order, skipping comments. The
+cursor walk keeps no per-node state so memory does not grow with the file.
+'''
+def iterLeaves(tree):
+    cursor = tree.walk()
+    while True:
+        if cursor.goto_first_child():
+            continue
+        if cursor.node.type != 'comment':
+            yield cursor.node
+        while not cursor.goto_next_sibling():
+            if not cursor.goto_parent():
+                return
+
+'''
+    Leaf text as compared by firstDivergence, whitespace is dropped and macro
+bodies lose their comments since tree-sitter keeps // comments inside them.
+'''
+def leafText(node) -> bytes:
+    text: bytes = node.text
+    if node.type == 'preproc_arg':
+        text = removeComments(text.decode('utf8', 'replace')).encode('utf8')
+    return b"".join(text.split())
+
+'''
+    Compares the token streams of two sources and returns None when they only
+differ by comments and whitespace. Otherwise returns the 1 based line and
+column in generated of the first differing token along with the expected and
+found text.
+'''
+def firstDivergence(original: bytes, generated: bytes):
+    originalLeaves = iterLeaves(parseCode(original))
+    generatedLeaves = iterLeaves(parseCode(generated))
+    for expected, found in zip_longest(originalLeaves, generatedLeaves):
+        if (expected is not None and found is not None
+                and expected.type == found.type
+                and leafText(expected) == leafText(found)):
+            continue
+        if found is None:
+            line, column = generated.count(b"\n") + 1, 1
+        else:
+            line, column = found.start_point[0] + 1, found.start_point[1] + 1
+        return (line, column,
+                expected.text.decode('utf8', 'replace') if expected else "<end of file>",
+                found.text.decode('utf8', 'replace') if found else "<end of file>")
+    return None
 
 
 def main():
@@ -348,14 +563,61 @@ def main():
         epilog='')
 
 
-    parser.add_argument('filename')           # The file you want to chunk
+    parser.add_argument('filename', nargs='+') # The files you want to comment
+
+    parser.add_argument(
+        '-p',
+        '--patch',
+        help="Write one patch for all files here instead of filling result/")
+
+    parser.add_argument(
+        '--patchdir',
+        help="Write a patch series here instead of filling result/, one per file")
+
+    parser.add_argument(
+        '--bysubsystem',
+        action='store_true',
+        help="With --patchdir, one patch per directory instead of per file")
+
+    parser.add_argument(
+        '--profile',
+        help="Write a cProfile report and a Chrome trace of the splicing to this directory")
     args = parser.parse_args()
 
-    fileName = args.filename
-    with open("result/" + fileName, 'w') as file:
-        file.write("")
-        file.close()
-    parse(str(fileName))
+    if args.profile:
+        startProfiling()
+    try:
+        commentFiles(args)
+    finally:
+        if args.profile:
+            for path in stopProfiling(args.profile):
+                print("Profile written to", path)
+
+def commentFiles(args) -> None:
+    if args.patch:
+        with open(args.patch, 'w') as out:
+            for fileName in args.filename:
+                writePatch(fileName, out)
+        return
+
+    if args.patchdir:
+        os.makedirs(args.patchdir, exist_ok=True)
+        groups: dict = {}
+        for fileName in args.filename:
+            group = os.path.dirname(fileName) if args.bysubsystem else fileName
+            groups.setdefault(group or "toplevel", []).append(fileName)
+        for number, group in enumerate(sorted(groups), start=1):
+            patchName = f"{number:04}-" + group.replace("/", "-") + ".patch"
+            with open(os.path.join(args.patchdir, patchName), 'w') as out:
+                for fileName in groups[group]:
+                    writePatch(fileName, out)
+        return
+
+    for fileName in args.filename:
+        with open("result/" + fileName, 'w') as file:
+            file.write("")
+            file.close()
+        parse(str(fileName))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,188 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+"""
+Local repair of responses that fail validation for mechanical reasons: a
+missing opener or closer, prose or code fences around the block, lines over
+80 columns, a title without the function name or a misspelled @param. The
+block is taken apart into items (title, tags, bullets, paragraphs), fixed
+against the FunctionRecord and rebuilt, which costs far less than asking the
+model again. Anything that isn't mechanical, such as an undocumented
+parameter, is left for a re-prompt.
+"""
+
+# Standard Libraries
+import difflib
+import re
+import textwrap
+
+# Local Libraries
+from functionRecord import FunctionRecord
+
+WIDTH = 80
+
+TAGPATTERN = re.compile(r'@(\w+)\s*:')
+TITLEPATTERN = re.compile(r'^([\w$]+)(\(\))?\s+-\s*')
+ITEMSTART = re.compile(r'^(@\w+\s*:|-\s|\d+[.)]\s|[A-Z][\w\' ]*:\s*$|Returns?\b|Return value\b|Context:)')
+
+
+def blockLines(text: str) -> list:
+    """
+    The text lines of the comment in a response, without the opener, the
+    closer and the leading "*" of each line. Prose before the opener and
+    anything after the closer is dropped. Without an opener the block starts
+    at the first line that begins with "*".
+    """
+    lines: list = text.replace("\r", "").split("\n")
+    start = next((i for i, line in enumerate(lines) if "/*" in line), None)
+    if start is None:
+        start = next((i for i, line in enumerate(lines) if line.strip().startswith("*")), None)
+        if start is None:
+            return []
+    else:
+        lines[start] = lines[start][lines[start].index("/*") + 2:]
+
+    content: list = []
+    for line in lines[start:]:
+        closed = "*/" in line
+        if closed:
+            line = line[:line.index("*/")]
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            if content:
+                break
+            continue
+        stripped = stripped.lstrip("*").strip()
+        content.append(stripped)
+        if closed:
+            break
+    while content and not content[0]:
+        content.pop(0)
+    while content and not content[-1]:
+        content.pop()
+    return content
+
+
+def blockItems(lines: list) -> list:
+    """
+    Group text lines into items, each the words of one title, tag, bullet
+    or paragraph, with blank lines kept as empty items.
+    """
+    items: list = []
+    for line in lines:
+        if not line:
+            if items and items[-1]:
+                items.append("")
+            continue
+        if not items or not items[-1] or ITEMSTART.match(line):
+            items.append(line)
+        else:
+            items[-1] = items[-1] + " " + line
+    return items
+
+
+def fixTitle(title: str, record: FunctionRecord) -> str:
+    """
+    Make the title start with "name - ", replacing a wrong name or adding one.
+    """
+    match = TITLEPATTERN.match(title)
+    if match:
+        if match.group(1) == record.name:
+            return title
+        return record.name + " - " + title[match.end():]
+    return record.name + " - " + title
+
+
+def fixTags(items: list, record: FunctionRecord) -> list:
+    """
+    Rename @tags that aren't parameters to the closest parameter that has no
+    tag of its own yet, leaving tags with no close match alone.
+    """
+    parameters: list = [p for p in record.parameterNames if p != "..."]
+    tagged: set = set()
+    for item in items:
+        match = TAGPATTERN.match(item)
+        if match and match.group(1) in parameters:
+            tagged.add(match.group(1))
+
+    fixed: list = []
+    for item in items:
+        match = TAGPATTERN.match(item)
+        if match and match.group(1) not in parameters:
+            untagged = [p for p in parameters if p not in tagged]
+            close = difflib.get_close_matches(match.group(1), untagged, n=1, cutoff=0.6)
+            if close:
+                tagged.add(close[0])
+                item = "@" + close[0] + item[match.end(1):]
+        fixed.append(item)
+    return fixed
+
+
+def wrapItem(item: str, width: int) -> list:
+    """
+    Wrap one item to fit " * " plus the text in width columns, continuation
+    lines indented under the text of a tag or bullet.
+    """
+    if len(item) + 3 <= width:
+        return [item]
+    indent = "  " if item.startswith(("@", "- ")) else ""
+    return textwrap.wrap(item, width - 3, subsequent_indent=indent,
+                         break_long_words=False, break_on_hyphens=False)
+
+
+def buildBlock(items: list, width: int = WIDTH) -> str:
+    lines: list = ["/**"]
+    for item in items:
+        if not item:
+            lines.append(" *")
+            continue
+        lines += [" * " + line for line in wrapItem(item, width)]
+    lines.append(" */")
+    return "\n".join(lines)
+
+
+def tooWide(text: str, width: int = WIDTH) -> bool:
+    """
+    Whether any line of text runs past width columns, tabs at 8.
+    """
+    return any(len(line.expandtabs()) > width for line in text.split("\n"))
+
+
+def repairComment(text: str, record: FunctionRecord = None, width: int = WIDTH) -> str:
+    """
+    Rebuild the comment in a response as a well formed "/** ... */" block
+    wrapped to width columns. With the function's record the title gets the
+    function name and misspelled @param tags are corrected. Returns None
+    when the response holds no comment text at all.
+    """
+    if not text:
+        return None
+    items: list = blockItems(blockLines(text))
+    if not items:
+        return None
+    if record is not None:
+        items[0] = fixTitle(items[0], record)
+        items = fixTags(items, record)
+    return buildBlock(items, width)
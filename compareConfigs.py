@@ -0,0 +1,222 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+"""
+A/B comparison of models and settings on a fixed corpus. Every
+configuration documents the same functions, against a live endpoint or a
+cassette (see cassette.py), and the results are printed side by side:
+functions per second, tokens per function, p50/p95 latency per function and
+the share of comments that pass the verifyAIOutput checks. Pick the fastest
+configuration that still meets the quality bar.
+
+Configurations come from a YAML file:
+    configs:
+      - name: devstral
+      - name: cool
+        temperature: 0.1
+      - name: cascade
+        cascade: true
+        draftmodel: qwen2.5-coder:3b
+or inline, --config "cool:temperature=0.1,model=devstral".
+
+    python compareConfigs.py ftrace.c prompt.txt --configs configs.yaml --limit 50
+"""
+
+# Standard Libraries
+import argparse
+import json
+import math
+import time
+
+# Third-party Libraries
+import yaml
+
+# Local Libraries
+import lamacoopDocgen
+from adaptiveConcurrency import AdaptiveLimiter
+from functionRecord import iterFunctionRecords
+from nearDuplicates import NearDuplicateIndex
+from pipeline import runPipeline
+from promptGenerator import generate
+from runMetrics import METRICS
+
+# Configuration keys and the lamacoopDocgen setting each one overrides
+SETTINGS: dict = {
+    'model': 'MODEL',
+    'temperature': 'TEMPERATURE',
+    'contextwindow': 'CONTEXTWINDOW',
+    'cascade': 'cascade',
+    'draftmodel': 'DRAFTMODEL',
+    'complexity': 'CASCADECOMPLEXITY',
+    'templates': 'TEMPLATES',
+    'reuse': 'REUSECOMMENTS',
+    'reprompts': 'REPROMPTS',
+}
+
+
+def parseConfig(text: str) -> dict:
+    """
+    "name:key=value,key=value" as a configuration, values read as YAML
+    scalars so numbers and booleans get their types.
+    """
+    name, _, settings = text.partition(":")
+    config: dict = {'name': name}
+    for setting in filter(None, settings.split(",")):
+        key, _, value = setting.partition("=")
+        config[key.strip()] = yaml.safe_load(value)
+    return config
+
+
+def loadConfigs(path: str) -> list:
+    with open(path, 'r') as file:
+        return yaml.safe_load(file)['configs']
+
+
+def percentile(values: list, fraction: float) -> float:
+    """
+    Nearest rank percentile, 0 for no values.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def runConfig(config: dict, records: list, prompt: str, workers: int) -> dict:
+    """
+    Document records with the settings of config and measure it. Settings,
+    METRICS, the limiter and the near-duplicate index are fresh for every
+    configuration and restored afterwards.
+    """
+    unknown = set(config) - set(SETTINGS) - {'name'}
+    if unknown:
+        raise ValueError(f"unknown settings in {config.get('name')}: {sorted(unknown)}")
+    overrides: dict = {SETTINGS[key]: value for key, value in config.items() if key != 'name'}
+    limiter = AdaptiveLimiter(initial=4, maximum=workers)
+    overrides.update({'LIMITER': limiter, 'NEARDUPLICATES': NearDuplicateIndex()})
+    saved: dict = {name: getattr(lamacoopDocgen, name) for name in overrides}
+
+    latencies: list = []
+    passed: list = [0]
+
+    def document(record) -> tuple:
+        start = time.perf_counter()
+        response = lamacoopDocgen.documentRecord(record, generate(record, prompt), False)
+        return response, time.perf_counter() - start
+
+    def measure(record, result: tuple) -> None:
+        response, seconds = result
+        latencies.append(seconds)
+        passed[0] += int(lamacoopDocgen.responsePasses(response, record))
+
+    for name, value in overrides.items():
+        setattr(lamacoopDocgen, name, value)
+    METRICS.reset()
+    METRICS.watchLimiter(limiter)
+    start = time.perf_counter()
+    try:
+        runPipeline(records, document, measure, workers=workers)
+    finally:
+        wall = time.perf_counter() - start
+        for name, value in saved.items():
+            setattr(lamacoopDocgen, name, value)
+        METRICS.watchLimiter(lamacoopDocgen.LIMITER)
+
+    functions = len(records)
+    totals: dict = METRICS.totals()
+    return {'name': config.get('name', "default"), 'functions': functions,
+            'seconds': wall,
+            'functionsPerSecond': functions / wall if wall else 0.0,
+            'tokensPerFunction': totals['tokens'] / functions if functions else 0.0,
+            'calls': totals['calls'],
+            'p50': percentile(latencies, 0.5), 'p95': percentile(latencies, 0.95),
+            'passRate': passed[0] / functions if functions else 0.0,
+            'metrics': METRICS.asDict()}
+
+
+def compareConfigs(configs: list, records: list, prompt: str, workers: int) -> list:
+    return [runConfig(config, records, prompt, workers) for config in configs]
+
+
+def formatComparison(rows: list) -> str:
+    """
+    Table of the comparison, one line per configuration.
+    """
+    lines: list = [f"{'config':24} {'funcs':>6} {'func/s':>8} {'tok/func':>9} "
+                   f"{'p50 s':>7} {'p95 s':>7} {'pass':>6}"]
+    for row in rows:
+        lines.append(f"{row['name'][:24]:24} {row['functions']:6} "
+                     f"{row['functionsPerSecond']:8.2f} {row['tokensPerFunction']:9.0f} "
+                     f"{row['p50']:7.2f} {row['p95']:7.2f} {row['passRate']:6.0%}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='compareConfigs.py',
+        description='Throughput and pass rate of several models and settings on one corpus')
+    parser.add_argument('filename')             # The corpus
+    parser.add_argument('promptfile')           # The prompt you want to use
+    parser.add_argument('--configs', metavar='FILE', help="YAML file of configurations")
+    parser.add_argument('--config', action='append', default=[],
+                        help="Inline configuration, name:key=value,...")
+    parser.add_argument('--limit', type=int, help="Only the first N functions of the corpus")
+    parser.add_argument('--maxparallel', type=int, default=8,
+                        help="Most prompts in flight per configuration")
+    parser.add_argument('--host', help="Ollama endpoint")
+    cassetteGroup = parser.add_mutually_exclusive_group()
+    cassetteGroup.add_argument('--record', metavar='DIR',
+                               help="Save every model response in this cassette directory")
+    cassetteGroup.add_argument('--replay', metavar='DIR',
+                               help="Answer every query from this cassette directory")
+    parser.add_argument('--json', metavar='FILE', help="Also write the results here")
+    args = parser.parse_args()
+
+    configs: list = (loadConfigs(args.configs) if args.configs else []) \
+        + [parseConfig(text) for text in args.config]
+    if not configs:
+        parser.error("give --configs or at least one --config")
+
+    with open(args.promptfile, 'r') as file:
+        prompt = file.read()
+    with open(args.filename, 'r') as file:
+        code = lamacoopDocgen.removeComments(file.read())
+    records: list = list(iterFunctionRecords(code, args.filename))[:args.limit]
+
+    lamacoopDocgen.configureClient(host=args.host, connections=args.maxparallel)
+    if args.record:
+        lamacoopDocgen.configureCassette(args.record, 'record')
+    elif args.replay:
+        lamacoopDocgen.configureCassette(args.replay, 'replay')
+
+    rows = compareConfigs(configs, records, prompt, args.maxparallel)
+    print(formatComparison(rows))
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(rows, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
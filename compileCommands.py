@@ -0,0 +1,181 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+"""
+compile_commands.json aware file selection for whole tree runs.
+
+Only translation units listed in compile_commands.json are documented, plus
+the project headers they include. Every header is parsed once no matter how
+many translation units pull it in, and each header function is attributed to
+a single canonical header so it is extracted and prompted only once.
+
+    python lamacoopDocgen.py --compile-commands build/compile_commands.json prompt.txt
+"""
+
+# Standard Libraries
+import hashlib
+import json
+import os
+import shlex
+from collections import deque
+
+# Local Libraries
+from lamacoopDocgen import removeComments
+from functionRecord import CONTAINERNODES, parseCode, recordsInTree
+from runLog import LOG
+
+HEADEREXTENSIONS: tuple = ('.h', '.hh', '.hpp', '.inc')
+
+
+def loadCompileCommands(commandsFile: str) -> list:
+    """
+    Read compile_commands.json, returning the entries with the source file and
+    working directory made absolute. Repeated entries for the same file are
+    dropped.
+    """
+    with open(commandsFile, 'r') as file:
+        commands: list = json.load(file)
+
+    entries: list = []
+    seen: set = set()
+    for entry in commands:
+        directory = os.path.abspath(os.path.join(os.path.dirname(commandsFile),
+                                                 entry.get('directory', '.')))
+        path = os.path.realpath(os.path.join(directory, entry['file']))
+        if path in seen:
+            continue
+        seen.add(path)
+        entries.append(dict(entry, directory=directory, file=path))
+    return entries
+
+
+def includeDirs(entry: dict) -> list:
+    """
+    The -I, -iquote and -isystem directories of one compile command.
+    """
+    arguments: list = entry.get('arguments') or shlex.split(entry.get('command', ''))
+    dirs: list = []
+    flags: tuple = ('-I', '-iquote', '-isystem')
+    expectDir = False
+    for argument in arguments:
+        if expectDir:
+            dirs.append(argument)
+            expectDir = False
+        elif argument in flags:
+            expectDir = True
+        else:
+            for flag in flags:
+                if argument.startswith(flag):
+                    dirs.append(argument[len(flag):])
+                    break
+    return [os.path.join(entry['directory'], d) for d in dirs]
+
+
+def findIncludes(tree) -> list:
+    """
+    The #include targets of a parsed file as (name, isQuoted) pairs, including
+    those inside preprocessor conditionals.
+    """
+    includes: list = []
+    stack: list = [tree.root_node]
+    while stack:
+        node = stack.pop()
+        if node.type == 'preproc_include':
+            path = node.child_by_field_name('path')
+            if path is not None:
+                name = path.text.decode('utf8')
+                includes.append((name.strip('"<>'), path.type == 'string_literal'))
+            continue
+        if node.type in CONTAINERNODES:
+            stack.extend(reversed(node.children))
+    return includes
+
+
+def resolveInclude(name: str, quoted: bool, includingFile: str,
+                   searchDirs: list) -> str:
+    """
+    Resolve an include the way the compiler would, quoted includes look next
+    to the including file first. Returns the canonical path or None.
+    """
+    candidates: list = [os.path.dirname(includingFile)] if quoted else []
+    for directory in candidates + searchDirs:
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            return os.path.realpath(path)
+    return None
+
+
+def iterTreeFunctions(commandsFile: str, root: str = None,
+                      keepComments: bool = False):
+    """
+    Yield (fileName, records) for every translation unit in
+    compile_commands.json and then for every project header they reach,
+    directly or through other headers, fileName being relative to root.
+    Headers outside root (the system headers) are skipped.
+
+    Each file is read and parsed exactly once, the same tree gives both its
+    includes and its FunctionRecords. Header functions already seen in an earlier
+    header are dropped so every header function has one canonical location.
+    """
+    entries: list = loadCompileCommands(commandsFile)
+    root = os.path.realpath(root or os.path.dirname(os.path.abspath(commandsFile)))
+
+    def inTree(path: str) -> bool:
+        return path is not None and os.path.commonpath([root, path]) == root
+
+    pending: deque = deque((e['file'], includeDirs(e)) for e in entries if inTree(e['file']))
+    seen: set = set(path for path, _ in pending)
+    seenHeaderFunctions: set = set()
+    while pending:
+        path, searchDirs = pending.popleft()
+        try:
+            with open(path, 'r', errors='replace') as file:
+                code = file.read()
+        except OSError as e:
+            LOG.warning("Skipping %s: %s", path, e)
+            continue
+        if not keepComments:
+            code = removeComments(code)
+        sourceBytes = code.encode('utf8')
+        tree = parseCode(sourceBytes)
+
+        for name, quoted in findIncludes(tree):
+            header = resolveInclude(name, quoted, path, searchDirs)
+            if inTree(header) and header not in seen:
+                seen.add(header)
+                pending.append((header, searchDirs))
+
+        fileName = os.path.relpath(path, root)
+        funcs: list = list(recordsInTree(tree, sourceBytes, fileName))
+        if path.endswith(HEADEREXTENSIONS):
+            unique: list = []
+            for record in funcs:
+                # A digest rather than the code so the set stays small on big trees
+                key = hashlib.sha1(''.join(record.code.split()).encode('utf8')).digest()
+                if key not in seenHeaderFunctions:
+                    seenHeaderFunctions.add(key)
+                    unique.append(record)
+            funcs = unique
+        yield fileName, funcs
@@ -0,0 +1,341 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+"""
+Long running documentation daemon with a thin client.
+
+Every run of lamacoopDocgen.py rebuilds the parser, reloads promptContext.yaml
+and opens a new connection to Ollama. The daemon does that once and then
+serves document, splice and verify jobs as JSON POSTs on a Unix socket or on
+localhost HTTP, so a small request only pays for parsing and the model.
+Jobs only name files under the daemon's directory, and with --token (or
+$LAMACOOP_TOKEN) every job must carry the same token, see jsonHandler.py.
+
+Start the daemon:
+    python docgenDaemon.py serve --socket /tmp/lamacoop.sock prompt.txt
+Submit jobs:
+    python docgenDaemon.py document ftrace.c --socket /tmp/lamacoop.sock
+    python docgenDaemon.py splice ftrace.c --socket /tmp/lamacoop.sock
+    python docgenDaemon.py verify ftrace.c --socket /tmp/lamacoop.sock
+"""
+
+# Standard Libraries
+import argparse
+import http.client
+import json
+import os
+import socket
+import socketserver
+import threading
+from pathlib import PurePath
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local Libraries
+from lamacoopDocgen import (MODEL, configureClient, contextMessages, documentRecord,
+                            removeComments, responsePasses, warmUp)
+from functionRecord import iterFunctionRecords, parseCode
+from promptGenerator import generate
+from jsonHandler import defaultToken, readJSON, requestHeaders, sendJSON
+import commentGenerator
+
+DAEMONPORT = 8737
+CLIENTTIMEOUT = 600
+
+
+class DocgenState:
+    """
+    Everything the daemon keeps warm between jobs: the prompt text, the
+    compiled prompt context, the shared parser and the response cache keyed by
+    function hash. token is what every job must carry, None for none.
+    """
+
+    def __init__(self, promptFile: str, verbose: bool = False, token: str = None):
+        with open(promptFile, 'r') as file:
+            self.prompt: str = file.read()
+        self.verbose: bool = verbose
+        self.token: str = token
+        self.cache: dict = {}
+        self.lock = threading.Lock()
+
+        # Pay for the yaml and the grammar now instead of on the first job
+        contextMessages()
+        parseCode(b"")
+
+
+def checkedPath(path: str) -> str:
+    """
+    path as given, raising ValueError when it is absolute or climbs out with
+    "..", so a job can only name files under the daemon's directory.
+    """
+    if not isinstance(path, str) or not path or os.path.isabs(path) \
+            or ".." in PurePath(path).parts:
+        raise ValueError(f"{path!r} must be a relative path without ..")
+    return path
+
+
+def documentJob(state: DocgenState, request: dict) -> dict:
+    """
+    Generate comments for every function in a file. The code can be sent in
+    the request or read from disk by the daemon. Each function goes through
+    documentRecord like a normal run (templates, validation, repair), and
+    only responses that pass are cached. With "write" set, responses are
+    stored under Functions/ where commentGenerator picks them up.
+    """
+    fileName: str = checkedPath(request['fileName'])
+    code: str = request.get('code')
+    if code is None:
+        with open(checkedPath(request.get('path', fileName)), 'r') as file:
+            code = file.read()
+    if not request.get('keepComments', False):
+        code = removeComments(code)
+
+    results: list = []
+    for record in iterFunctionRecords(code, fileName):
+        funcHash = record.hash
+        with state.lock:
+            response = state.cache.get(funcHash)
+        cached = response is not None
+        if not cached:
+            response = documentRecord(record, generate(record, state.prompt), state.verbose)
+            if response is not None and responsePasses(response, record):
+                with state.lock:
+                    state.cache[funcHash] = response
+
+        if request.get('write', False) and response is not None:
+            os.makedirs("Functions", exist_ok=True)
+            with open("Functions/" + funcHash + "-ai.c", 'w') as file:
+                file.write(response)
+
+        results.append({'hash': funcHash, 'name': record.name, 'cached': cached,
+                        'response': response})
+    return {'fileName': fileName, 'functions': results}
+
+
+def spliceJob(state: DocgenState, request: dict) -> dict:
+    """
+    Splice the stored comments into result/<fileName>, same as running
+    commentGenerator.py on the file. parse only opens the result once the
+    source has been read and spliced.
+    """
+    fileName: str = checkedPath(request['fileName'])
+    rejected: list = commentGenerator.parse(fileName)
+    return {'fileName': fileName, 'result': "result/" + fileName,
+            'rejectedLines': rejected}
+
+
+def verifyJob(state: DocgenState, request: dict) -> dict:
+    """
+    Check that result/<fileName> only differs from source/<fileName> by comments.
+    """
+    fileName: str = checkedPath(request['fileName'])
+    with open("source/" + fileName, 'r') as file:
+        code = file.read()
+    verified = commentGenerator.verifyCommentedFile(fileName, code)
+    return {'fileName': fileName, 'verified': verified}
+
+
+JOBS: dict = {
+    'document': documentJob,
+    'splice': spliceJob,
+    'verify': verifyJob,
+}
+
+
+class JobHandler(BaseHTTPRequestHandler):
+    """
+    POST /<job> with a JSON body runs the job, GET /status reports the state.
+    """
+
+    def do_GET(self):
+        if self.path.strip('/') != 'status':
+            sendJSON(self, 404, {'error': "unknown path " + self.path})
+            return
+        state: DocgenState = self.server.state
+        with state.lock:
+            cached = len(state.cache)
+        sendJSON(self, 200, {'model': MODEL, 'cached': cached, 'jobs': list(JOBS)})
+
+    def do_POST(self):
+        job = JOBS.get(self.path.strip('/'))
+        if job is None:
+            sendJSON(self, 404, {'error': "unknown job " + self.path})
+            return
+        try:
+            request: dict = readJSON(self, self.server.state.token)
+            if request is None:
+                return
+            sendJSON(self, 200, job(self.server.state, request))
+        except (OSError, ValueError, KeyError) as e:
+            sendJSON(self, 400, {'error': repr(e)})
+
+    def log_message(self, format, *args):
+        if self.server.state.verbose:
+            super().log_message(format, *args)
+
+
+class UnixJobServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    HTTP over a Unix socket, the handler expects a (host, port) client address
+    so one is made up for it.
+    """
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ('local', 0)
+
+
+def makeServer(state: DocgenState, socketPath: str = None,
+               port: int = DAEMONPORT) -> socketserver.BaseServer:
+    """
+    Bind the daemon to a Unix socket when a path is given, localhost otherwise.
+    """
+    if socketPath:
+        if os.path.exists(socketPath):
+            os.unlink(socketPath)
+        server = UnixJobServer(socketPath, JobHandler)
+    else:
+        server = ThreadingHTTPServer(('127.0.0.1', port), JobHandler)
+        server.daemon_threads = True
+    server.state = state
+    return server
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """ http.client connection that talks to the daemon's Unix socket """
+
+    def __init__(self, socketPath: str, timeout: float = CLIENTTIMEOUT):
+        super().__init__('localhost', timeout=timeout)
+        self.socketPath = socketPath
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socketPath)
+
+
+def submitJob(job: str, request: dict, socketPath: str = None,
+              port: int = DAEMONPORT, timeout: float = CLIENTTIMEOUT,
+              token: str = None) -> dict:
+    """
+    Thin client, sends one job to a running daemon and returns its JSON reply.
+    """
+    if socketPath:
+        connection = UnixHTTPConnection(socketPath, timeout)
+    else:
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    try:
+        if job == 'status':
+            connection.request('GET', '/status')
+        else:
+            connection.request('POST', '/' + job, body=json.dumps(request),
+                               headers=requestHeaders(token))
+        return json.loads(connection.getresponse().read())
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='docgenDaemon',
+        description='Keep the documentation generator warm and serve jobs',
+        epilog='')
+
+    parser.add_argument(
+        'job',
+        choices=['serve', 'status'] + list(JOBS),
+        help="serve starts the daemon, anything else is sent to it")
+
+    parser.add_argument(
+        'filename',
+        nargs='?',
+        help="Prompt file for serve, source file name for jobs")
+
+    parser.add_argument(
+        '-s',
+        '--socket',
+        help="Unix socket to serve on or connect to, default is localhost HTTP")
+
+    parser.add_argument(
+        '-p',
+        '--port',
+        type=int,
+        default=DAEMONPORT,
+        help="Localhost port when no socket is given, default is " + str(DAEMONPORT))
+
+    parser.add_argument(
+        '-w',
+        '--write',
+        action='store_true',
+        help="Store document responses under Functions/ for splicing")
+
+    parser.add_argument(
+        '-v',
+        '--verbose',
+        action='store_true',
+        help="Verbose mode, log every request the daemon serves")
+
+    parser.add_argument(
+        '--token',
+        default=defaultToken(),
+        help="Shared token jobs must carry, default is $LAMACOOP_TOKEN")
+
+    parser.add_argument(
+        '--host',
+        help="Ollama endpoint, default is $OLLAMA_HOST or localhost")
+
+    parser.add_argument(
+        '--keepalive',
+        help="How long Ollama keeps the model loaded between jobs")
+
+    args = parser.parse_args()
+
+    if args.job == 'serve':
+        configureClient(host=args.host, keepAlive=args.keepalive)
+        warmUp(verbose=args.verbose)
+        state = DocgenState(args.filename or "prompt.txt", args.verbose, args.token)
+        server = makeServer(state, args.socket, args.port)
+        print("Serving on", args.socket or "127.0.0.1:" + str(args.port))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            if args.socket and os.path.exists(args.socket):
+                os.unlink(args.socket)
+        return
+
+    request: dict = {'fileName': args.filename, 'write': args.write}
+    if args.job == 'document':
+        # The daemon may run elsewhere in the tree, so send the code along
+        with open(args.filename, 'r') as file:
+            request['code'] = file.read()
+    print(json.dumps(submitJob(args.job, request, args.socket, args.port,
+                               token=args.token), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+"""
+Watch mode. Files under source/ are watched with inotify (or by polling
+where inotify isn't available), and on every save the file is reparsed
+incrementally from the previous tree. The function hashes are diffed against
+the previous state, only functions that changed are prompted, and the
+comments in result/ (or the patch) are spliced again.
+
+    python docgenWatch.py prompt.txt ftrace.c kprobes.c
+    python docgenWatch.py prompt.txt ftrace.c --patch ftrace.patch
+
+Functions are hashed as commentGenerator.py sees them in source/, comments
+kept, and responses are stored under Functions/ where it looks for them.
+"""
+
+# Standard Libraries
+import argparse
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+# Local Libraries
+import commentGenerator
+from lamacoopDocgen import LIMITER, MAXPARALLEL, configureClient, documentRecord, warmUp
+from functionRecord import parseCode, recordsInTree
+from pipeline import runPipeline
+from promptGenerator import generate
+from runLog import LOG, configureLogging
+
+POLLSECONDS = 0.5           # Between checks of the polling watcher
+DEBOUNCESECONDS = 0.2       # Quiet time after a change before acting on it
+
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+EVENTHEADER = struct.Struct("iIII")
+
+
+def pointAt(source: bytes, offset: int) -> tuple:
+    """
+    tree-sitter (row, column) of a byte offset.
+    """
+    row = source.count(b"\n", 0, offset)
+    return row, offset - (source.rfind(b"\n", 0, offset) + 1)
+
+
+def reparse(tree, old: bytes, new: bytes):
+    """
+    Parse new incrementally from tree, the parse of old. The edit is the
+    span between the common prefix and the common suffix, which is exact
+    for the single region a save usually touches.
+    """
+    if tree is None:
+        return parseCode(new)
+    limit = min(len(old), len(new))
+    start = 0
+    while start < limit and old[start] == new[start]:
+        start += 1
+    end = 0
+    while end < limit - start and old[-1 - end] == new[-1 - end]:
+        end += 1
+    oldEnd, newEnd = len(old) - end, len(new) - end
+    tree.edit(start_byte=start, old_end_byte=oldEnd, new_end_byte=newEnd,
+              start_point=pointAt(old, start), old_end_point=pointAt(old, oldEnd),
+              new_end_point=pointAt(new, newEnd))
+    return parseCode(new, tree)
+
+
+def cached(funcHash: str) -> bool:
+    return os.path.exists("Functions/" + funcHash + "-ai.c")
+
+
+class WatchSession:
+    """
+    The last parse and function hashes of every watched file.
+    """
+
+    def __init__(self, prompt: str, patch: str = None, verbose: bool = False):
+        self.prompt = prompt
+        self.patch = patch
+        self.verbose = verbose
+        self.states: dict = {}
+
+    def update(self, fileName: str) -> list:
+        """
+        Bring source/<fileName> up to date: reparse, prompt the functions
+        whose hash is new and not already in Functions/, and splice again.
+        Returns the records that were prompted.
+        """
+        try:
+            with open("source/" + fileName, 'rb') as file:
+                source: bytes = file.read()
+        except FileNotFoundError:
+            # Caught between an editor's delete and rename, the next event has it
+            return []
+        previous = self.states.get(fileName)
+        if previous is not None and previous[0] == source:
+            return []
+        tree = reparse(previous[1] if previous else None,
+                       previous[0] if previous else b"", source)
+        records: list = list(recordsInTree(tree, source, fileName))
+        hashes: set = {record.hash for record in records}
+        known: set = previous[2] if previous else set()
+        self.states[fileName] = (source, tree, hashes)
+
+        changed: list = [record for record in records
+                         if record.hash not in known and not cached(record.hash)]
+        if changed:
+            LOG.info("%s: %d of %d functions changed", fileName, len(changed), len(records))
+            self.document(changed)
+        self.splice(fileName)
+        return changed
+
+    def document(self, records: list) -> None:
+        def prompt(record) -> str:
+            return documentRecord(record, generate(record, self.prompt), self.verbose)
+
+        def store(record, response: str) -> None:
+            if response is None:
+                LOG.warning("No comment for %s", record.name)
+                return
+            os.makedirs("Functions", exist_ok=True)
+            with open("Functions/" + record.hash + "-ai.c", 'w') as file:
+                file.write(response)
+
+        runPipeline(records, prompt, store, workers=LIMITER.maximum)
+
+    def splice(self, fileName: str) -> None:
+        """
+        Splice fileName again into result/, or rewrite the patch, which
+        covers every watched file.
+        """
+        if self.patch:
+            with open(self.patch, 'w') as out:
+                for watched in self.states:
+                    commentGenerator.writePatch(watched, out)
+            return
+        os.makedirs(os.path.dirname("result/" + fileName), exist_ok=True)
+        commentGenerator.parse(fileName)
+
+
+class PollingWatcher:
+    """
+    Notices changes by comparing size and mtime every POLLSECONDS.
+    """
+
+    def __init__(self, paths: list):
+        self.stamps: dict = {path: self.stamp(path) for path in paths}
+
+    def stamp(self, path: str) -> tuple:
+        try:
+            status = os.stat(path)
+            return status.st_mtime_ns, status.st_size
+        except FileNotFoundError:
+            return None
+
+    def wait(self, timeout: float = None) -> set:
+        """
+        The paths that changed, empty after timeout seconds without one.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed: set = set()
+            for path, stamp in self.stamps.items():
+                current = self.stamp(path)
+                if current != stamp:
+                    self.stamps[path] = current
+                    changed.add(path)
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+            time.sleep(POLLSECONDS)
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """
+    inotify on the directories holding the paths, so saves that replace the
+    file by renaming over it are seen too.
+    """
+
+    def __init__(self, paths: list):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.paths: set = {os.path.abspath(path) for path in paths}
+        self.directories: dict = {}
+        for directory in {os.path.dirname(path) for path in self.paths}:
+            wd = self.libc.inotify_add_watch(self.fd, directory.encode(),
+                                             IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), "inotify_add_watch failed on " + directory)
+            self.directories[wd] = directory
+
+    def events(self, timeout: float) -> set:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return set()
+        changed: set = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = EVENTHEADER.unpack_from(data, offset)
+            offset += EVENTHEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode()
+            offset += length
+            path = os.path.join(self.directories.get(wd, ""), name)
+            if path in self.paths:
+                changed.add(path)
+        return changed
+
+    def wait(self, timeout: float = None) -> set:
+        """
+        The paths that changed, empty after timeout seconds without one.
+        Waits DEBOUNCESECONDS after the first event to collect the rest of
+        the save.
+        """
+        changed = self.events(timeout)
+        while changed:
+            more = self.events(DEBOUNCESECONDS)
+            if not more:
+                break
+            changed |= more
+        cwd = os.getcwd()
+        return {os.path.relpath(path, cwd) for path in changed}
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def makeWatcher(paths: list, polling: bool = False):
+    """
+    InotifyWatcher where the platform has it, otherwise PollingWatcher.
+    """
+    if not polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(paths)
+        except (OSError, AttributeError) as e:
+            LOG.info("inotify unavailable (%s), polling instead", e)
+    return PollingWatcher(paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='docgenWatch.py',
+        description='Re-document changed functions in source/ whenever a file is saved')
+    parser.add_argument('promptfile')                # The prompt you want to use
+    parser.add_argument('filename', nargs='+')       # Files under source/ to watch
+    parser.add_argument('--patch', help="Keep this patch up to date instead of result/")
+    parser.add_argument('--poll', action='store_true', help="Poll instead of using inotify")
+    parser.add_argument('--host', help="Ollama endpoint")
+    parser.add_argument('--maxparallel', type=int, default=MAXPARALLEL,
+                        help="Most prompts in flight")
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args()
+
+    configureLogging('debug' if args.verbose else 'info')
+    configureClient(host=args.host, connections=args.maxparallel)
+    LIMITER.setMaximum(args.maxparallel)
+    warmUp()
+
+    with open(args.promptfile, 'r') as file:
+        session = WatchSession(file.read(), args.patch)
+    for fileName in args.filename:
+        session.update(fileName)
+    LOG.info("Watching %d files, Ctrl-C to stop", len(args.filename))
+
+    paths: dict = {os.path.join("source", name): name for name in args.filename}
+    watcher = makeWatcher(list(paths), args.poll)
+    try:
+        while True:
+            for path in sorted(watcher.wait()):
+                fileName = paths[os.path.normpath(path)]
+                start = time.perf_counter()
+                changed = session.update(fileName)
+                LOG.info("%s updated in %.1fs, %d functions prompted", fileName,
+                         time.perf_counter() - start, len(changed))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+if __name__ == "__main__":
+    main()
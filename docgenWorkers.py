@@ -0,0 +1,302 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+"""
+Coordinator and workers for documenting a tree across several machines,
+sharing a work queue (see workQueue.py). The queue database stays on the
+coordinator's local disk and is served to the workers over HTTP, to those
+that have its shared token (--token or $LAMACOOP_TOKEN).
+
+Enqueue every function of a file or a compile_commands.json tree, and serve
+the queue:
+    python docgenWorkers.py enqueue prompt.txt ftrace.c --queue jobs.db
+    python docgenWorkers.py serve --queue jobs.db --bind 0.0.0.0 --port 8766 --token $TOKEN
+Start any number of workers, each querying its own Ollama:
+    python docgenWorkers.py work --queue http://coordinator:8766 --token $TOKEN \
+        --host http://localhost:11434
+Wait for the queue to drain and write the results for commentGenerator.py:
+    python docgenWorkers.py collect --queue jobs.db
+
+Workers on the coordinator itself may also open the database directly.
+"""
+
+# Standard Libraries
+import argparse
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# Local Libraries
+import lamacoopDocgen
+from lamacoopDocgen import (LIMITER, MAXPARALLEL, configureCassette, configureClient,
+                            documentRecord, removeComments, responsePasses,
+                            writeFunction)
+from functionRecord import functionRecord, iterWindowedRecords
+from jsonHandler import defaultToken
+from promptGenerator import generate
+from runMetrics import METRICS
+from workQueue import (LEASESECONDS, QUEUEPORT, WorkQueue, makeQueueServer, openQueue,
+                       workerName)
+
+POLLSECONDS = 2             # Wait between claims while other workers hold the rest
+RENEWSECONDS = 60           # Lease renewal while a job is documented, --lease must exceed it
+
+
+def jobsFor(records, prompt: str):
+    """
+    Queue jobs for FunctionRecords, each carrying its full prompt so workers
+    need neither the prompt file nor the source tree.
+    """
+    for record in records:
+        yield {'hash': record.hash, 'file': record.fileName, 'name': record.name,
+               'code': record.code, 'prompt': generate(record, prompt)}
+
+
+@contextmanager
+def leaseKept(queue: WorkQueue, funcHash: str, worker: str, every: float):
+    """
+    Renew worker's lease on a job every so many seconds while the body runs,
+    so a long repair or cascade isn't claimed again by another worker.
+    """
+    done = threading.Event()
+
+    def renew() -> None:
+        while not done.wait(every):
+            try:
+                if not queue.renew(funcHash, worker):
+                    return
+            except OSError:
+                # The server may be back by the next renewal
+                continue
+
+    thread = threading.Thread(target=renew, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        done.set()
+        thread.join()
+
+
+def runWorker(queue: WorkQueue, worker: str = None, workers: int = MAXPARALLEL,
+              pollSeconds: float = POLLSECONDS, verbose: bool = False,
+              renewSeconds: float = RENEWSECONDS) -> int:
+    """
+    Document jobs with the local model until nothing is queued or leased.
+    Each of workers threads claims a job only when it is free to work on
+    it, and no more jobs are held than LIMITER lets queries be in flight,
+    so a worker never sits on leases other machines could use. The lease of
+    a job is renewed every renewSeconds while it is documented. Jobs leased
+    by other workers are waited for, their lease may run out and requeue
+    them. Returns how many results were posted.
+    """
+    worker = worker or workerName()
+    unusable = object()
+    posted: list = [0]
+    held: list = [0]
+    condition = threading.Condition()
+    stop = threading.Event()
+    errors: list = []
+
+    def document(job: dict) -> tuple:
+        record = functionRecord(job['code'], job['file'])
+        if record is None:
+            # No attempt would parse it either
+            queue.fail(job['hash'], worker)
+            return unusable
+        # Counts the attempt, unless another worker took the job meanwhile
+        if not queue.attempt(job['hash'], worker):
+            return None
+        with leaseKept(queue, job['hash'], worker, renewSeconds):
+            response = documentRecord(record, job['prompt'], verbose)
+        if response is None:
+            return None
+        return response, responsePasses(response, record)
+
+    def post(job: dict, result: tuple) -> None:
+        if result is unusable:
+            return
+        if result is None:
+            queue.release(job['hash'], worker)
+            return
+        if queue.complete(job['hash'], worker, *result):
+            with condition:
+                posted[0] += 1
+        if verbose:
+            print(worker, "finished", job['name'], "passed" if result[1] else "failed validation")
+
+    def claimSlot() -> bool:
+        with condition:
+            while held[0] >= LIMITER.currentLimit():
+                if stop.is_set():
+                    return False
+                # The limit moves with the limiter, look again now and then
+                condition.wait(pollSeconds)
+            held[0] += 1
+            return True
+
+    def releaseSlot() -> None:
+        with condition:
+            held[0] -= 1
+            condition.notify_all()
+
+    def loop() -> None:
+        try:
+            while not stop.is_set():
+                if not claimSlot():
+                    return
+                try:
+                    job = queue.claim(worker)
+                    if job is not None:
+                        post(job, document(job))
+                finally:
+                    releaseSlot()
+                if job is None:
+                    if queue.pending() == 0:
+                        return
+                    time.sleep(pollSeconds)
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+
+    threads: list = [threading.Thread(target=loop, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return posted[0]
+
+
+def collectResults(queue: WorkQueue, wait: bool = True,
+                   pollSeconds: float = POLLSECONDS, verbose: bool = False) -> int:
+    """
+    Write every finished job under newFunctions/, after waiting for the
+    queue to drain when wait is set. Returns how many were written.
+    """
+    while wait and queue.pending():
+        time.sleep(pollSeconds)
+    results: list = queue.results()
+    for result in results:
+        writeFunction(result['hash'], result['code'], result['response'], verbose)
+    return len(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='docgenWorkers.py',
+        description='Document functions with workers on several machines sharing a queue')
+    parser.add_argument('job', choices=['enqueue', 'serve', 'work', 'collect', 'status'])
+    parser.add_argument('promptfile', nargs='?')    # enqueue: the prompt to use
+    parser.add_argument('filename', nargs='?')      # enqueue: the file to document
+    parser.add_argument('--queue', required=True,
+                        help="Work queue database on a local disk, or the http://host:port "
+                             "it is served on")
+    parser.add_argument('--compile-commands', dest='compilecommands',
+                        help="enqueue: every file in this compile_commands.json instead")
+    parser.add_argument('--root',
+                        help="Project root for --compile-commands, only files under it are "
+                             "documented, default is its directory")
+    parser.add_argument('--keepcomments', action='store_true')
+    parser.add_argument('--host', help="Ollama endpoint for this worker")
+    parser.add_argument('--keepalive', help="How long Ollama keeps the model loaded")
+    parser.add_argument('--maxparallel', type=int, default=MAXPARALLEL,
+                        help="Most prompts this worker has in flight")
+    parser.add_argument('--lease', type=float, default=LEASESECONDS,
+                        help="Seconds a claimed job stays leased, default is "
+                             + str(LEASESECONDS))
+    parser.add_argument('--worker', help="Worker id, default is host:pid")
+    parser.add_argument('--token', default=defaultToken(),
+                        help="Shared token of the queue server, default is $LAMACOOP_TOKEN")
+    parser.add_argument('--bind', default='127.0.0.1',
+                        help="serve: address to listen on, default is 127.0.0.1")
+    parser.add_argument('--port', type=int, default=QUEUEPORT,
+                        help="serve: port to listen on, default is " + str(QUEUEPORT))
+    parser.add_argument('--replay', metavar='DIR',
+                        help="Answer every query from this cassette directory")
+    parser.add_argument('--nowait', action='store_true',
+                        help="collect: write what is done now instead of waiting")
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args()
+    if args.lease <= RENEWSECONDS:
+        parser.error(f"--lease must be longer than the {RENEWSECONDS}s between lease renewals")
+
+    queue = openQueue(args.queue, leaseSeconds=args.lease, token=args.token)
+
+    if args.job == 'enqueue':
+        if args.promptfile is None or (args.filename is None and args.compilecommands is None):
+            parser.error("enqueue needs a prompt file and a filename or --compile-commands")
+        with open(args.promptfile, 'r') as file:
+            prompt = file.read()
+        if args.compilecommands:
+            from compileCommands import iterTreeFunctions
+            records = (record for _, funcs in iterTreeFunctions(args.compilecommands, args.root,
+                                                                args.keepcomments)
+                       for record in funcs)
+        else:
+            with open(args.filename, 'r') as file:
+                code = file.read()
+            if not args.keepcomments:
+                code = removeComments(code)
+            records = iterWindowedRecords(code.encode('utf8'), args.filename)
+        print(queue.enqueue(jobsFor(records, prompt)), "jobs added to", args.queue)
+
+    elif args.job == 'serve':
+        if not isinstance(queue, WorkQueue):
+            parser.error("serve needs the queue database, not a URL")
+        if not args.token:
+            parser.error("serve needs a shared token, give --token or set $LAMACOOP_TOKEN")
+        server = makeQueueServer(queue, args.token, args.bind, args.port)
+        print("Serving", args.queue, "on", f"http://{args.bind}:{server.server_address[1]}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+    elif args.job == 'work':
+        configureClient(host=args.host, keepAlive=args.keepalive,
+                        connections=args.maxparallel)
+        LIMITER.setMaximum(args.maxparallel)
+        if args.replay:
+            configureCassette(args.replay, 'replay')
+        worker = args.worker or workerName()
+        posted = runWorker(queue, worker, args.maxparallel, verbose=args.verbose)
+        print(worker, "posted", posted, "results")
+        print(METRICS.summary())
+
+    elif args.job == 'collect':
+        written = collectResults(queue, wait=not args.nowait, verbose=args.verbose)
+        print(written, "functions written to newFunctions/" + str(lamacoopDocgen.TIME))
+
+    print(json.dumps(queue.counts()))
+    queue.close()
+
+
+if __name__ == "__main__":
+    main()
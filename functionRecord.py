@@ -0,0 +1,275 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+"""
+The shared C parser and FunctionRecord, the structured form of an extracted
+function. Name, parameters and return type are read from the tree-sitter
+declarator once at extraction, so prompt generation and verification no
+longer split the raw code on parentheses, which broke on function pointer
+parameters and __attribute__s.
+"""
+
+# Standard Libraries
+import hashlib
+import threading
+
+# Third-party Libraries
+from tree_sitter import Language, Parser
+import tree_sitter_c
+
+# Local Libraries
+from profiling import span
+
+C_LANGUAGE = Language(tree_sitter_c.language())
+_parser = None
+_parserLock = threading.Lock()
+
+# Nodes that can hold function definitions. ERROR is included because
+# macro heavy kernel code often ends up wrapped in one by error recovery.
+CONTAINERNODES: set = {'translation_unit', 'preproc_if', 'preproc_ifdef',
+                       'preproc_elif', 'preproc_elifdef', 'preproc_else',
+                       'linkage_specification', 'declaration_list', 'ERROR'}
+
+NAMENODES: set = {'identifier', 'field_identifier', 'type_identifier'}
+
+# Source parsed at a time by iterWindowedRecords. A tree costs around fifty
+# times its source in memory, so whole file trees of large generated files
+# run to gigabytes.
+WINDOWBYTES = 1 << 20
+
+
+def parseCode(sourceBytes, oldTree=None):
+    """
+    Parse C source with the parser shared by the whole process. The grammar
+    and parser are built on first use instead of once per call, which keeps
+    them warm for the daemon and for multi-file runs.
+
+    sourceBytes can also be a read callback as accepted by Parser.parse, and
+    passing the edited previous tree as oldTree reparses incrementally.
+    """
+    global _parser
+    with _parserLock:
+        if _parser is None:
+            _parser = Parser(C_LANGUAGE)
+        if oldTree is None:
+            return _parser.parse(sourceBytes)
+        return _parser.parse(sourceBytes, oldTree)
+
+
+def iterFunctionNodes(tree):
+    """
+    Yield the function_definition nodes of a tree in source order. A tree
+    cursor walks only the containers in CONTAINERNODES, so function bodies
+    and other declarations are never descended into and deep nesting can't
+    hit the recursion limit.
+    """
+    cursor = tree.walk()
+    if not cursor.goto_first_child():
+        return
+    while True:
+        node = cursor.node
+        if node.type == 'function_definition':
+            yield node
+        elif node.type in CONTAINERNODES and cursor.goto_first_child():
+            continue
+        while not cursor.goto_next_sibling():
+            if not cursor.goto_parent():
+                return
+
+
+def functionHash(func: str, fileName: str) -> str:
+    """
+    Hash used to name the per-function output files, see writeCacheToFile in
+    commentGenerator for the convention.
+    """
+    function = ""
+    for line in func.split("\n"):
+        function = function + line.strip()
+    return hashlib.sha256((("Linux" + fileName + str(function))).encode()).hexdigest()
+
+
+class FunctionRecord:
+    """
+    One extracted function. parameters holds each named parameter's
+    declaration as written and parameterNames the matching names, an empty
+    (void) list gives empty tuples. startByte and endByte locate the
+    definition in fileName's parsed source and hash follows functionHash.
+    """
+    __slots__ = ('name', 'parameters', 'parameterNames', 'returnType',
+                 'startByte', 'endByte', 'hash', 'code', 'fileName')
+
+    def __init__(self, name: str, parameters: tuple, parameterNames: tuple,
+                 returnType: str, startByte: int, endByte: int, hash: str,
+                 code: str, fileName: str = ""):
+        self.name = name
+        self.parameters = parameters
+        self.parameterNames = parameterNames
+        self.returnType = returnType
+        self.startByte = startByte
+        self.endByte = endByte
+        self.hash = hash
+        self.code = code
+        self.fileName = fileName
+
+    def __repr__(self) -> str:
+        return f"FunctionRecord({self.name}({', '.join(self.parameters)}))"
+
+
+def innerDeclarator(node):
+    """
+    The next declarator down, parenthesized declarators have no field for it.
+    """
+    inner = node.child_by_field_name('declarator')
+    if inner is None and node.type == 'parenthesized_declarator':
+        inner = next((c for c in node.named_children if c.type != 'comment'), None)
+    return inner
+
+
+def declaratorName(node, source: bytes) -> str:
+    """
+    The identifier a declarator declares, looking through pointers, arrays,
+    attributes and function pointer parentheses. None for abstract ones.
+    """
+    while node is not None:
+        if node.type in NAMENODES:
+            return source[node.start_byte:node.end_byte].decode('utf8')
+        node = innerDeclarator(node)
+    return None
+
+
+def recordFromNode(node, source: bytes, fileName: str = "") -> FunctionRecord:
+    """
+    Build the record for a function_definition node of a tree parsed from
+    source. Returns None when the definition has no recognisable name.
+    """
+    text = lambda n: source[n.start_byte:n.end_byte].decode('utf8')
+
+    # Find the function_declarator that names the function, for functions
+    # returning function pointers it sits inside the outer declarators
+    declarator = node.child_by_field_name('declarator')
+    pointers = 0
+    while declarator is not None:
+        if declarator.type == 'function_declarator':
+            inner = declarator.child_by_field_name('declarator')
+            if inner is not None and inner.type in NAMENODES:
+                break
+        elif declarator.type == 'pointer_declarator':
+            pointers += 1
+        declarator = innerDeclarator(declarator)
+    if declarator is None:
+        return None
+
+    parameters: list = []
+    parameterNames: list = []
+    parameterList = declarator.child_by_field_name('parameters')
+    for parameter in (parameterList.named_children if parameterList else []):
+        if parameter.type == 'variadic_parameter':
+            name = "..."
+        elif parameter.type == 'parameter_declaration':
+            name = declaratorName(parameter.child_by_field_name('declarator'), source)
+        else:
+            continue
+        if name:
+            parameters.append(' '.join(text(parameter).split()))
+            parameterNames.append(name)
+
+    # Qualifiers and the type, leaving out static, inline and attributes
+    typeParts: list = [text(child) for child in node.children
+                       if child.type == 'type_qualifier'
+                       or child == node.child_by_field_name('type')]
+    returnType = ' '.join(typeParts or ["int"]) + "*" * pointers
+    code = text(node)
+    return FunctionRecord(text(declarator.child_by_field_name('declarator')),
+                          tuple(parameters), tuple(parameterNames), returnType,
+                          node.start_byte, node.end_byte,
+                          functionHash(code, fileName), code, fileName)
+
+
+def iterFunctionRecords(c_code: str, fileName: str = ""):
+    """
+    Yield a FunctionRecord for every function in c_code, in source order.
+    """
+    source = c_code.encode('utf8')
+    yield from recordsInTree(parseCode(source), source, fileName)
+
+
+def recordsInTree(tree, source: bytes, fileName: str = ""):
+    """
+    iterFunctionRecords for an already parsed tree.
+    """
+    for node in iterFunctionNodes(tree):
+        record = recordFromNode(node, source, fileName)
+        if record is not None:
+            yield record
+
+
+def iterWindowedRecords(source: bytes, fileName: str = "",
+                        window: int = WINDOWBYTES):
+    """
+    iterFunctionRecords in bounded memory. The source is parsed a window at
+    a time and cut after the last clean top level function_definition that
+    is not the window's final node, since error recovery on the truncated
+    tail can reach back over a node or two. The next window starts at the
+    cut. A window with nowhere to cut (a header guard around the whole
+    file, or one huge function) is doubled until there is.
+    Record offsets are into the whole source.
+    """
+    start = 0
+    size = window
+    while start < len(source):
+        end = min(len(source), start + size)
+        chunk = source[start:end]
+        with span('extract', file=fileName, offset=start):
+            tree = parseCode(chunk)
+        if end < len(source):
+            cuts: list = [child.end_byte for child in tree.root_node.children[:-1]
+                          if child.type == 'function_definition' and not child.has_error]
+            if not cuts:
+                size *= 2
+                continue
+            last = cuts[-1]
+        else:
+            last = len(chunk)
+
+        for node in iterFunctionNodes(tree):
+            if node.end_byte > last:
+                break
+            record = recordFromNode(node, chunk, fileName)
+            if record is not None:
+                record.startByte += start
+                record.endByte += start
+                yield record
+        start += last
+        size = window
+
+
+def functionRecord(func, fileName: str = "") -> FunctionRecord:
+    """
+    The record for a single function, passing records through untouched.
+    Returns None when func holds no parsable function definition.
+    """
+    if isinstance(func, FunctionRecord):
+        return func
+    return next(iterFunctionRecords(func, fileName), None)
@@ -0,0 +1,87 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+"""
+The JSON over HTTP plumbing shared by the daemon (docgenDaemon.py) and the
+work queue server (workQueue.py).
+
+A POST is only read when it says it is application/json. A browser can't
+send that cross-site without a CORS preflight, which these servers never
+answer, so a web page can't drive them. When the server has a shared token
+the request must also carry it in TOKENHEADER.
+"""
+
+# Standard Libraries
+import hmac
+import json
+import os
+from http.server import BaseHTTPRequestHandler
+
+TOKENHEADER = "X-Lamacoop-Token"
+TOKENVARIABLE = "LAMACOOP_TOKEN"    # Environment default for --token
+
+
+def defaultToken() -> str:
+    """
+    The shared token from the environment, None when it isn't set.
+    """
+    return os.environ.get(TOKENVARIABLE) or None
+
+
+def requestHeaders(token: str = None) -> dict:
+    """
+    Headers for a client POST to one of these servers.
+    """
+    headers: dict = {'Content-Type': 'application/json'}
+    if token:
+        headers[TOKENHEADER] = token
+    return headers
+
+
+def sendJSON(handler: BaseHTTPRequestHandler, status: int, body: dict) -> None:
+    payload = json.dumps(body).encode('utf8')
+    handler.send_response(status)
+    handler.send_header('Content-Type', 'application/json')
+    handler.send_header('Content-Length', str(len(payload)))
+    handler.end_headers()
+    handler.wfile.write(payload)
+
+
+def readJSON(handler: BaseHTTPRequestHandler, token: str = None) -> dict:
+    """
+    The JSON body of a POST. When it isn't application/json, or token is set
+    and the request doesn't carry it, the request is answered with an error
+    here and None is returned. Raises ValueError for a body that isn't JSON.
+    """
+    contentType: str = handler.headers.get('Content-Type', "")
+    if contentType.split(";")[0].strip().lower() != 'application/json':
+        sendJSON(handler, 415, {'error': "requests must be application/json"})
+        return None
+    if token and not hmac.compare_digest(handler.headers.get(TOKENHEADER, "").encode('utf8'),
+                                         token.encode('utf8')):
+        sendJSON(handler, 403, {'error': "missing or wrong " + TOKENHEADER})
+        return None
+    length = int(handler.headers.get('Content-Length', 0))
+    return json.loads(handler.rfile.read(length) or b"{}")
@@ -40,23 +40,83 @@ import time
 from itertools import count
 from multiprocessing import Process
 import hashlib
+import threading
+from functools import lru_cache
 
 # Third-party Libraries
-from tree_sitter import Language, Parser
-import tree_sitter_c
-from ollama import chat
+import httpx
+from ollama import Client
 from ollama import ChatResponse
 
 # Local Libraries
+from functionRecord import (C_LANGUAGE, CONTAINERNODES, FunctionRecord,
+                            functionHash, functionRecord, iterFunctionNodes,
+                            iterFunctionRecords, iterWindowedRecords,
+                            parseCode)
 from promptGenerator import generate
 from verifyAIOutput import *
+from runMetrics import METRICS
+from adaptiveConcurrency import AdaptiveLimiter
+from profiling import complete, span, startProfiling, stopProfiling
+from pipeline import runLanes
+from cassette import Cassette
+from nearDuplicates import NearDuplicateIndex
+from templateComments import templateComment
+from commentRepair import repairComment, tooWide
+from longFunctions import bodySegments, countTokens, summaryStub
+from runLog import LOG, PAYLOADLOG, LEVELS, Progress, configureLogging
+from sharding import inShard, parseShard, writeManifest
+from runBudget import (BudgetExhausted, RunBudget, loadHotFiles, loadRemaining,
+                       parseDuration, prioritize, writeRemaining)
 
 TIME = datetime.datetime.now()
 MODEL = "devstral"
+DRAFTMODEL = "qwen2.5-coder:3b"   # Fast first tier for --cascade
+CASCADECOMPLEXITY = 8             # Above this, skip the draft model
+cascade = False                   # Set by --cascade
 TEMPERATURE = 0.4
 PARALLELPROMPTS = 16
+MAXPARALLEL = 64            # Ceiling for the adaptive concurrency limit
 SECONDSTIMEOUT = 60
 NUMRETRIES = 2
+CONTEXTFILE = "./promptContext.yaml"
+OLLAMAHOST = None           # None falls back to $OLLAMA_HOST, then localhost
+KEEPALIVE = "30m"           # How long Ollama keeps the model loaded after a call
+POOLCONNECTIONS = MAXPARALLEL
+BUDGETBASE = 256            # Output tokens for the title and expectations
+BUDGETPERPARAM = 64         # Output tokens per @param line and its expectations
+BUDGETPERLINE = 2           # Output tokens per line of code being documented
+MAXBUDGET = 2048            # Hard ceiling on num_predict
+STOPSEQUENCE = "*/"         # End of the comment block, nothing after it is used
+REUSECOMMENTS = True        # Adapt comments of near-duplicate functions
+TEMPLATES = True            # Render comments for trivial functions locally
+REPROMPTS = 1               # Extra queries for a response repair can't fix
+CONTEXTWINDOW = 16384       # num_ctx of every query, longer prompts are summarized first
+SEGMENTTOKENS = 3072        # Most body tokens per segment of an oversized function
+SUMMARYBUDGET = 192         # num_predict for the summary of one segment
+LONGLANE = 2                # Workers for oversized functions, beside the fast lane
+SHOWPROGRESS = False        # Live progress line during promptFuncs, set by main
+OUTPUTDIR = None            # Where -w writes, None for ./newFunctions/<TIME>
+SUMMARYPROMPT = "Summarize what this part of the C function below does in two or three \
+plain sentences, naming the cases, calls and fields it handles. No code, no comment markers."
+ADAPTPROMPT = "This comment documents a function that is nearly identical to the \
+one below. Rewrite it for the function below: keep everything that still \
+applies, correct names, types and values that differ, and keep the same format.\n"
+SYSTEMPROMPT = "You are a computer programmer who makes comments, write in a c block \
+comment style. Format instructions are very important, always produce a \
+complete comment block beginning with a **/ and ending with */ on their own lines"
+
+_client = None
+_clientLock = threading.Lock()
+_cassette = None
+
+# Every query goes through LIMITER, which grows or shrinks the number in
+# flight from their latency and errors, see adaptiveConcurrency.py
+LIMITER = AdaptiveLimiter(initial=4, maximum=MAXPARALLEL)
+METRICS.watchLimiter(LIMITER)
+
+# Comments that passed validation this run, for near-duplicates to reuse
+NEARDUPLICATES = NearDuplicateIndex()
 
 def chunkString(text: str, maxTokens: int) -> list[str]:
     """
@@ -89,30 +149,19 @@ def extractFunctions(c_code: str) -> list[str]:
     Function mostly courtesy of ChatGPT, 
     modified to use prebuilt language definitions
     """
-    # Build and load the C grammar
-    C_LANGUAGE = Language(tree_sitter_c.language())
+    return list(iterFunctions(c_code))
 
-    parser = Parser(C_LANGUAGE)
 
+def iterFunctions(c_code: str):
+    """
+    Streaming version of extractFunctions, yields each function's code as
+    soon as it is found.
+    """
     # Parse the input C code
     source_bytes = c_code.encode('utf8')
-    tree = parser.parse(source_bytes)
-    root_node = tree.root_node
-
-    functions = []
-
-    # Recursively search for function_definition nodes
-    def collect_functions(node):
-        if node.type == 'function_definition':
-            start_byte = node.start_byte
-            end_byte = node.end_byte
-            func_code = source_bytes[start_byte:end_byte].decode('utf8')
-            functions.append(func_code)
-        for child in node.children:
-            collect_functions(child)
-
-    collect_functions(root_node)
-    return functions
+    tree = parseCode(source_bytes)
+    for node in iterFunctionNodes(tree):
+        yield source_bytes[node.start_byte:node.end_byte].decode('utf8')
 
 
 def removeComments(code: str) -> str:
@@ -126,103 +175,545 @@ def removeComments(code: str) -> str:
     return re.sub(pattern, '', code)
 
 
-
-def callAI(prompt: str,code: str, verbose: bool) -> str:
+@lru_cache(maxsize=None)
+def contextMessages(contextFile: str = CONTEXTFILE) -> tuple:
     """
-    Query OLLAMA with your prompt and the code block
+    Build the system message and the few-shot examples from promptContext.yaml.
+    The result is cached so the yaml is read once per process rather than once
+    per query, call contextMessages.cache_clear() to pick up edits.
     """
-    content: str = prompt + "\n" + code
-    if verbose:
-        print("***full query:")
-        print(content)
-
-    with open("./promptContext.yaml", 'r') as f:
+    with open(contextFile, 'r') as f:
         context: dict = yaml.safe_load(f)
 
-    messages: list = [{'role': 'system', 'content': \
-"You are a computer programmer who makes comments, write in a c block \
-comment style. Format instructions are very important, always produce a \
-complete comment block beginning with a **/ and ending with */ on their own lines"},]
+    messages: list = [{'role': 'system', 'content': SYSTEMPROMPT},]
 
     Responses: dict = context['Responses']
     Prompts: dict = context['Prompts']
 
-    responseKeys: list = list(Responses.keys())
-    promptKeys: list = list(Prompts.keys())
-
-    for prompt in promptKeys:
+    for prompt in Prompts:
         messages.append({'role': 'user', 'content': Prompts[prompt]},)
     for response in Responses:
         messages.append({'role': 'assistant', 'content' : Responses[response]},)
 
+    return tuple(messages)
+
+
+def getClient() -> Client:
+    """
+    Ollama client shared by every query in the process. Connections are pooled
+    and kept alive so parallel prompts don't each pay for a new connection.
+    """
+    global _client
+    with _clientLock:
+        if _client is None:
+            limits = httpx.Limits(max_connections=POOLCONNECTIONS,
+                                  max_keepalive_connections=POOLCONNECTIONS)
+            _client = Client(host=OLLAMAHOST, limits=limits,
+                             timeout=httpx.Timeout(None, connect=SECONDSTIMEOUT))
+        return _client
+
+
+def configureClient(host: str = None, keepAlive: str = None,
+                    connections: int = None) -> None:
+    """
+    Override the Ollama endpoint, keep_alive or pool size, the shared client
+    is rebuilt on next use.
+    """
+    global _client, OLLAMAHOST, KEEPALIVE, POOLCONNECTIONS
+    with _clientLock:
+        if host is not None:
+            OLLAMAHOST = host
+        if keepAlive is not None:
+            KEEPALIVE = keepAlive
+        if connections is not None:
+            POOLCONNECTIONS = connections
+        _client = None
+
+
+def configureCassette(directory: str = None, mode: str = 'replay') -> None:
+    """
+    Record every query to, or replay every query from, the cassette in
+    directory, see cassette.py. None goes back to plain queries.
+    """
+    global _cassette
+    _cassette = Cassette(directory, mode) if directory else None
+
+
+def chat(model: str, messages: list, options: dict, **kwargs) -> ChatResponse:
+    """
+    One chat request, through the cassette when one is configured.
+    """
+    if _cassette is not None:
+        return _cassette.chat(getClient, model, messages, options, **kwargs)
+    return getClient().chat(model=model, messages=messages, options=options, **kwargs)
+
+
+# Lets test runs record once against a live model and then replay offline
+if os.environ.get('LAMACOOP_REPLAY'):
+    configureCassette(os.environ['LAMACOOP_REPLAY'], 'replay')
+elif os.environ.get('LAMACOOP_RECORD'):
+    configureCassette(os.environ['LAMACOOP_RECORD'], 'record')
+
+
+def warmUp(model: str = MODEL, verbose: bool = False) -> threading.Thread:
+    """
+    Ask Ollama to load the model in the background. A chat with no messages
+    only loads the model, so run this while files are still being parsed and
+    the first real prompt no longer waits on load_duration.
+    """
+    def load():
+        try:
+            response: ChatResponse = getClient().chat(model=model, messages=[],
+                                                      keep_alive=KEEPALIVE)
+            LOG.debug("Warmed up %s in %.1f seconds", model,
+                      (response.load_duration or 0) / 1e9)
+        except Exception as e:
+            LOG.warning("Warm up failed: %s", e)
+
+    thread = threading.Thread(target=load, daemon=True)
+    thread.start()
+    return thread
+
+
+def outputBudget(func) -> int:
+    """
+    num_predict for documenting func, a FunctionRecord or plain code. Grows
+    with the parameters, which each need an @param line and two expectations
+    to pass CommentLength, and with the size of the function, capped at
+    MAXBUDGET so a rambling model can't run on forever.
+    """
+    record = functionRecord(func)
+    code: str = func.code if isinstance(func, FunctionRecord) else func
+    params: int = len(record.parameterNames) if record is not None else 0
+    budget = BUDGETBASE + BUDGETPERPARAM * params + BUDGETPERLINE * code.count("\n")
+    return min(budget, MAXBUDGET)
+
+
+def finishResponse(response: ChatResponse) -> str:
+    """
+    Ollama drops the stop sequence from the content, put the comment
+    terminator back when generation stopped on it. done_reason is 'stop' for
+    a natural end too, so only a comment still open is closed, prose is
+    left for validation to reject.
+    """
+    content: str = response.message.content or ""
+    if response.done_reason == 'stop' and content.rfind("/*") > content.rfind(STOPSEQUENCE):
+        content += STOPSEQUENCE
+    return content
+
+
+def callAI(prompt: str,code: str, verbose: bool, model: str = None,
+           budget: int = None, context: tuple = None) -> str:
+    """
+    Query OLLAMA with your prompt and the code block
+
+    Generation stops at the end of the comment block or after budget tokens,
+    by default outputBudget(code). Responses cut off by the budget are
+    counted as truncated in METRICS. context is the messages sent ahead of
+    the prompt, by default contextMessages().
+    """
+    model = model or MODEL
+    if budget is None:
+        budget = outputBudget(code)
+    content: str = prompt + "\n" + code
+    if verbose:
+        PAYLOADLOG.debug("full query:\n%s", content)
+
+    messages: list = list(contextMessages() if context is None else context)
     messages.append({'role': 'user', 'content': content})
 
+    start = time.perf_counter()
     try:
-        response: ChatResponse = chat(model=MODEL, messages=messages, 
-        options={
-                 'temperature': TEMPERATURE, 
-                 'OLLAMA_NUM_PARALLEL': PARALLELPROMPTS, 
-                 'timeout': SECONDSTIMEOUT, 
-                 'max_retries': NUMRETRIES
-                })
-        return response.message.content
+        with LIMITER.slot() as record:
+            complete('queue', start, time.perf_counter(), model=model)
+            with span('llm', model=model):
+                response: ChatResponse = chat(model=model, messages=messages,
+                keep_alive=KEEPALIVE,
+                options={
+                         'temperature': TEMPERATURE, 
+                         'OLLAMA_NUM_PARALLEL': PARALLELPROMPTS, 
+                         'timeout': SECONDSTIMEOUT, 
+                         'max_retries': NUMRETRIES,
+                         'num_predict': budget,
+                         'num_ctx': CONTEXTWINDOW,
+                         'stop': [STOPSEQUENCE]
+                        })
+            # Durations are in nanoseconds, see ollama's API docs
+            record(response.eval_count or 0,
+                   promptSeconds=((response.load_duration or 0)
+                                  + (response.prompt_eval_duration or 0)) / 1e9)
+        METRICS.recordCall(model, time.perf_counter() - start, response)
+        if response.done_reason == 'length':
+            LOG.debug("Response truncated at %d tokens", budget)
+        return finishResponse(response)
     except Exception as e:
-        if(verbose):
-            print("Prompt for:", code, "Failed for:", e)
+        METRICS.recordCall(model, time.perf_counter() - start)
+        LOG.warning("Prompt failed: %s", e)
+        if verbose:
+            PAYLOADLOG.debug("failed prompt for:\n%s", code)
+
+BRANCHNODES: set = {'if_statement', 'for_statement', 'while_statement',
+                    'do_statement', 'case_statement', 'conditional_expression',
+                    'goto_statement'}
+
+def functionComplexity(func: str) -> int:
+    """
+    Cyclomatic style complexity of a function: one plus the number of
+    branches, including short circuit && and ||.
+    """
+    tree = parseCode(func.encode('utf8'))
+    complexity = 1
+    cursor = tree.walk()
+    visitedChildren = False
+    while True:
+        node = cursor.node
+        if not visitedChildren:
+            if node.type in BRANCHNODES:
+                complexity += 1
+            elif node.type == 'binary_expression':
+                operator = node.child_by_field_name('operator')
+                if operator is not None and operator.type in ('&&', '||'):
+                    complexity += 1
+            if cursor.goto_first_child():
+                continue
+        if cursor.goto_next_sibling():
+            visitedChildren = False
+            continue
+        if not cursor.goto_parent():
+            break
+        visitedChildren = True
+    return complexity
+
+
+def reflowResponse(response: str, func) -> str:
+    """
+    A passing response with lines over the commentRepair WIDTH, rewrapped.
+    The validation checks don't look at width, so this runs on every
+    accepted comment. Left as it is when rewrapping would make it fail.
+    """
+    if not tooWide(response):
+        return response
+    wrapped = repairComment(response, functionRecord(func))
+    if wrapped is None or not responsePasses(wrapped, func):
+        return response
+    METRICS.recordShortcut('reflowed')
+    return wrapped
+
+
+def checkedResponse(response: str, func) -> tuple:
+    """
+    Validate a response, repairing it locally when it fails (see
+    commentRepair.py) and rewrapping it when it passes but is too wide.
+    Returns the response to use, repaired or not, and whether it passes.
+    func is a FunctionRecord or plain code.
+    """
+    if responsePasses(response, func):
+        return reflowResponse(response, func), True
+    repaired = repairComment(response, functionRecord(func))
+    if repaired is not None and responsePasses(repaired, func):
+        METRICS.recordShortcut('repaired')
+        return repaired, True
+    return response, False
+
+
+def cascadeAI(prompt: str, func, verbose: bool) -> str:
+    """
+    Small model first. Functions at or below CASCADECOMPLEXITY go to
+    DRAFTMODEL and its output is checked with checkedResponse, anything that
+    fails even after repair or is too complex goes to MODEL. Every attempt is
+    recorded per tier in METRICS for the run summary. func is a
+    FunctionRecord or plain code.
+    """
+    code: str = func.code if isinstance(func, FunctionRecord) else func
+    budget: int = outputBudget(func)
+    tier = 'complex'
+    if functionComplexity(code) <= CASCADECOMPLEXITY:
+        start = time.perf_counter()
+        response = callAI(prompt, code, verbose, DRAFTMODEL, budget)
+        with span('validate', tier='draft'):
+            response, passed = checkedResponse(response, func)
+        METRICS.recordTier('draft', passed, time.perf_counter() - start)
+        if passed:
+            return response
+        LOG.debug("Draft failed validation, escalating to %s", MODEL)
+        tier = 'escalated'
+
+    start = time.perf_counter()
+    response = callAI(prompt, code, verbose, MODEL, budget)
+    with span('validate', tier=tier):
+        response, passed = checkedResponse(response, func)
+    METRICS.recordTier(tier, passed, time.perf_counter() - start)
+    return response
+
+
+def templateResponse(record: FunctionRecord) -> str:
+    """
+    The template comment for a trivial function (getter, setter, wrapper or
+    empty stub), see templateComments.py. None when record isn't trivial.
+    """
+    with span('template', function=record.name):
+        comment = templateComment(record)
+    if comment is None or not responsePasses(comment, record):
+        return None
+    METRICS.recordShortcut('template')
+    return reflowResponse(comment, record)
+
+
+def substitutedComment(record: FunctionRecord, match: tuple) -> str:
+    """
+    The comment of a near-duplicate found by NEARDUPLICATES.query, with the
+    names substituted, when record differs from it only in names. None when
+    it differs in more or the result doesn't pass validation.
+    """
+    comment, score, substituted = match
+    if substituted is None or not responsePasses(substituted, record):
+        return None
+    METRICS.recordShortcut('substituted')
+    return reflowResponse(substituted, record)
+
+
+def adaptedComment(record: FunctionRecord, match: tuple, verbose: bool) -> str:
+    """
+    Ask the model to adapt the comment of a near-duplicate to record, using
+    the draft model when the cascade has it loaded. None when the result
+    doesn't pass validation.
+    """
+    comment, score, substituted = match
+    LOG.debug("Adapting comment of a %.0f%% similar function for %s", score * 100, record.name)
+    response = callAI(comment + "\n" + ADAPTPROMPT, record.code, verbose,
+                      DRAFTMODEL if cascade else MODEL, outputBudget(record))
+    with span('validate', function=record.name):
+        response, passed = checkedResponse(response, record)
+    if passed:
+        METRICS.recordShortcut('adapted')
+        return response
+    return None
+
+
+@lru_cache(maxsize=1)
+def contextTokens() -> int:
+    """
+    Approximate tokens of the few-shot prefix sent with every prompt.
+    """
+    return sum(countTokens(message['content']) for message in contextMessages())
+
+
+def estimatedTokens(record: FunctionRecord, currentPrompt: str) -> int:
+    """
+    Prompt and generated tokens one query for record is expected to take,
+    with the few-shot prefix and room for the answer. What a run budget
+    reserves before starting it.
+    """
+    return (contextTokens() + countTokens(currentPrompt + "\n" + record.code)
+            + outputBudget(record))
+
+
+def isOversized(record: FunctionRecord, currentPrompt: str) -> bool:
+    """
+    Whether the query for record would overflow CONTEXTWINDOW.
+    """
+    return estimatedTokens(record, currentPrompt) > CONTEXTWINDOW
+
+
+def documentOversized(record: FunctionRecord, currentPrompt: str, verbose: bool) -> str:
+    """
+    Map-reduce for a function that doesn't fit the context window. Each
+    segment of the body is summarized without the few-shot prefix, then the
+    comment is generated as usual for the signature with the summaries in
+    place of the body, and validated against the real function.
+    """
+    segments: list = bodySegments(record, SEGMENTTOKENS)
+    LOG.debug("%s is too long for the context window, summarizing %d segments",
+              record.name, len(segments))
+    header: str = summaryStub(record, [])
+    summaries: list = []
+    for number, segment in enumerate(segments, start=1):
+        with span('summarize', function=record.name, segment=number):
+            summary = callAI(SUMMARYPROMPT + "\n" + header, segment, verbose,
+                             budget=SUMMARYBUDGET,
+                             context=({'role': 'system', 'content': SUMMARYPROMPT},))
+        if not summary:
+            return None
+        # finishResponse closes comments, a summary isn't one
+        summaries.append(summary.removesuffix(STOPSEQUENCE))
+
+    stub: str = summaryStub(record, summaries)
+    response = None
+    for attempt in range(1 + REPROMPTS):
+        response = callAI(currentPrompt, stub, verbose, budget=outputBudget(record))
+        with span('validate', function=record.name):
+            response, passed = checkedResponse(response, record)
+        if passed:
+            break
+    return response
+
+
+def documentRecord(record: FunctionRecord, currentPrompt: str, verbose: bool,
+                   budget: RunBudget = None, estimate: int = None) -> str:
+    """
+    The comment for one function: a template for trivial functions, the
+    comment of a near-duplicate with the names substituted, neither of which
+    queries the model, otherwise queryRecord. With a budget the model is only
+    queried once the budget has reserved its cost, BudgetExhausted is raised
+    when it can't. estimate is estimatedTokens for currentPrompt, worked out
+    here when the caller doesn't have it.
+    """
+    response = templateResponse(record) if TEMPLATES else None
+    match = NEARDUPLICATES.query(record) if response is None and REUSECOMMENTS else None
+    if match is not None:
+        response = substitutedComment(record, match)
+    if response is not None:
+        return response
+
+    if estimate is None:
+        estimate = estimatedTokens(record, currentPrompt)
+    reservation = None
+    if budget is not None:
+        reservation = budget.reserve(estimate)
+        if reservation is None:
+            raise BudgetExhausted(budget.stopReason)
+    try:
+        return queryRecord(record, currentPrompt, verbose, estimate, match)
+    finally:
+        if reservation is not None:
+            budget.settle(reservation)
+
+
+def queryRecord(record: FunctionRecord, currentPrompt: str, verbose: bool,
+                estimate: int, match: tuple = None) -> str:
+    """
+    The model's comment for one function: map-reduce over summaries for a
+    function whose estimate is too long for the context window, otherwise
+    an adapted comment for a near-duplicate (match from
+    NEARDUPLICATES.query), otherwise a query (the cascade when it is on)
+    with re-prompts for responses repair can't fix. Oversize goes first,
+    an adapt request carries the whole function too.
+    """
+    if estimate > CONTEXTWINDOW:
+        return documentOversized(record, currentPrompt, verbose)
+    response = adaptedComment(record, match, verbose) if match is not None else None
+    if response is None:
+        if cascade:
+            # Escalating to the large model is the cascade's re-prompt
+            response = cascadeAI(currentPrompt,record,verbose)
+            passed = responsePasses(response, record)
         else:
-            print("Prompt failed:", e)
+            for attempt in range(1 + REPROMPTS):
+                response = callAI(currentPrompt,record.code,verbose,budget=outputBudget(record))
+                with span('validate', function=record.name):
+                    response, passed = checkedResponse(response, record)
+                if passed:
+                    break
+        if not passed:
+            LOG.info("Response for %s failed validation", record.name)
+        if REUSECOMMENTS and passed:
+            NEARDUPLICATES.add(record, response)
+    return response
+
+
+def outputDir() -> str:
+    return OUTPUTDIR or "./newFunctions/" + str(TIME)
+
+
+def writeFunction(funcHash: str, code: str, response: str, verbose: bool) -> None:
+    """
+    Write the original function and the response under newFunctions/<TIME>/,
+    or --outdir, for commentGenerator.py.
+    """
+    with span('write', function=funcHash):
+        origFile = outputDir() + "/" + funcHash + "-orig.c"
+        os.makedirs(os.path.dirname(origFile), exist_ok=True)
+        LOG.debug("Writing original function to %s", origFile)
+        with open(origFile, 'w') as file:
+            file.write(code)
+
+        modFile = outputDir() + "/" + funcHash + "-ai.c"
+        LOG.debug("Writing modified function to %s", modFile)
+        with open(modFile, 'w') as file:
+            try:
+                file.write(response)
+            except Exception as e:
+                LOG.error("Write failed for function %s: %s", funcHash, e)
 
-def promptFuncs(funcs: list) -> None:
+
+def promptFuncs(funcs, budget: RunBudget = None, remaining: list = None) -> int:
     """
     Take list of functions and optionally print them or write them to files.
     Once complete the function prompts the AI and writes the result to files as
     with the list of functions 
+
+    funcs is any iterable of FunctionRecords and is consumed lazily, so a
+    generator straight from extraction keeps only a bounded number of
+    functions and responses in memory, see pipeline.py. How many prompts
+    are actually in flight is up to LIMITER. Functions too long for the
+    context window go through a separate lane of LONGLANE workers. Returns
+    how many functions were documented.
+
+    With a budget every function that queries the model reserves its
+    expected cost in the worker, right before the query (see
+    documentRecord), and the ones the budget turns away are appended to
+    remaining. Only one function waits per lane then, so none is pulled in
+    ahead of the budget decision.
     """
 
-    def functionName(functionDeclaration:str) -> str:
-        specialCharacters: str = "*&@"
-        codeArguments: list = re.split(r'[\(\)]+', functionDeclaration)
-        functionName: str = codeArguments[0].split(" ")[-1]
-        if any(c in specialCharacters for c in functionName):
-            functionName = functionName[1:]
-        functionName = functionName.split("\n")[-1]
-        return functionName
-
-    currentFunc = 0
-    for func in funcs:
-        lines = func.split("\n")
-        function = ""
-        for line in lines:
-            function = function + line.strip()
-        functionHash = hashlib.sha256((("Linux" + sourceFile + str(function))).encode())
-        functionHash = functionHash.hexdigest()
-        currentFunc += 1
-        currentPrompt = generate(func, prompt)
-        if verbose:
-            print("---------------------------------------------------")
-            print("Prompting func: ", currentFunc)
-        if write:
-            origFile = "./newFunctions/" + str(TIME) + "/" + functionHash + "-orig.c"
-            os.makedirs(os.path.dirname(origFile), exist_ok=True)
-            if verbose: print("Writing original function to ", origFile)
-            with open(origFile, 'w') as file:
-                file.write(func)
+    def promptFunc(item: tuple) -> str:
+        # Groups the stages of one function in the trace, write happens on
+        # the consumer thread and has its own span
+        record = item[1]
+        with span('function', function=record.name, hash=record.hash):
+            return documentItem(item)
 
-        if verbose: 
-            print("Using prompt: ", currentPrompt)
-            response = callAI(currentPrompt,func,verbose)
-            print("response:")
-            print(response)
+    def documentItem(item: tuple) -> str:
+        currentFunc, record, currentPrompt, estimate = item
+        LOG.debug("Prompting function %d, %s", currentFunc, record.name)
+        if verbose:
+            PAYLOADLOG.debug("prompt for %s:\n%s", record.name, currentPrompt)
+        try:
+            response = documentRecord(record, currentPrompt, verbose, budget, estimate)
+        except BudgetExhausted:
+            return unstarted
+        if verbose:
+            PAYLOADLOG.debug("response for %s:\n%s", record.name, response)
+        return response
+
+    def writeFunc(item: tuple, response: str) -> None:
+        record = item[1]
+        if response is unstarted:
+            remaining.append(record)
+            progress.advance()
+            return
         if write:
-            modFile = "./newFunctions/" + str(TIME) + "/" + functionHash + "-ai.c"
-            print("Writing modified function to ", modFile)
-            with open(modFile, 'w') as file:
-                try:
-                    file.write(response)
-                except Exception as e:
-                    print("Write failed for function:", str(currentFunc), "because of:", e)
-
-        if verbose: print("++++++++++++++++++++++++++++++++++++++++++++++++++++")
+            writeFunction(record.hash, record.code, response, verbose)
+        progress.advance()
+
+    def oversized(item: tuple) -> bool:
+        return item[3] > CONTEXTWINDOW
+
+    def prompted(funcs):
+        # The lane of a function depends on its prompt, so each prompt and
+        # its estimate are made once, here, and travel with the function
+        for currentFunc, record in enumerate(funcs, start=1):
+            progress.discover()
+            with span('prompt', function=record.name):
+                currentPrompt = generate(record, prompt)
+            yield currentFunc, record, currentPrompt, estimatedTokens(record, currentPrompt)
+        progress.allDiscovered()
+
+    unstarted = object()
+    if remaining is None:
+        remaining = []
+    skipped = len(remaining)
+    progress = Progress(len(funcs) if isinstance(funcs, list) else None,
+                        enabled=SHOWPROGRESS)
+    try:
+        # Oversized functions take several queries each, they get their own
+        # few workers so the fast lane keeps moving
+        finished = runLanes(prompted(funcs), oversized, promptFunc, writeFunc,
+                            workers=LIMITER.maximum, sideWorkers=LONGLANE,
+                            depth=1 if budget is not None else None)
+        return finished - (len(remaining) - skipped)
+    finally:
+        progress.close()
 
 
 def promptDumb(chunks: list) -> None:
@@ -235,49 +726,74 @@ def promptDumb(chunks: list) -> None:
     for chunk in chunks:
         currentChunk += 1
         currentPrompt = generate(chunk, prompt)
-        if verbose: 
-            print("---------------------------------------------------")
-            print("Prompting Chunk: ", currentChunk)
-            print(chunk)
+        LOG.debug("Prompting chunk %d", currentChunk)
+        if verbose:
+            PAYLOADLOG.debug("chunk %d:\n%s", currentChunk, chunk)
         if write:
             origFile = "./newChunks/" + str(TIME) + "/" + str(currentChunk) + "-orig.c"
             os.makedirs(os.path.dirname(origFile), exist_ok=True)
-            if verbose: print("Writing original chunk to ", origFile)
+            LOG.debug("Writing original chunk to %s", origFile)
             with open(origFile, 'w') as file:
                 file.write(chunk)
-            
-        if verbose: 
-            print("Using prompt: ", currentPrompt)
-            response = callAI(currentPrompt,chunk,verbose)
-            print("response:")
-            print(response)
+
+        if verbose:
+            PAYLOADLOG.debug("prompt for chunk %d:\n%s", currentChunk, currentPrompt)
+        response = callAI(currentPrompt,chunk,verbose)
+        if verbose:
+            PAYLOADLOG.debug("response for chunk %d:\n%s", currentChunk, response)
         if write:
             modFile = "./newChunks/" + str(TIME) + "/" + str(currentChunk) + "-ai.c"
-            print("Writing modified chunk to ", modFile)
+            LOG.debug("Writing modified chunk to %s", modFile)
             with open(modFile, 'w') as file:
                 file.write(response)
-        if verbose:
-            print("++++++++++++++++++++++++++++++++++++++++++++++++++++")
 
-def getVerifierArgs(aiResponse : str, orgFunc : str) -> dict:
+def getVerifierArgs(aiResponse : str, orgFunc) -> dict:
     """
         Retrieves data from LLM-generated responses to be used by the verifyAIOutput suite. 
 
         Takes in an LLM-generated response and the corresponding function from the original code
         to withdraw the fields used in the verifyAIOutput methods. Goal is to compartmentalize 
         withdrawl process and return a dict that can be reused in the future. 
+
+        orgFunc is a FunctionRecord or the function's code. Code that does not parse
+        into a record falls back to splitting on parentheses.
     """
     commentLines : list = aiResponse.strip().split("*")
-    commentTitle : str = commentLines[1]
-    splitFunc : list = re.split(r'[\(\)]+', orgFunc)
-    funcHeader : str = splitFunc[0]
-    funcArgs : list = splitFunc[1].split(",")
+    # The first text after the opener, "/**" leaves empty pieces before it
+    commentTitle : str = next((line for line in commentLines[1:] if line.strip()), "")
+    record = functionRecord(orgFunc)
+    if record is not None:
+        funcHeader : str = record.name
+        funcArgs : list = list(record.parameterNames)
+    else:
+        splitFunc : list = re.split(r'[\(\)]+', orgFunc)
+        funcHeader : str = splitFunc[0]
+        funcArgs : list = splitFunc[1].split(",")
     funcExpectations : list = aiResponse.split("-")
 
-    verifierArgs : dict = dict(zip(["commentTitle", "funcHeader", "funcArgs", "funcExpectations"], 
-                               [commentTitle, funcHeader, funcArgs, funcExpectations]))
+    verifierArgs : dict = dict(zip(["commentTitle", "funcHeader", "funcArgs", "funcExpectations", "record"], 
+                               [commentTitle, funcHeader, funcArgs, funcExpectations, record]))
     return verifierArgs
 
+def responsePasses(aiResponse : str, orgFunc) -> bool:
+    '''
+        Quiet version of validateResponse, runs the same verifyAIOutput checks
+        without their printed reports and returns False on the first failure
+        instead of exiting.
+    '''
+    if not aiResponse:
+        return False
+    aiResponse = aiResponse.strip()
+    try:
+        verifierArgs : dict = getVerifierArgs(aiResponse, orgFunc)
+        return (checkCommentFormatting(aiResponse[:2], aiResponse[-2:])
+                and checkFunctionHeader(verifierArgs['funcHeader'], verifierArgs['commentTitle'],
+                                        quiet=True)
+                and ArgumentComments(verifierArgs['funcArgs'], aiResponse.split('*'), quiet=True)
+                and CommentLength(verifierArgs['funcExpectations'], verifierArgs['funcArgs']))
+    except IndexError:
+        return False
+
 def validateResponse(aiResponse : str, orgFunc : str) -> bool:
     '''
         Validate AI responses
@@ -292,24 +808,77 @@ def validateResponse(aiResponse : str, orgFunc : str) -> bool:
     try:
         assert(checkCommentFormatting(aiResponse[:2], aiResponse[-2:]))
     except AssertionError:
-        print(f"Error when verifying AI output on function {verifierArgs['funcHeader']}")
-        print(f"The LLM generated a comment without proper header or footer")
+        LOG.error("Error when verifying AI output on function %s", verifierArgs['funcHeader'])
+        LOG.error("The LLM generated a comment without proper header or footer")
 
     try:
         assert(checkFunctionHeader(verifierArgs['funcHeader'], verifierArgs['commentTitle']))
         assert(ArgumentComments(verifierArgs['funcArgs'], aiResponse.split('*')))
         assert(CommentLength(verifierArgs['funcExpectations'], verifierArgs['funcArgs']))
     except AssertionError as e:
-        print(f"Error when verifying AI output on function {verifierArgs['funcHeader']}")
-        print(f"AI Response: {aiResponse}")
+        LOG.error("Error when verifying AI output on function %s", verifierArgs['funcHeader'])
+        LOG.error("AI Response: %s", aiResponse)
         exit()
         
     return True
 
+def tapRecords(records, owned: list):
+    for record in records:
+        owned.append((record.hash, record.fileName, record.name))
+        yield record
+
+def scheduleRecords(records, budget: RunBudget = None, hotFiles: set = None,
+                    resume: set = None, shard: tuple = None, owned: list = None):
+    """
+    Apply --shard, --resume and priority order to a stream of records.
+    Priority order is only used with a budget or hot files, since sorting
+    needs the whole list in memory. The budget itself is applied by
+    promptFuncs. (hash, file, name) of every record left after --shard and
+    --resume is appended to owned, for the shard manifest.
+    """
+    records = inShard(records, shard)
+    if resume is not None:
+        records = (record for record in records if record.hash in resume)
+    if owned is not None:
+        records = tapRecords(records, owned)
+    if budget is not None or hotFiles:
+        records = prioritize(records, hotFiles or frozenset())
+    return records
+
+def finishBudget(budget: RunBudget, remaining: list) -> None:
+    """
+    Say why the run stopped early and write what is left for --resume.
+    """
+    if budget is None or not remaining:
+        return
+    path = "./remaining/" + str(TIME) + ".json"
+    writeRemaining(path, remaining, budget.stopReason)
+    LOG.warning("Stopped: %s, %d functions left, resume with --resume %s",
+                budget.stopReason, len(remaining), path)
+
+def finishShard(shard: tuple, owned: list) -> None:
+    """
+    Write the manifest sharding.py merges this shard's output with.
+    """
+    if shard is None:
+        return
+    path = writeManifest(outputDir(), shard, owned)
+    LOG.info("Shard %d/%d: %d functions, manifest written to %s",
+             shard[0], shard[1], len(owned), path)
+
+def finishProfiling(profileDir: str) -> None:
+    """
+    Write the --profile results, if profiling was on.
+    """
+    if profileDir:
+        for path in stopProfiling(profileDir):
+            LOG.info("Profile written to %s", path)
+
 def main():
     """
     Begin Argparse stuff
     """
+    global cascade, DRAFTMODEL, CASCADECOMPLEXITY, REUSECOMMENTS, TEMPLATES
 
     parser = argparse.ArgumentParser(
         prog='lamacoop-docgen.py',
@@ -317,7 +886,7 @@ def main():
         epilog='')
 
 
-    parser.add_argument('filename')           # The file you want to chunk
+    parser.add_argument('filename', nargs='?') # The file you want to chunk
 
     parser.add_argument('promptfile')         # The prompt you want to use
 
@@ -334,11 +903,26 @@ def main():
         action='store_true',
         help="Use the dumb chunker instead of the smart function chunker")
 
-    parser.add_argument(
+    loudness = parser.add_mutually_exclusive_group()
+    loudness.add_argument(
         '-v',
         '--verbose',
         action='store_true',
-        help="Verbose mode, print everything we are doing")  # on/off flag
+        help="Debug logging, every decision for every function")  # on/off flag
+    loudness.add_argument(
+        '-q',
+        '--quiet',
+        action='store_true',
+        help="Only warnings and errors, no progress line")
+    loudness.add_argument(
+        '--loglevel',
+        choices=list(LEVELS),
+        help="quiet, info (the default) or debug")
+
+    parser.add_argument(
+        '--payloadlog',
+        metavar='FILE',
+        help="Write every prompt and response to this file")
 
     parser.add_argument(
         '-w',
@@ -352,17 +936,146 @@ def main():
         action='store_true',
         help="Don't remove comments from source code before passing them to the AI")
 
+    parser.add_argument(
+        '--compile-commands',
+        dest='compilecommands',
+        help="Document the files built by this compile_commands.json instead of filename")
+
+    parser.add_argument(
+        '--root',
+        help="Project root for --compile-commands, only files under it are "
+             "documented, default is its directory")
+
+    parser.add_argument(
+        '--estimate',
+        action='store_true',
+        help="Dry run, build every prompt and print projected tokens and time without calling the model")
+
+    parser.add_argument(
+        '--host',
+        help="Ollama endpoint, default is $OLLAMA_HOST or localhost")
+
+    parser.add_argument(
+        '--keepalive',
+        default=KEEPALIVE,
+        help="How long Ollama keeps the model loaded, default is " + KEEPALIVE)
+
+    parser.add_argument(
+        '--nowarmup',
+        action='store_true',
+        help="Don't load the model in the background while parsing")
+
+    parser.add_argument(
+        '--noreuse',
+        action='store_true',
+        help="Prompt near-duplicate functions in full instead of adapting an existing comment")
+
+    parser.add_argument(
+        '--notemplates',
+        action='store_true',
+        help="Prompt trivial getters, setters, wrappers and stubs instead of using templates")
+
+    cassetteGroup = parser.add_mutually_exclusive_group()
+    cassetteGroup.add_argument(
+        '--record',
+        metavar='DIR',
+        help="Save every model response in this cassette directory")
+    cassetteGroup.add_argument(
+        '--replay',
+        metavar='DIR',
+        help="Answer every query from this cassette directory, no network")
+
+    parser.add_argument(
+        '--maxparallel',
+        type=int,
+        default=MAXPARALLEL,
+        help="Most prompts in flight, the adaptive limit stays below this, default is "
+             + str(MAXPARALLEL))
+
+    parser.add_argument(
+        '--cascade',
+        action='store_true',
+        help="Try the draft model first and escalate on validation failure")
+
+    parser.add_argument(
+        '--draftmodel',
+        default=DRAFTMODEL,
+        help="Draft model for --cascade, default is " + DRAFTMODEL)
+
+    parser.add_argument(
+        '--complexity',
+        type=int,
+        default=CASCADECOMPLEXITY,
+        help="Functions above this complexity skip the draft model, default is "
+             + str(CASCADECOMPLEXITY))
+
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help="Write a cProfile report and a Chrome trace of every stage to ./profiles/")
+
+    parser.add_argument(
+        '--maxtokens',
+        type=int,
+        help="Stop starting functions once this many prompt and generated tokens are expected")
+
+    parser.add_argument(
+        '--maxtime',
+        type=parseDuration,
+        help="Stop starting functions once this wall time is expected, e.g. 900, 45m or 2h")
+
+    parser.add_argument(
+        '--hotfiles',
+        metavar='FILE',
+        help="File listing source files to document first, one per line")
+
+    parser.add_argument(
+        '--resume',
+        metavar='FILE',
+        help="Only document the functions a budgeted run left in this remaining file")
+
+    parser.add_argument(
+        '--shard',
+        type=parseShard,
+        metavar='i/N',
+        help="Only document the functions whose hash falls in shard i of N (i from 0), "
+             "implies -w, merge the shards with sharding.py")
+
+    parser.add_argument(
+        '--outdir',
+        metavar='DIR',
+        help="Write functions here instead of ./newFunctions/<TIME>")
+
     args = parser.parse_args()
+    if args.filename is None and args.compilecommands is None:
+        parser.error("a filename or --compile-commands is required")
+    if args.shard and args.dumb:
+        parser.error("--shard splits functions by hash, the dumb chunker has none")
+
+    budget = None
+    if args.maxtokens is not None or args.maxtime is not None:
+        budget = RunBudget(args.maxtokens, args.maxtime)
+    hotFiles = loadHotFiles(args.hotfiles) if args.hotfiles else None
+    resume = loadRemaining(args.resume) if args.resume else None
+    remaining: list = []
+    shard = args.shard
+    owned: list = [] if shard else None
+    global OUTPUTDIR
+    OUTPUTDIR = args.outdir
 
     chunkSize = args.chunksize
 
-    global verbose 
-    verbose = args.verbose
+    level = args.loglevel or ('debug' if args.verbose else 'quiet' if args.quiet else 'info')
+    configureLogging(level, args.payloadlog)
+    global SHOWPROGRESS
+    SHOWPROGRESS = level != 'quiet'
 
-    verbose = True  # Forcing this to be true for now
+    # Prompts and responses are only built into log lines when they are kept
+    global verbose
+    verbose = args.payloadlog is not None
 
     global write 
-    write = args.write
+    write = args.write or shard is not None
 
     keepComments = args.keepcomments
 
@@ -372,48 +1085,120 @@ def main():
 
     promptFile = args.promptfile
 
+    configureClient(host=args.host, keepAlive=args.keepalive,
+                    connections=args.maxparallel)
+    LIMITER.setMaximum(args.maxparallel)
+
+    cascade = args.cascade
+    DRAFTMODEL = args.draftmodel
+    CASCADECOMPLEXITY = args.complexity
+    REUSECOMMENTS = not args.noreuse
+    TEMPLATES = not args.notemplates
+
+    profileDir = "./profiles/" + str(TIME) if args.profile else None
+    if profileDir:
+        startProfiling()
 
     """
     End Argparse stuff
     """
 
+    if args.record:
+        configureCassette(args.record, 'record')
+    elif args.replay:
+        configureCassette(args.replay, 'replay')
+
+    # Load the model while we read and parse, off the critical path
+    if not args.nowarmup and not args.estimate and not args.replay:
+        warmUp(verbose=verbose)
+        if cascade:
+            warmUp(DRAFTMODEL, verbose)
+
     """
     Globally open files
     """
 
-    with open(textFile, 'r') as file:
-        fileContent = file.read()
-        
     with open(promptFile, 'r') as promptfile:
         promptContent = promptfile.read()
 
+    global prompt
+    prompt = str(promptContent)
+
     global sourceFile
-    sourceFile = textFile
 
-    global text
-    text = str(fileContent)
+    if args.estimate:
+        from runEstimate import estimateRun, formatEstimate
+        if args.compilecommands:
+            from compileCommands import iterTreeFunctions
+            files = iterTreeFunctions(args.compilecommands, args.root, keepComments)
+        else:
+            with open(textFile, 'r') as file:
+                code = file.read()
+            if not keepComments:
+                code = removeComments(code)
+            with span('extract', file=textFile):
+                files = [(textFile, list(iterFunctionRecords(code, textFile)))]
+        if shard:
+            files = ((fileName, list(inShard(funcs, shard))) for fileName, funcs in files)
+        print(formatEstimate(estimateRun(files, prompt, templates=TEMPLATES)))
+        finishProfiling(profileDir)
+        return
+
+    if args.compilecommands:
+        from compileCommands import iterTreeFunctions
+        LOG.info("Using compile commands from %s", args.compilecommands)
+
+        def treeRecords():
+            # Files are read and parsed only as the pipeline asks for more
+            start = time.perf_counter()
+            for sourceFile, funcs in iterTreeFunctions(args.compilecommands,
+                                                       args.root, keepComments):
+                complete('extract', start, time.perf_counter(), file=sourceFile)
+                LOG.debug("%s: %d functions extracted", sourceFile, len(funcs))
+                yield from funcs
+                start = time.perf_counter()
+
+        totalFuncs = promptFuncs(scheduleRecords(treeRecords(), budget, hotFiles,
+                                                 resume, shard, owned),
+                                 budget, remaining)
+        LOG.info("%d functions documented in total", totalFuncs)
+        finishBudget(budget, remaining)
+        finishShard(shard, owned)
+        LOG.info(METRICS.summary())
+        METRICS.save("./metrics/" + str(TIME) + ".json")
+        finishProfiling(profileDir)
+        return
+
+    with open(textFile, 'r') as file:
+        code = file.read()
 
-    global prompt
-    prompt = str(promptContent)
+    sourceFile = textFile
 
     # Remove comments before chunking (default)
     if not keepComments:
-        textNoComments = removeComments(text)
-        code = removeComments(text)
-    else:
-        code = text
+        code = removeComments(code)
 
     if dumbChunker:
-        print("Using dumb chunking, chunk size: ", chunkSize)
+        LOG.info("Using dumb chunking, chunk size: %d", chunkSize)
         chunks = chunkString(code, chunkSize)
-        print("Total Chunks: ", len(chunks))
+        LOG.info("Total Chunks: %d", len(chunks))
         promptDumb(chunks)
 
     else:
-        print("Using smart chunking.")
-        funcs = extractFunctions(code)
-        print(len(funcs), " functions extracted")
-        promptFuncs(funcs)
+        LOG.debug("Using smart chunking.")
+        sourceBytes = code.encode('utf8')
+        del code
+        # Parsed a window at a time as the pipeline asks for more records
+        totalFuncs = promptFuncs(scheduleRecords(iterWindowedRecords(sourceBytes, sourceFile),
+                                                 budget, hotFiles, resume, shard, owned),
+                                 budget, remaining)
+        LOG.info("%d functions documented", totalFuncs)
+        finishBudget(budget, remaining)
+        finishShard(shard, owned)
+
+    LOG.info(METRICS.summary())
+    METRICS.save("./metrics/" + str(TIME) + ".json")
+    finishProfiling(profileDir)
 
 
 
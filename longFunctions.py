@@ -0,0 +1,146 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+"""
+Functions too long for the model's context window once the few-shot prefix
+is added, such as giant ioctl switches and init tables. Their body is split
+into segments at statement boundaries, each segment is summarized on its own
+(map), and the comment is generated from the signature with the summaries
+standing in for the body (reduce).
+"""
+
+# Standard Libraries
+import re
+
+# Local Libraries
+from functionRecord import FunctionRecord, iterFunctionNodes, parseCode
+
+# Roughly one BPE token per short run of letters, digits or punctuation
+TOKENPATTERN = re.compile(r'[A-Za-z]{1,4}|\d{1,3}|[^\sA-Za-z\d]')
+
+# Statements whose children are themselves statements worth splitting between
+SPLITNODES: set = {'compound_statement', 'case_statement', 'switch_statement',
+                   'if_statement', 'else_clause', 'for_statement', 'while_statement',
+                   'do_statement', 'labeled_statement'}
+
+
+def countTokens(text: str) -> int:
+    """
+    Approximate token count, close enough to the model's own for planning.
+    """
+    return len(TOKENPATTERN.findall(text))
+
+
+def functionBody(record: FunctionRecord):
+    """
+    (source bytes, body node) of record's code, None when it doesn't parse
+    to a function definition.
+    """
+    source: bytes = record.code.encode('utf8')
+    node = next(iterFunctionNodes(parseCode(source)), None)
+    body = node.child_by_field_name('body') if node is not None else None
+    if body is None:
+        return None
+    return source, body
+
+
+def signature(record: FunctionRecord) -> str:
+    """
+    The function's code up to its body.
+    """
+    parsed = functionBody(record)
+    if parsed is None:
+        return record.code.split("{", 1)[0].strip()
+    source, body = parsed
+    return source[:body.start_byte].decode('utf8').strip()
+
+
+def statementEnds(node, source: bytes, maxTokens: int) -> list:
+    """
+    End offsets of the pieces node splits into, descending into statements
+    that are too long on their own and cutting at lines as a last resort.
+    """
+    text = source[node.start_byte:node.end_byte].decode('utf8', 'replace')
+    if countTokens(text) <= maxTokens:
+        return [node.end_byte]
+    children = [child for child in node.named_children if child.type != 'comment']
+    if node.type in SPLITNODES and children:
+        ends: list = []
+        for child in children:
+            ends += statementEnds(child, source, maxTokens)
+        # Whatever follows the last child, a closing brace or a while (...)
+        if ends[-1] < node.end_byte:
+            ends.append(node.end_byte)
+        return ends
+    ends = []
+    offset = node.start_byte
+    for line in source[node.start_byte:node.end_byte].split(b"\n"):
+        offset += len(line) + 1
+        ends.append(min(offset, node.end_byte))
+    return ends
+
+
+def bodySegments(record: FunctionRecord, maxTokens: int) -> list:
+    """
+    The body of record, braces left out, in consecutive pieces of at most
+    maxTokens where the syntax allows. Pieces end at the end of a statement,
+    so a switch or if header starts the piece holding its first statement.
+    """
+    parsed = functionBody(record)
+    if parsed is None:
+        return [record.code]
+    source, body = parsed
+    start: int = body.start_byte + 1
+    stop: int = body.end_byte - 1
+    ends: list = []
+    for child in body.named_children:
+        ends += statementEnds(child, source, maxTokens)
+
+    segments: list = []
+    segmentStart = start
+    previous = None
+    for end in ends + [stop]:
+        end = min(max(end, segmentStart), stop)
+        if previous is not None and previous > segmentStart and \
+                countTokens(source[segmentStart:end].decode('utf8', 'replace')) > maxTokens:
+            segments.append(source[segmentStart:previous].decode('utf8', 'replace'))
+            segmentStart = previous
+        previous = end
+    if stop > segmentStart:
+        segments.append(source[segmentStart:stop].decode('utf8', 'replace'))
+    return [segment.strip("\n") for segment in segments if segment.strip()]
+
+
+def summaryStub(record: FunctionRecord, summaries: list) -> str:
+    """
+    The function with its body replaced by the segment summaries, what the
+    model documents in place of code that doesn't fit.
+    """
+    lines: list = [signature(record), "{"]
+    for number, summary in enumerate(summaries, start=1):
+        text = " ".join(summary.replace("*/", "").split())
+        lines.append(f"\t/* Part {number} of {len(summaries)}: {text} */")
+    lines.append("}")
+    return "\n".join(lines)
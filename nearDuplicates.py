@@ -0,0 +1,206 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+"""
+Near-duplicate detection for functions that have already been documented.
+Per-arch variants and copy-pasted driver ops differ in a constant or a type
+name, so functionHash never matches them. Each function is reduced to
+shingles of its normalized tokens (its own name and parameters become
+placeholders, literals collapse) and a MinHash signature. Signatures are
+banded into an LSH index, so finding candidates costs a few dict lookups
+instead of a comparison with every documented function.
+
+A match whose code differs only in the function and parameter names gets
+the existing comment with the names substituted. Anything else is a
+candidate for a short "adapt this comment" request.
+
+The index holds at most MAXENTRIES functions, so memory stays flat over a
+whole tree. Beyond that the one that went longest without a match goes.
+"""
+
+# Standard Libraries
+import hashlib
+import random
+import re
+import threading
+from collections import OrderedDict
+
+# Local Libraries
+from functionRecord import FunctionRecord
+
+SHINGLESIZE = 4             # Tokens per shingle
+NUMPERMUTATIONS = 64        # MinHash signature length
+BANDS = 16                  # LSH bands of NUMPERMUTATIONS / BANDS rows each
+SIMILARITY = 0.8            # Estimated Jaccard similarity that counts as a match
+MAXENTRIES = 10000          # Documented functions kept, least recently matched evicted
+MERSENNEPRIME = (1 << 61) - 1
+
+CTOKENPATTERN = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|[A-Za-z_]\w*|\d[\w.]*|->|\S')
+
+# After these a name is a member or a tag, not the parameter it shadows
+NOTVARIABLE: set = {'->', '.', 'struct', 'union', 'enum'}
+
+_random = random.Random(0x1a3ac00f)
+PERMUTATIONS: list = [(_random.randrange(1, MERSENNEPRIME), _random.randrange(MERSENNEPRIME))
+                      for _ in range(NUMPERMUTATIONS)]
+
+
+def normalizedTokens(record: FunctionRecord, literals: bool = False) -> list:
+    """
+    The tokens of a function with its name and parameters replaced by
+    placeholders, members and struct tags of the same name are left alone.
+    Number, string and character literals collapse to one token each unless
+    literals is True.
+    """
+    placeholders: dict = {record.name: "$F"}
+    for index, name in enumerate(record.parameterNames):
+        placeholders[name] = f"$P{index}"
+    tokens: list = []
+    for token in CTOKENPATTERN.findall(record.code):
+        if token in placeholders and not (tokens and tokens[-1] in NOTVARIABLE):
+            token = placeholders[token]
+        elif not literals and (token[0].isdigit() or token[0] in "\"'"):
+            token = "$L"
+        tokens.append(token)
+    return tokens
+
+
+def minHash(tokens: list) -> tuple:
+    """
+    MinHash signature of the token shingles.
+    """
+    shingles: set = {" ".join(tokens[i:i + SHINGLESIZE])
+                     for i in range(max(1, len(tokens) - SHINGLESIZE + 1))}
+    values: list = [int.from_bytes(hashlib.blake2b(s.encode('utf8'), digest_size=8).digest(), 'little')
+                    for s in shingles]
+    return tuple(min((a * v + b) % MERSENNEPRIME for v in values)
+                 for a, b in PERMUTATIONS)
+
+
+def similarity(first: tuple, second: tuple) -> float:
+    """
+    Estimated Jaccard similarity of two signatures.
+    """
+    return sum(x == y for x, y in zip(first, second)) / NUMPERMUTATIONS
+
+
+def exactKey(record: FunctionRecord) -> bytes:
+    """
+    Digest of the function with only its names abstracted, equal keys mean
+    the functions differ in nothing but the function and parameter names.
+    """
+    return hashlib.blake2b(" ".join(normalizedTokens(record, literals=True)).encode('utf8'),
+                           digest_size=16).digest()
+
+
+def substituteNames(comment: str, function: tuple, parameters: dict) -> str:
+    """
+    Swap names in comment in one pass, so swapped parameter names don't
+    clobber each other. function is the (old, new) function name, replaced
+    as a whole word. Parameters are only replaced as @name, the way
+    kernel-doc refers to them, since short ones like "mode" or "len" are
+    also ordinary words.
+    """
+    names: dict = {'@' + old: '@' + new for old, new in parameters.items()}
+    names[function[0]] = function[1]
+    pattern = re.compile('|'.join(r'(?<![\w@])' + re.escape(old) + r'\b'
+                                  for old in sorted(names, key=len, reverse=True)))
+    return pattern.sub(lambda match: names[match.group(0)], comment)
+
+
+class NearDuplicateIndex:
+    """
+    Thread safe LSH index of documented functions and their comments. Only
+    the names, digests, signature and comment are kept, not the code, and
+    only for the maxEntries functions matched or added most recently.
+    """
+
+    def __init__(self, maxEntries: int = MAXENTRIES):
+        self.lock = threading.Lock()
+        self.maxEntries = maxEntries
+        self.entries: OrderedDict = OrderedDict()
+        self.buckets: dict = {}
+        self.added: int = 0
+
+    def bands(self, signature: tuple):
+        rows = NUMPERMUTATIONS // BANDS
+        for band in range(BANDS):
+            yield band, signature[band * rows:(band + 1) * rows]
+
+    def add(self, record: FunctionRecord, comment: str) -> None:
+        signature = minHash(normalizedTokens(record))
+        entry = (record.name, record.parameterNames, exactKey(record), comment, signature)
+        with self.lock:
+            number = self.added
+            self.added += 1
+            self.entries[number] = entry
+            for key in self.bands(signature):
+                self.buckets.setdefault(key, set()).add(number)
+            while len(self.entries) > self.maxEntries:
+                self.evict()
+
+    def evict(self) -> None:
+        """
+        Drop the least recently matched entry, the caller holds the lock.
+        """
+        number, entry = self.entries.popitem(last=False)
+        for key in self.bands(entry[4]):
+            bucket: set = self.buckets[key]
+            bucket.discard(number)
+            if not bucket:
+                del self.buckets[key]
+
+    def query(self, record: FunctionRecord) -> tuple:
+        """
+        The comment of the most similar documented function as (comment,
+        similarity, substituted), or None when nothing reaches SIMILARITY.
+        substituted is the comment with record's names swapped in when the
+        two functions differ only in names, otherwise None.
+        """
+        signature = minHash(normalizedTokens(record))
+        best = None
+        with self.lock:
+            candidates: set = set()
+            for key in self.bands(signature):
+                candidates.update(self.buckets.get(key, ()))
+            for number in candidates:
+                score = similarity(signature, self.entries[number][4])
+                if score >= SIMILARITY and (best is None or score > best[0]):
+                    best = (score, number, self.entries[number])
+            if best is not None:
+                # Matched, so it is worth keeping
+                self.entries.move_to_end(best[1])
+        if best is None:
+            return None
+        score, _, (name, parameterNames, key, comment, _) = best
+        substituted = None
+        if key == exactKey(record) and len(parameterNames) == len(record.parameterNames):
+            substituted = substituteNames(comment, (name, record.name),
+                                          dict(zip(parameterNames, record.parameterNames)))
+        return comment, score, substituted
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.entries)
@@ -0,0 +1,171 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+"""
+Bounded three stage pipeline. The calling thread pulls items from a lazy
+iterable (reading and extracting), worker threads process them (prompt, LLM
+and validate) and one thread consumes the results (write). The stages are
+joined by queues of fixed depth, so a stage that falls behind blocks the one
+feeding it and only a bounded number of functions and responses are held at
+any time, however large the corpus.
+"""
+
+# Standard Libraries
+import queue
+import threading
+
+_DONE = object()
+
+
+def runPipeline(items, process, consume, workers: int, depth: int = None) -> int:
+    """
+    Run process(item) on workers threads and consume(item, result) on a
+    single thread, in completion order, for every item of the iterable.
+    At most depth items wait for a worker and depth results wait to be
+    consumed, by default twice the number of workers.
+
+    The first exception raised by any stage stops the pipeline, the stages
+    drain without doing further work and the exception is raised here.
+    Returns how many items were consumed.
+    """
+    depth = depth or 2 * workers
+    inbox: queue.Queue = queue.Queue(maxsize=depth)
+    outbox: queue.Queue = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    errors: list = []
+    consumed: list = [0]
+
+    def fail(error: BaseException) -> None:
+        errors.append(error)
+        stop.set()
+
+    def work() -> None:
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                break
+            if stop.is_set():
+                continue
+            try:
+                result = process(item)
+            except BaseException as e:
+                fail(e)
+                continue
+            outbox.put((item, result))
+        outbox.put(_DONE)
+
+    def drain() -> None:
+        finished = 0
+        while finished < workers:
+            entry = outbox.get()
+            if entry is _DONE:
+                finished += 1
+                continue
+            if stop.is_set():
+                continue
+            try:
+                consume(*entry)
+                consumed[0] += 1
+            except BaseException as e:
+                fail(e)
+
+    threads: list = [threading.Thread(target=work, daemon=True) for _ in range(workers)]
+    threads.append(threading.Thread(target=drain, daemon=True))
+    for thread in threads:
+        thread.start()
+
+    try:
+        for item in items:
+            if stop.is_set():
+                break
+            inbox.put(item)
+    except BaseException as e:
+        fail(e)
+    finally:
+        for _ in range(workers):
+            inbox.put(_DONE)
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+    return consumed[0]
+
+
+def runLanes(items, divert, process, consume, workers: int, sideWorkers: int,
+             depth: int = None) -> int:
+    """
+    runPipeline with a side lane. Items for which divert(item) is true go
+    through a second pipeline of sideWorkers threads, so a few slow items
+    can't take every worker and hold up the rest. Diverted items wait in an
+    unbounded queue, divert only the few that need it. consume is still
+    called one result at a time. Returns how many items were consumed in
+    both lanes.
+    """
+    side: queue.Queue = queue.Queue()
+    consumeLock = threading.Lock()
+    abandon = threading.Event()
+    sideResult: list = [0, None]
+
+    def consumeOne(item, result) -> None:
+        with consumeLock:
+            consume(item, result)
+
+    def sideItems():
+        while True:
+            item = side.get()
+            if item is _DONE or abandon.is_set():
+                return
+            yield item
+
+    def runSide() -> None:
+        try:
+            sideResult[0] = runPipeline(sideItems(), process, consumeOne, sideWorkers, depth)
+        except BaseException as e:
+            sideResult[1] = e
+
+    def mainItems():
+        for item in items:
+            if sideResult[1] is not None:
+                return
+            if divert(item):
+                side.put(item)
+            else:
+                yield item
+
+    thread = threading.Thread(target=runSide, daemon=True)
+    thread.start()
+    try:
+        count = runPipeline(mainItems(), process, consumeOne, workers, depth)
+    except BaseException:
+        abandon.set()
+        raise
+    finally:
+        side.put(_DONE)
+        thread.join()
+
+    if sideResult[1] is not None:
+        raise sideResult[1]
+    return count + sideResult[0]
@@ -0,0 +1,184 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+"""
+Profiling for --profile. Every stage of a function's life (extract, prompt,
+queue, llm, validate, write, splice) is wrapped in span(), which records a
+Chrome trace event when profiling is on and does nothing otherwise. The
+trace loads in Perfetto (ui.perfetto.dev) or chrome://tracing, one track per
+thread. cProfile runs alongside, on the main thread where reading,
+extraction and splicing happen and on every thread started meanwhile, where
+the pipeline generates prompts, validates, repairs and renders templates.
+The per thread profiles are merged and saved as pstats plus a text report.
+"""
+
+# Standard Libraries
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class NullTracer:
+    """
+    Tracer used when profiling is off, every span is free.
+    """
+
+    def span(self, name: str, **args):
+        return nullcontext()
+
+    def complete(self, name: str, start: float, end: float, **args) -> None:
+        pass
+
+    def events(self) -> list:
+        return []
+
+
+class Tracer:
+    """
+    Collects complete ("X") trace events. Times are perf_counter seconds,
+    stored as microseconds since the tracer started.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started: float = time.perf_counter()
+        self.pid: int = os.getpid()
+        self.traceEvents: list = []
+
+    @contextmanager
+    def span(self, name: str, **args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.complete(name, start, time.perf_counter(), **args)
+
+    def complete(self, name: str, start: float, end: float, **args) -> None:
+        """
+        Record a span that has already finished, for stages that are only
+        known once the next one starts, like time spent queued.
+        """
+        event: dict = {'name': name, 'cat': 'docgen', 'ph': 'X',
+                       'ts': (start - self.started) * 1e6,
+                       'dur': (end - start) * 1e6,
+                       'pid': self.pid, 'tid': threading.get_ident()}
+        if args:
+            event['args'] = args
+        with self.lock:
+            self.traceEvents.append(event)
+
+    def events(self) -> list:
+        with self.lock:
+            return list(self.traceEvents)
+
+
+_tracer = NullTracer()
+_profiler = None
+_threadProfilers: list = []
+_threadLock = threading.Lock()
+
+
+def span(name: str, **args):
+    """
+    Context manager timing one stage, args show up in the trace viewer.
+    """
+    return _tracer.span(name, **args)
+
+
+def complete(name: str, start: float, end: float, **args) -> None:
+    _tracer.complete(name, start, end, **args)
+
+
+def profileThread(frame, event, arg) -> None:
+    """
+    threading.setprofile hook, gives every thread started while profiling
+    is on a cProfile of its own, since a profiler only sees the thread that
+    enabled it. Where cProfile is process wide (3.12 on) the profiler of the
+    main thread already sees this one and enable refuses a second.
+    """
+    sys.setprofile(None)
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        return
+    with _threadLock:
+        _threadProfilers.append(profiler)
+
+
+def startProfiling() -> None:
+    """
+    Turn on span tracing, and cProfile for the calling thread and every
+    thread it starts from now on.
+    """
+    global _tracer, _profiler
+    _tracer = Tracer()
+    _profiler = cProfile.Profile()
+    _profiler.enable()
+    threading.setprofile(profileThread)
+
+
+def stopProfiling(directory: str) -> list:
+    """
+    Stop profiling and write the results to directory: trace.json for
+    Perfetto, cpu.prof for pstats/snakeviz and cpu.txt with the top functions
+    by cumulative time, both over all profiled threads. Returns the paths
+    written.
+    """
+    global _tracer, _profiler
+    threading.setprofile(None)
+    os.makedirs(directory, exist_ok=True)
+    paths: list = []
+
+    tracePath = os.path.join(directory, "trace.json")
+    with open(tracePath, 'w') as file:
+        json.dump({'traceEvents': _tracer.events(), 'displayTimeUnit': 'ms'}, file)
+    paths.append(tracePath)
+
+    if _profiler is not None:
+        _profiler.disable()
+        report = io.StringIO()
+        stats = pstats.Stats(_profiler, stream=report)
+        with _threadLock:
+            for profiler in _threadProfilers:
+                stats.add(profiler)
+            _threadProfilers.clear()
+        profPath = os.path.join(directory, "cpu.prof")
+        stats.dump_stats(profPath)
+        stats.sort_stats('cumulative').print_stats(40)
+        textPath = os.path.join(directory, "cpu.txt")
+        with open(textPath, 'w') as file:
+            file.write(report.getvalue())
+        paths += [profPath, textPath]
+
+    _tracer = NullTracer()
+    _profiler = None
+    return paths
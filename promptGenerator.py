@@ -25,17 +25,30 @@
 
 import re
 
-def generate(function: str, promptText: str) -> str:
+from functionRecord import functionRecord
+
+def generate(function, promptText: str) -> str:
+    """
+    Build the comment skeleton for a function, a FunctionRecord or its code,
+    followed by the prompt text. Names come from the record, code that does
+    not parse falls back to splitting the text on parentheses.
+    """
     specialCharacters: str = "*&@"
     prompt: str = "/**\n" 
-    code = function 
-    codeArguments: list = re.split(r'[\(\)]+', code)
-    functionArguments: list = codeArguments[1].split(",")
+    record = functionRecord(function)
+    if record is not None:
+        functionName: str = record.name
+        functionArguments: list = list(record.parameterNames)
+    else:
+        code = function 
+        codeArguments: list = re.split(r'[\(\)]+', code)
+        functionArguments: list = codeArguments[1].split(",")
+
+        functionName: str = codeArguments[0].split(" ")[-1]
+        if any(c in specialCharacters for c in functionName):
+            functionName = functionName[1:]
     numArguments: int = len(functionArguments)
 
-    functionName: str = codeArguments[0].split(" ")[-1]
-    if any(c in specialCharacters for c in functionName):
-        functionName = functionName[1:]
     prompt = prompt + "* " + functionName + " - description of the function\n"
     for argument in functionArguments:
         argument: list = argument.split(" ")
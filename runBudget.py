@@ -0,0 +1,180 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+"""
+Token and wall clock budgets for a run. Functions are put in priority order
+(functions in the hot files first, then exported before static, then the
+largest first) and started while the budget lasts. The check is made by
+the worker about to query the model, not when the function is extracted,
+and functions documented without the model (templates, substituted
+comments) never touch the budget. Each function that queries reserves its
+estimated cost until it finishes, so the functions in flight count against
+the budget before their usage is known. Whatever was never started is written to a remaining file that --resume
+picks up in a later run.
+"""
+
+# Standard Libraries
+import json
+import os
+import re
+import threading
+import time
+
+# Local Libraries
+from functionRecord import FunctionRecord
+from runMetrics import METRICS, RunMetrics
+
+DURATIONPATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([smh]?)\s*$')
+DURATIONUNITS: dict = {'': 1, 's': 1, 'm': 60, 'h': 3600}
+
+
+def parseDuration(text: str) -> float:
+    """
+    Seconds in "90", "90s", "45m" or "1.5h".
+    """
+    match = DURATIONPATTERN.match(text)
+    if match is None:
+        raise ValueError(f"not a duration: {text!r}")
+    return float(match.group(1)) * DURATIONUNITS[match.group(2)]
+
+
+def isExported(record: FunctionRecord) -> bool:
+    """
+    False for static functions, the storage class comes before the name.
+    """
+    head: str = record.code.split("(", 1)[0]
+    return re.search(r'\bstatic\b', head) is None
+
+
+def priorityKey(record: FunctionRecord, hotFiles: set = frozenset()) -> tuple:
+    """
+    Sort key putting hot files first, then exported functions, then the
+    largest.
+    """
+    return (record.fileName not in hotFiles, not isExported(record), -len(record.code))
+
+
+def prioritize(records, hotFiles: set = frozenset()) -> list:
+    """
+    All records in priority order. Sorting needs every record at once, so
+    this gives up the bounded memory of streaming extraction.
+    """
+    return sorted(records, key=lambda record: priorityKey(record, hotFiles))
+
+
+def loadHotFiles(path: str) -> set:
+    """
+    File names, one per line as they appear in the run, # starts a comment.
+    """
+    with open(path, 'r') as file:
+        return {line.split("#", 1)[0].strip() for line in file} - {""}
+
+
+class BudgetExhausted(Exception):
+    """
+    Raised for a function the budget won't start, the message is the
+    budget's stopReason.
+    """
+
+
+class RunBudget:
+    """
+    Limits on tokens (prompt plus generated) and wall seconds, either may be
+    None. metrics says what has been used, reserved what the functions in
+    flight are expected to use on top of that.
+    """
+
+    def __init__(self, maxTokens: int = None, maxSeconds: float = None,
+                 metrics: RunMetrics = METRICS):
+        self.metrics = metrics
+        self.maxTokens = maxTokens
+        self.maxSeconds = maxSeconds
+        self.started: float = time.perf_counter()
+        self.lock = threading.Condition()
+        self.reserved: float = 0.0
+        self.finished: int = 0
+        self.stopReason: str = None
+
+    def reserve(self, estimate: float) -> float:
+        """
+        Reserve the tokens of a function about to be started, estimate or
+        the average a finished function used if that is more. Returns the
+        amount to settle() once the function is done, None when the budget
+        can't start it. When it would only fit once functions in flight are
+        done, this waits for them to settle rather than stopping the run.
+        Once refused, always refused.
+        """
+        with self.lock:
+            while True:
+                if self.stopReason is not None:
+                    return None
+                totals: dict = self.metrics.totals()
+                if self.finished:
+                    # Counts the calls of functions still in flight as well,
+                    # so it errs on the high side
+                    estimate = max(estimate, totals['tokens'] / self.finished)
+                if self.maxTokens is not None and totals['tokens'] + estimate > self.maxTokens:
+                    self.stopReason = f"token budget of {self.maxTokens} reached"
+                if self.maxSeconds is not None and self.stopReason is None:
+                    calls: int = max(1, totals['calls'])
+                    expected = time.perf_counter() - self.started + totals['seconds'] / calls
+                    if expected > self.maxSeconds:
+                        self.stopReason = f"time budget of {self.maxSeconds:.0f}s reached"
+                if self.stopReason is not None:
+                    return None
+                if self.maxTokens is None or \
+                        totals['tokens'] + self.reserved + estimate <= self.maxTokens:
+                    self.reserved += estimate
+                    return estimate
+                self.lock.wait()
+
+    def settle(self, reservation: float) -> None:
+        """
+        Release the reservation of a finished function, its calls are in
+        metrics by now.
+        """
+        with self.lock:
+            self.reserved -= reservation
+            self.finished += 1
+            self.lock.notify_all()
+
+
+def writeRemaining(path: str, remaining: list, reason: str) -> None:
+    """
+    Record the functions a run never started, for --resume.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    entries: list = [{'file': record.fileName, 'name': record.name, 'hash': record.hash}
+                     for record in remaining]
+    with open(path, 'w') as file:
+        json.dump({'reason': reason, 'functions': entries}, file, indent=2)
+
+
+def loadRemaining(path: str) -> set:
+    """
+    Hashes of the functions left by an earlier run.
+    """
+    with open(path, 'r') as file:
+        return {entry['hash'] for entry in json.load(file)['functions']}
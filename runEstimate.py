@@ -0,0 +1,145 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+"""
+Dry run cost and time estimate. Extracts functions and builds every prompt
+exactly as a real run would, but never calls the model. Input tokens are
+counted per function, output tokens are estimated from the parameter count
+and calibrated against earlier runs, and the throughput measured in
+metrics/ turns that into a projected wall time.
+
+    python lamacoopDocgen.py ftrace.c prompt.txt --estimate
+"""
+
+# Local Libraries
+from lamacoopDocgen import MODEL, contextMessages
+from promptGenerator import generate
+from runMetrics import loadPreviousRuns
+from templateComments import classify
+from longFunctions import countTokens
+from runLog import formatSeconds
+
+OUTPUTBASE = 150            # Tokens for the title, expectations and return
+OUTPUTPERPARAM = 30         # Tokens per @param line and its expectations
+DEFAULTPROMPTRATE = 500.0   # Prompt tokens per second with no history
+DEFAULTEVALRATE = 30.0      # Generated tokens per second with no history
+
+
+def measuredRates(model: str = MODEL, metricsDir: str = "./metrics") -> dict:
+    """
+    Prompt and generation throughput for model over all saved runs, and how
+    much faster than serial the runs were thanks to parallel prompts.
+    Falls back to the defaults for anything never measured.
+    """
+    totals: dict = {'calls': 0, 'promptTokens': 0, 'evalTokens': 0,
+                    'promptSeconds': 0.0, 'evalSeconds': 0.0}
+    modelSeconds = 0.0
+    wallSeconds = 0.0
+    for run in loadPreviousRuns(metricsDir):
+        stats: dict = run.get('models', {}).get(model)
+        if not stats:
+            continue
+        for key in totals:
+            totals[key] += stats.get(key, 0)
+        if run.get('wallSeconds'):
+            modelSeconds += sum(m.get('seconds', 0) for m in run['models'].values())
+            wallSeconds += run['wallSeconds']
+
+    return {
+        'runs': totals['calls'] > 0,
+        'promptRate': (totals['promptTokens'] / totals['promptSeconds']
+                       if totals['promptSeconds'] else DEFAULTPROMPTRATE),
+        'evalRate': (totals['evalTokens'] / totals['evalSeconds']
+                     if totals['evalSeconds'] else DEFAULTEVALRATE),
+        'meanOutput': (totals['evalTokens'] / totals['calls']
+                       if totals['calls'] else None),
+        'parallelism': max(1.0, modelSeconds / wallSeconds) if wallSeconds else 1.0,
+    }
+
+
+def estimateRun(files, prompt: str, model: str = MODEL,
+                metricsDir: str = "./metrics", templates: bool = True) -> dict:
+    """
+    Estimate a run over files, an iterable of (fileName, FunctionRecords) pairs.
+    Returns per file rows and totals of functions, trivial functions left to
+    templates, input and output tokens and projected seconds. A run queries
+    every other function, responses of earlier runs are never reused, so
+    none are left out here either.
+    """
+    contextTokens: int = sum(countTokens(m['content']) for m in contextMessages())
+    rates: dict = measuredRates(model, metricsDir)
+
+    rows: list = []
+    for fileName, funcs in files:
+        row: dict = {'file': fileName, 'functions': 0, 'templated': 0,
+                     'inputTokens': 0, 'outputTokens': 0}
+        for record in funcs:
+            row['functions'] += 1
+            if templates and classify(record) is not None:
+                row['templated'] += 1
+                continue
+            currentPrompt = generate(record, prompt)
+            row['inputTokens'] += contextTokens + countTokens(currentPrompt + "\n" + record.code)
+            row['outputTokens'] += OUTPUTBASE + OUTPUTPERPARAM * len(record.parameterNames)
+        rows.append(row)
+
+    # Scale the parameter based guess to what the model really produced before
+    guessed = sum(r['outputTokens'] for r in rows)
+    prompted = sum(r['functions'] - r['templated'] for r in rows)
+    if rates['meanOutput'] and guessed:
+        scale = rates['meanOutput'] * prompted / guessed
+        for row in rows:
+            row['outputTokens'] = int(row['outputTokens'] * scale)
+
+    for row in rows:
+        row['seconds'] = (row['inputTokens'] / rates['promptRate']
+                          + row['outputTokens'] / rates['evalRate']) / rates['parallelism']
+
+    totals: dict = {key: sum(r[key] for r in rows)
+                    for key in ('functions', 'templated', 'inputTokens', 'outputTokens',
+                                'seconds')}
+    return {'model': model, 'rates': rates, 'files': rows, 'totals': totals}
+
+
+def formatEstimate(estimate: dict) -> str:
+    """
+    Table of the estimate, one line per file and a total.
+    """
+    rates: dict = estimate['rates']
+    lines: list = [
+        f"Estimate for {estimate['model']} "
+        + ("from measured throughput" if rates['runs'] else "from default throughput, no earlier runs in metrics/")
+        + f": {rates['promptRate']:.0f} prompt tok/s, {rates['evalRate']:.1f} "
+        f"generated tok/s, {rates['parallelism']:.1f}x parallel",
+        f"{'file':40} {'funcs':>6} {'templ':>6} {'input':>10} "
+        f"{'output':>9} {'time':>9}",
+    ]
+    for row in estimate['files'] + [dict(estimate['totals'], file="total")]:
+        lines.append(f"{row['file'][-40:]:40} {row['functions']:6} "
+                     f"{row['templated']:6} "
+                     f"{row['inputTokens']:10} {row['outputTokens']:9} "
+                     f"{formatSeconds(row['seconds']):>9}")
+    return "\n".join(lines)
+
@@ -0,0 +1,171 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+"""
+Logging and the live progress line. LOG carries what a run is doing at
+three levels (quiet shows warnings only, info the run summary, debug every
+decision). Full prompts and responses are far too large for the terminal
+and go to PAYLOADLOG, which writes to a file only when one is given.
+
+Progress keeps one line on stderr up to date with functions finished out
+of those extracted so far, the recent throughput and an ETA once the total
+is known. It redraws at most every REDRAWSECONDS, so it costs nothing
+next to a query.
+"""
+
+# Standard Libraries
+import collections
+import logging
+import sys
+import threading
+import time
+
+LOG = logging.getLogger('lamacoop')
+PAYLOADLOG = logging.getLogger('lamacoop.payload')
+
+LEVELS: dict = {'quiet': logging.WARNING, 'info': logging.INFO, 'debug': logging.DEBUG}
+REDRAWSECONDS = 0.5         # Least time between redraws of the progress line
+LOGSECONDS = 30             # Between progress lines when stderr isn't a terminal
+RATEWINDOW = 60             # Seconds of history the throughput is measured over
+
+
+class LineFormatter(logging.Formatter):
+    """
+    Clears the progress line first, so log lines don't land on top of it.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        return "\r\x1b[K" + super().format(record)
+
+
+def configureLogging(level: str = 'info', payloadFile: str = None,
+                     stream=None) -> None:
+    """
+    Send LOG to stream (stderr by default) at level, one of LEVELS, and the
+    payload dumps to payloadFile. Without payloadFile they are dropped.
+    """
+    stream = stream or sys.stderr
+    handler = logging.StreamHandler(stream)
+    debug = LEVELS[level] <= logging.DEBUG
+    pattern = "%(asctime)s %(threadName)s %(levelname)s %(message)s" if debug else "%(message)s"
+    handler.setFormatter(LineFormatter(pattern) if stream.isatty() else logging.Formatter(pattern))
+    LOG.handlers = [handler]
+    LOG.setLevel(LEVELS[level])
+    LOG.propagate = False
+
+    PAYLOADLOG.propagate = False
+    if payloadFile:
+        payloadHandler = logging.FileHandler(payloadFile, mode='w')
+        payloadHandler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        PAYLOADLOG.handlers = [payloadHandler]
+        PAYLOADLOG.setLevel(logging.DEBUG)
+    else:
+        PAYLOADLOG.handlers = [logging.NullHandler()]
+        PAYLOADLOG.setLevel(logging.CRITICAL + 1)
+
+
+def formatSeconds(seconds: float) -> str:
+    hours, rest = divmod(int(seconds), 3600)
+    return f"{hours}:{rest // 60:02}:{rest % 60:02}"
+
+
+class Progress:
+    """
+    Thread safe progress of a run whose total may only become known as the
+    functions are extracted.
+    """
+
+    def __init__(self, total: int = None, stream=None, enabled: bool = True):
+        self.stream = stream or sys.stderr
+        self.enabled = enabled
+        self.tty: bool = self.stream.isatty()
+        self.lock = threading.Lock()
+        self.found: int = total or 0
+        self.totalKnown: bool = total is not None
+        self.done: int = 0
+        self.started: float = time.perf_counter()
+        self.drawn: float = 0.0
+        self.samples: collections.deque = collections.deque([(self.started, 0)])
+
+    def discover(self, count: int = 1) -> None:
+        """
+        count more functions were extracted.
+        """
+        with self.lock:
+            if not self.totalKnown:
+                self.found += count
+
+    def allDiscovered(self) -> None:
+        with self.lock:
+            self.totalKnown = True
+
+    def advance(self, count: int = 1) -> None:
+        """
+        count more functions were finished.
+        """
+        with self.lock:
+            self.done += count
+            now = time.perf_counter()
+            self.samples.append((now, self.done))
+            while len(self.samples) > 2 and self.samples[1][0] < now - RATEWINDOW:
+                self.samples.popleft()
+            if self.enabled and now - self.drawn >= (REDRAWSECONDS if self.tty else LOGSECONDS):
+                self.drawn = now
+                self.draw(self.line())
+
+    def rate(self) -> float:
+        """
+        Functions per second over the last RATEWINDOW seconds.
+        """
+        (first, firstDone), (last, lastDone) = self.samples[0], self.samples[-1]
+        return (lastDone - firstDone) / (last - first) if last > first else 0.0
+
+    def line(self) -> str:
+        rate = self.rate()
+        total = f"{self.found}" if self.totalKnown else f"{self.found}+"
+        text = f"{self.done}/{total} functions, {rate:.2f}/s"
+        if self.totalKnown and rate > 0:
+            text += ", ETA " + formatSeconds((self.found - self.done) / rate)
+        return text
+
+    def draw(self, text: str) -> None:
+        if self.tty:
+            self.stream.write("\r\x1b[K" + text)
+        else:
+            self.stream.write(text + "\n")
+        self.stream.flush()
+
+    def close(self) -> None:
+        """
+        Draw the final state and end the line.
+        """
+        with self.lock:
+            if not self.enabled:
+                return
+            self.draw(f"{self.done} functions in "
+                      + formatSeconds(time.perf_counter() - self.started))
+            if self.tty:
+                self.stream.write("\n")
+                self.stream.flush()
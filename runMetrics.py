@@ -0,0 +1,192 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+"""
+Run metrics. callAI records every query here and the cascade records which
+tier answered each function. At the end of a run the summary is printed and
+saved as JSON under metrics/ so later runs can compare against it.
+"""
+
+# Standard Libraries
+import glob
+import json
+import os
+import threading
+import time
+
+
+class RunMetrics:
+    """
+    Thread safe counters for one run, grouped per model and per cascade tier.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started: float = time.perf_counter()
+        self.models: dict = {}
+        self.tiers: dict = {}
+        self.shortcuts: dict = {}
+        self.limiter = None
+
+    def reset(self) -> None:
+        """
+        Forget everything recorded so far and restart the wall clock.
+        """
+        with self.lock:
+            self.started = time.perf_counter()
+            self.models = {}
+            self.tiers = {}
+            self.shortcuts = {}
+
+    def recordCall(self, model: str, seconds: float, response=None) -> None:
+        """
+        Record one query. response is the ollama ChatResponse, or None when the
+        query failed.
+        """
+        with self.lock:
+            stats = self.models.setdefault(model, {
+                'calls': 0, 'failures': 0, 'seconds': 0.0,
+                'promptTokens': 0, 'evalTokens': 0, 'loadSeconds': 0.0,
+                'promptSeconds': 0.0, 'evalSeconds': 0.0, 'truncated': 0})
+            stats['calls'] += 1
+            stats['seconds'] += seconds
+            if response is None:
+                stats['failures'] += 1
+                return
+            stats['promptTokens'] += response.prompt_eval_count or 0
+            stats['evalTokens'] += response.eval_count or 0
+            stats['loadSeconds'] += (response.load_duration or 0) / 1e9
+            stats['promptSeconds'] += (response.prompt_eval_duration or 0) / 1e9
+            stats['evalSeconds'] += (response.eval_duration or 0) / 1e9
+            # Stopped by num_predict rather than the end of the comment
+            stats['truncated'] += int(getattr(response, 'done_reason', None) == 'length')
+
+    def totals(self) -> dict:
+        """
+        Calls, tokens (prompt and generated) and model seconds over all models.
+        """
+        with self.lock:
+            return {'calls': sum(m['calls'] for m in self.models.values()),
+                    'tokens': sum(m['promptTokens'] + m['evalTokens']
+                                  for m in self.models.values()),
+                    'seconds': sum(m['seconds'] for m in self.models.values())}
+
+    def recordTier(self, tier: str, passed: bool, seconds: float) -> None:
+        """
+        Record one cascade attempt at a tier and whether its output passed.
+        """
+        with self.lock:
+            stats = self.tiers.setdefault(tier, {'attempts': 0, 'passed': 0, 'seconds': 0.0})
+            stats['attempts'] += 1
+            stats['passed'] += int(passed)
+            stats['seconds'] += seconds
+
+    def recordShortcut(self, kind: str) -> None:
+        """
+        Count a function documented without a full generation, kind says how.
+        """
+        with self.lock:
+            self.shortcuts[kind] = self.shortcuts.get(kind, 0) + 1
+
+    def watchLimiter(self, limiter) -> None:
+        """
+        Report the state of an AdaptiveLimiter with the rest of the metrics.
+        """
+        self.limiter = limiter
+
+    def timeSaved(self) -> float:
+        """
+        Estimated seconds the cascade saved: every accepted draft would have
+        cost an average large model call, minus all the time spent drafting.
+        Returns None until a large model call gives us something to compare to.
+        """
+        with self.lock:
+            draft = self.tiers.get('draft')
+            large = [self.tiers[t] for t in ('escalated', 'complex') if t in self.tiers]
+            largeAttempts = sum(t['attempts'] for t in large)
+            if draft is None or largeAttempts == 0:
+                return None
+            largeMean = sum(t['seconds'] for t in large) / largeAttempts
+            return draft['passed'] * largeMean - draft['seconds']
+
+    def asDict(self) -> dict:
+        with self.lock:
+            result = {'models': json.loads(json.dumps(self.models)),
+                      'tiers': json.loads(json.dumps(self.tiers)),
+                      'shortcuts': dict(self.shortcuts)}
+        result['timeSaved'] = self.timeSaved()
+        result['wallSeconds'] = time.perf_counter() - self.started
+        if self.limiter is not None:
+            result['concurrency'] = self.limiter.asDict()
+        return result
+
+    def summary(self) -> str:
+        """
+        Human readable run summary.
+        """
+        data = self.asDict()
+        lines: list = ["Run summary:"]
+        for model, stats in data['models'].items():
+            lines.append(f"  {model}: {stats['calls']} calls, "
+                         f"{stats['failures']} failed, {stats['seconds']:.1f}s, "
+                         f"{stats['promptTokens']} prompt / {stats['evalTokens']} "
+                         f"generated tokens, {stats.get('truncated', 0)} truncated")
+        for tier, stats in data['tiers'].items():
+            rate = stats['passed'] / stats['attempts'] if stats['attempts'] else 0
+            lines.append(f"  tier {tier}: {stats['passed']}/{stats['attempts']} "
+                         f"passed ({rate:.0%}), {stats['seconds']:.1f}s")
+        if data['shortcuts']:
+            lines.append("  shortcuts: " + ", ".join(
+                f"{count} {kind}" for kind, count in sorted(data['shortcuts'].items())))
+        if 'concurrency' in data:
+            lines.append(f"  concurrency: limit {data['concurrency']['limit']}, "
+                         f"peak {data['concurrency']['peak']}, "
+                         f"{data['concurrency']['decreases']} decreases")
+        if data['timeSaved'] is not None:
+            lines.append(f"  cascade saved about {data['timeSaved']:.1f}s")
+        return "\n".join(lines)
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump(self.asDict(), file, indent=2)
+
+
+def loadPreviousRuns(directory: str = "./metrics") -> list:
+    """
+    The saved metrics of earlier runs, oldest first. Unreadable files are
+    skipped.
+    """
+    runs: list = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        try:
+            with open(path, 'r') as file:
+                runs.append(json.load(file))
+        except (OSError, ValueError):
+            continue
+    return runs
+
+
+METRICS = RunMetrics()
@@ -0,0 +1,192 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+"""
+Hash based sharding for CI matrices. With --shard i/N every runner
+extracts the whole tree but only documents the functions whose hash falls
+in shard i, so the work is balanced across runners at function level and
+the same function always lands in the same shard. Each runner writes its
+responses and a manifest to its --outdir, and the merge step collects all
+shards into one result store (Functions/) and one patch or patch series.
+
+    python lamacoopDocgen.py --compile-commands cc.json prompt.txt -w --shard 2/8 --outdir shard2
+    python sharding.py shard* --patchdir patches
+"""
+
+# Standard Libraries
+import argparse
+import glob
+import json
+import os
+import shutil
+from argparse import Namespace
+
+MANIFEST = "manifest.json"
+
+
+def parseShard(text: str) -> tuple:
+    """
+    "i/N" as (i, N), i counted from 0.
+    """
+    try:
+        index, count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"shard must look like i/N, not {text!r}") from None
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"shard {text} needs 0 <= i < N")
+    return index, count
+
+
+def shardOf(funcHash: str, count: int) -> int:
+    """
+    The shard of a function, from its hex functionHash. sha256 output is
+    uniform, so 64 bits of it balance any shard count.
+    """
+    return int(funcHash[:16], 16) % count
+
+
+def inShard(records, shard: tuple):
+    """
+    The records that belong to shard (i, N), None keeps every record.
+    """
+    if shard is None:
+        yield from records
+        return
+    index, count = shard
+    for record in records:
+        if shardOf(record.hash, count) == index:
+            yield record
+
+
+def writeManifest(directory: str, shard: tuple, entries: list) -> str:
+    """
+    Record which functions the shard owned and which got a response, entries
+    being (hash, file, name) of every function the shard was given.
+    """
+    functions: list = []
+    for funcHash, fileName, name in entries:
+        path = os.path.join(directory, funcHash + "-ai.c")
+        documented = os.path.exists(path) and os.path.getsize(path) > 0
+        functions.append({'hash': funcHash, 'file': fileName, 'name': name,
+                          'documented': documented})
+    path = os.path.join(directory, MANIFEST)
+    os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as file:
+        json.dump({'shard': list(shard), 'functions': functions}, file, indent=2)
+    return path
+
+
+def mergeShards(directories: list, store: str = "Functions", expected: int = None) -> dict:
+    """
+    Copy the responses of every shard into store. Returns what was merged:
+    the shard count, the shards missing, the source files covered, and how
+    many functions were documented, undocumented and in conflict (the same
+    hash with different responses, the first shard's kept). A directory
+    given twice is merged once. expected is the shard count every manifest
+    must have, by default whatever the first one says.
+    """
+    directories = list(dict.fromkeys(os.path.normpath(d) for d in directories))
+    if not directories:
+        raise ValueError("no shard outputs to merge")
+    os.makedirs(store, exist_ok=True)
+    seen: set = set()
+    count = expected
+    files: set = set()
+    merged: dict = {'documented': 0, 'undocumented': 0, 'conflicts': 0}
+    for directory in directories:
+        with open(os.path.join(directory, MANIFEST), 'r') as file:
+            manifest: dict = json.load(file)
+        index, shards = manifest['shard']
+        if count is not None and shards != count:
+            raise ValueError(f"{directory} is shard {index}/{shards}, the others are of {count}")
+        count = shards
+        seen.add(index)
+        for function in manifest['functions']:
+            files.add(function['file'])
+            if not function['documented']:
+                merged['undocumented'] += 1
+                continue
+            source = os.path.join(directory, function['hash'] + "-ai.c")
+            target = os.path.join(store, function['hash'] + "-ai.c")
+            if os.path.exists(target):
+                with open(source, 'rb') as new, open(target, 'rb') as old:
+                    if new.read() != old.read():
+                        merged['conflicts'] += 1
+                        continue
+            else:
+                shutil.copyfile(source, target)
+            merged['documented'] += 1
+    merged['shards'] = count
+    merged['missing'] = sorted(set(range(count)) - seen)
+    merged['files'] = sorted(files)
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='sharding.py',
+        description='Merge the outputs of --shard runs into one result store and patch set')
+    parser.add_argument('directory', nargs='+', help="--outdir of each shard")
+    parser.add_argument('--shards', type=int, metavar='N',
+                        help="How many shards there should be, by default what the manifests say")
+    parser.add_argument('--store', default="Functions",
+                        help="Result store to merge into, default is Functions")
+    parser.add_argument('-p', '--patch', help="Write one patch for all files here")
+    parser.add_argument('--patchdir', help="Write a patch series here, one per file")
+    parser.add_argument('--bysubsystem', action='store_true',
+                        help="With --patchdir, one patch per directory instead of per file")
+    args = parser.parse_args()
+
+    directories: list = sorted({os.path.normpath(d) for pattern in args.directory
+                                for d in glob.glob(pattern)
+                                if os.path.exists(os.path.join(d, MANIFEST))})
+    if not directories:
+        # Nothing downloaded must not pass for an empty but complete merge
+        raise SystemExit("No shard manifests found in " + " ".join(args.directory))
+    try:
+        merged = mergeShards(directories, args.store, args.shards)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    print(f"Merged {len(directories)} of {merged['shards']} shards into {args.store}: "
+          f"{merged['documented']} documented, {merged['undocumented']} undocumented, "
+          f"{merged['conflicts']} conflicts")
+    if merged['missing']:
+        print("Missing shards:", ", ".join(str(index) for index in merged['missing']))
+
+    if (args.patch or args.patchdir) and args.store == "Functions":
+        # commentGenerator reads source/ and Functions/ from here
+        import commentGenerator
+        commentGenerator.commentFiles(Namespace(filename=merged['files'], patch=args.patch,
+                                                patchdir=args.patchdir,
+                                                bysubsystem=args.bysubsystem))
+    elif args.patch or args.patchdir:
+        parser.error("patches are built from Functions/, leave --store at its default")
+
+    if merged['missing']:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+"""
+Template comments for trivial functions. Getters, setters, wrappers that
+forward every parameter and empty stubs are recognised from their syntax
+tree, and get a comment rendered locally in the prompt.txt format instead of
+a round trip to the model with the whole few-shot context.
+"""
+
+# Local Libraries
+from functionRecord import FunctionRecord, iterFunctionNodes, parseCode
+
+
+def bodyStatements(record: FunctionRecord) -> list:
+    """
+    The statements of the function body, comments left out. None when the
+    code doesn't parse to a single clean function definition.
+    """
+    tree = parseCode(record.code.encode('utf8'))
+    if tree.root_node.has_error:
+        return None
+    node = next(iterFunctionNodes(tree), None)
+    body = node.child_by_field_name('body') if node is not None else None
+    if body is None:
+        return None
+    return [child for child in body.named_children if child.type != 'comment']
+
+
+def fieldPath(node, parameters: tuple) -> str:
+    """
+    "p->a.b" for a member access rooted at a parameter, otherwise None.
+    """
+    if node.type != 'field_expression':
+        return None
+    base = node.child_by_field_name('argument')
+    if base.type == 'identifier':
+        if base.text.decode('utf8') not in parameters:
+            return None
+    elif fieldPath(base, parameters) is None:
+        return None
+    return node.text.decode('utf8')
+
+
+def classify(record: FunctionRecord) -> tuple:
+    """
+    (kind, detail) for a trivial function, None for anything else. kind is
+    'empty', 'getter' (detail is the member returned), 'setter' (the member
+    assigned and the parameter assigned to it) or 'wrapper' (the function
+    every parameter is forwarded to).
+    """
+    statements = bodyStatements(record)
+    if statements is None or len(statements) > 1:
+        return None
+    if not statements:
+        return ('empty', None)
+
+    statement = statements[0]
+    expression = statement.named_children[0] if statement.named_children else None
+    if expression is None or statement.type not in ('return_statement', 'expression_statement'):
+        return None
+    parameters: tuple = record.parameterNames
+
+    if statement.type == 'return_statement':
+        member = fieldPath(expression, parameters)
+        if member is not None:
+            return ('getter', member)
+
+    if statement.type == 'expression_statement' and expression.type == 'assignment_expression':
+        left = expression.child_by_field_name('left')
+        right = expression.child_by_field_name('right')
+        member = fieldPath(left, parameters)
+        if member is not None and right.type == 'identifier' \
+                and right.text.decode('utf8') in parameters \
+                and expression.child_by_field_name('operator').type == '=':
+            return ('setter', (member, right.text.decode('utf8')))
+
+    if expression.type == 'call_expression':
+        callee = expression.child_by_field_name('function')
+        arguments = expression.child_by_field_name('arguments').named_children
+        if callee.type == 'identifier' and \
+                tuple(a.text.decode('utf8') for a in arguments if a.type == 'identifier') \
+                == parameters and len(arguments) == len(parameters):
+            return ('wrapper', callee.text.decode('utf8'))
+    return None
+
+
+def renderComment(record: FunctionRecord, kind: str, detail) -> str:
+    """
+    The comment for a function classify() recognised, in the format
+    prompt.txt asks the model for.
+    """
+    returnsValue: bool = record.returnType != "void"
+    if kind == 'getter':
+        summary = f"get {detail}"
+        described: dict = {}
+        expectations = [f"reads {detail} and changes nothing"]
+        returns = f"the value of {detail}"
+    elif kind == 'setter':
+        member, value = detail
+        summary = f"set {member}"
+        described = {value: f"new value for {member}"}
+        expectations = [f"stores @{value} in {member}"]
+        returns = None
+    elif kind == 'wrapper':
+        summary = f"wrapper around {detail}()"
+        described = {}
+        expectations = [f"calls {detail}() with the same arguments"]
+        returns = f"what {detail}() returns" if returnsValue else None
+    else:
+        summary = "empty stub"
+        described = {}
+        expectations = ["does nothing"]
+        returns = None
+
+    # Every parameter gets an @param line and an expectation, the two
+    # lines per parameter CommentLength wants
+    lines: list = ["/**", f" * {record.name} - {summary}"]
+    for parameter in record.parameterNames:
+        if parameter == "...":
+            continue
+        if parameter in described:
+            text = described[parameter]
+        elif kind == 'wrapper':
+            text = f"passed to {detail}()"
+            expectations.append(f"passes @{parameter} to {detail}() unchanged")
+        elif kind == 'empty':
+            text = "unused"
+            expectations.append(f"ignores @{parameter}")
+        elif kind == 'getter':
+            text = f"object holding {detail}"
+            expectations.append(f"does not modify @{parameter}")
+        else:
+            text = "object to update"
+            expectations.append(f"modifies nothing in @{parameter} but {detail[0]}")
+        lines.append(f" * @{parameter}: - {text}")
+    lines += [" *", " * Function Expectations:"]
+    lines += [f" * - {expectation}" for expectation in expectations]
+    if returns:
+        lines += [" *", f" * Return: {returns}"]
+    lines.append(" */")
+    return "\n".join(lines)
+
+
+def templateComment(record: FunctionRecord) -> str:
+    """
+    The rendered comment when record is trivial, otherwise None.
+    """
+    match = classify(record)
+    if match is None:
+        return None
+    return renderComment(record, *match)
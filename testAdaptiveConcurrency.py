@@ -0,0 +1,95 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+import threading
+import unittest
+
+from adaptiveConcurrency import AdaptiveLimiter
+
+class testAdaptiveConcurrency(unittest.TestCase):
+
+    def run_round(self, limiter, seconds, tokens=100, ok=True):
+        tickets = [limiter.acquire() for _ in range(limiter.currentLimit())]
+        for ticket in tickets:
+            limiter.release(seconds, tokens, ok, ticket)
+
+    def test_additive_increase(self):
+        limiter = AdaptiveLimiter(initial=2, maximum=8)
+        for _ in range(10):
+            self.run_round(limiter, 1.0)
+        self.assertEqual(limiter.currentLimit(), 8)
+
+    def test_decrease_on_queueing(self):
+        limiter = AdaptiveLimiter(initial=8, maximum=8)
+        self.run_round(limiter, 1.0)
+        self.run_round(limiter, 5.0)
+        # Only one decrease for the whole slow round
+        self.assertEqual(limiter.currentLimit(), 6)
+        self.assertEqual(limiter.decreases, 1)
+
+    # 1s of prompt evaluation plus 20ms per token, nothing queueing, with
+    # answers of very different lengths
+    def test_prompt_cost_not_queueing(self):
+        limiter = AdaptiveLimiter(initial=8, maximum=16)
+        for batch in range(20):
+            tickets = [limiter.acquire() for _ in range(limiter.currentLimit())]
+            for number, ticket in enumerate(tickets):
+                tokens = [10, 300, 40, 150][(batch + number) % 4]
+                limiter.release(1.0 + 0.02 * tokens, tokens, True, ticket, promptSeconds=1.0)
+        self.assertEqual(limiter.decreases, 0)
+        self.assertEqual(limiter.currentLimit(), 16)
+
+        # Waiting in a queue on top of that still counts
+        tickets = [limiter.acquire() for _ in range(limiter.currentLimit())]
+        for ticket in tickets:
+            limiter.release(5.0 + 0.02 * 100, 100, True, ticket, promptSeconds=1.0)
+        self.assertEqual(limiter.decreases, 1)
+
+    def test_halve_on_error(self):
+        limiter = AdaptiveLimiter(initial=8, maximum=8)
+        self.run_round(limiter, 1.0, ok=False)
+        self.assertEqual(limiter.currentLimit(), 4)
+        self.assertEqual(limiter.asDict()['inFlight'], 0)
+
+    def test_blocks_at_limit(self):
+        limiter = AdaptiveLimiter(initial=1, maximum=1)
+        limiter.acquire()
+        acquired = threading.Event()
+        thread = threading.Thread(target=lambda: (limiter.acquire(), acquired.set()))
+        thread.start()
+        self.assertFalse(acquired.wait(0.1))
+        limiter.release(1.0)
+        self.assertTrue(acquired.wait(1))
+        thread.join()
+
+    def test_slot_counts_exceptions(self):
+        limiter = AdaptiveLimiter(initial=4, maximum=4)
+        with self.assertRaises(ValueError):
+            with limiter.slot():
+                raise ValueError()
+        self.assertEqual(limiter.currentLimit(), 2)
+
+if __name__ == '__main__':
+    unittest.main()
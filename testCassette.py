@@ -0,0 +1,102 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+import os
+import tempfile
+import unittest
+
+from ollama import ChatResponse, Message
+
+import lamacoopDocgen
+from cassette import Cassette, CassetteMiss, cassetteKey
+
+COMMENT = "/**\n * add - add two numbers\n * @a: first\n * @b: second\n */"
+
+class CannedClient:
+    """
+    Stands in for the Ollama server while recording.
+    """
+    def __init__(self):
+        self.calls = 0
+
+    def chat(self, model, messages, options, **kwargs):
+        self.calls += 1
+        return ChatResponse(model=model, done_reason='stop', eval_count=12,
+                            message=Message(role='assistant', content=COMMENT))
+
+class OfflineClient:
+    def chat(self, **kwargs):
+        raise AssertionError("replay went to the network")
+
+class testCassette(unittest.TestCase):
+
+    def test_key(self):
+        messages = [{'role': 'user', 'content': "hi"}]
+        self.assertEqual(cassetteKey("m", messages, {'a': 1, 'b': 2}),
+                         cassetteKey("m", messages, {'b': 2, 'a': 1}))
+        self.assertNotEqual(cassetteKey("m", messages, {'a': 1}),
+                            cassetteKey("m", messages, {'a': 2}))
+
+    def test_record_replay(self):
+        client = CannedClient()
+        messages = [{'role': 'user', 'content': "document add"}]
+        with tempfile.TemporaryDirectory() as directory:
+            recorded = Cassette(directory, 'record').chat(lambda: client, "devstral",
+                                                          messages, {'temperature': 0.4})
+            self.assertEqual(len(os.listdir(directory)), 1)
+            replay = Cassette(directory, 'replay')
+            replayed = replay.chat(OfflineClient, "devstral", messages, {'temperature': 0.4})
+            self.assertEqual(replayed.message.content, recorded.message.content)
+            self.assertEqual(replayed.eval_count, 12)
+            with self.assertRaises(CassetteMiss):
+                replay.chat(OfflineClient, "devstral", messages, {'temperature': 0.5})
+        self.assertEqual(client.calls, 1)
+
+    def test_replay_missing(self):
+        with tempfile.TemporaryDirectory() as directory:
+            typo = os.path.join(directory, "casettes")
+            with self.assertRaises(FileNotFoundError):
+                Cassette(typo, 'replay')
+            self.assertFalse(os.path.exists(typo))
+
+    def test_callAI_replay(self):
+        code = "int add(int a, int b)\n{\n\treturn a + b;\n}\n"
+        with tempfile.TemporaryDirectory() as directory:
+            try:
+                lamacoopDocgen._client = CannedClient()
+                lamacoopDocgen.configureCassette(directory, 'record')
+                recorded = lamacoopDocgen.callAI("Document this", code, False)
+                lamacoopDocgen._client = OfflineClient()
+                lamacoopDocgen.configureCassette(directory, 'replay')
+                self.assertEqual(lamacoopDocgen.callAI("Document this", code, False), recorded)
+                # Never recorded, fails like any other query
+                self.assertIsNone(lamacoopDocgen.callAI("Something else", code, False))
+            finally:
+                lamacoopDocgen.configureCassette(None)
+                lamacoopDocgen.configureClient()
+        self.assertEqual(recorded, COMMENT)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -25,8 +25,13 @@
 
 import unittest
 import os.path
+import io
+import subprocess
+import tempfile
 
-from commentGenerator import functionName, parse
+from commentGenerator import functionName, parse, writePatch, firstDivergence
+from commentGenerator import spliceComments, verifyCommentedFile
+from lamacoopDocgen import extractFunctions, functionHash
 function = """
 void ftrace_arch_code_modify_prepare(void)
 __acquires(&text_mutex)
@@ -40,6 +45,10 @@ __acquires(&text_mutex)
     ftrace_poke_late = 1;
 }
 """
+source = "#include <linux/kernel.h>\n\nint add(int a, int b)\n{\n\treturn a + b;\n}\n" \
+         + "\n".join("int pad%d;" % i for i in range(10)) + "\n" \
+         + "void hello(void)\n{\n\tprintk(\"hi\");\n}\n"
+
 class testCommentGenerator(unittest.TestCase):
 
     #functionDeclaration, hangingPart
@@ -49,6 +58,96 @@ class testCommentGenerator(unittest.TestCase):
         result = functionName(function)
         self.assertEqual(result, expected)
 
+    def test_writePatch(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            try:
+                for name in ("source", "result", "Functions"):
+                    os.makedirs(name)
+                with open("source/x.c", 'w') as file:
+                    file.write(source)
+                for func in extractFunctions(source):
+                    name = functionName(func)
+                    with open("Functions/" + functionHash(func, "x.c") + "-ai.c", 'w') as file:
+                        file.write("/**\n * " + name + " - does things\n */")
+
+                out = io.StringIO()
+                self.assertEqual(writePatch("x.c", out), 2)
+                patch = out.getvalue()
+                self.assertEqual(patch.count("@@ -"), 2)
+
+                parse("x.c")
+                with open("result/x.c", 'r') as file:
+                    expected = file.read()
+                with open("x.patch", 'w') as file:
+                    file.write(patch)
+                subprocess.run(["git", "apply", "--unsafe-paths", "--directory=source",
+                                "x.patch"], check=True)
+                with open("source/x.c", 'r') as file:
+                    self.assertEqual(file.read(), expected)
+            finally:
+                os.chdir(cwd)
+
+    # A comment that closes early and turns its text into code is left out
+    # of the patch, as parse leaves it out of result/
+    def test_writePatch_rejects(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            try:
+                os.makedirs("source")
+                os.makedirs("Functions")
+                with open("source/x.c", 'w') as file:
+                    file.write(source)
+                for func in extractFunctions(source):
+                    name = functionName(func)
+                    comment = "/**\n * " + name + " - does things\n */"
+                    if name == "add":
+                        comment = "/**\n * add - adds */ int evil; /*\n */"
+                    with open("Functions/" + functionHash(func, "x.c") + "-ai.c", 'w') as file:
+                        file.write(comment)
+
+                out = io.StringIO()
+                self.assertEqual(writePatch("x.c", out), 1)
+                self.assertNotIn("evil", out.getvalue())
+                self.assertIn("hello - does things", out.getvalue())
+            finally:
+                os.chdir(cwd)
+
+    def test_firstDivergence(self):
+        original = b"#define ONE 1 // one\nint f(int a)\n{\n\treturn a;\n}\n"
+        commented = b"#define ONE 1\n/**\n * f - x\n */\nint f(int  a) {\n\treturn a;\n}\n"
+        self.assertIsNone(firstDivergence(original, commented))
+        changed = commented.replace(b"return a", b"return -a")
+        self.assertEqual(firstDivergence(original, changed), (6, 9, "a", "-"))
+
+    # The original is compared as it is, a URL in a string isn't a comment
+    def test_verifyCommentedFile(self):
+        original = 'const char *url = "http://example.com"; // home\nint f(void);\n'
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            try:
+                os.makedirs("result")
+                with open("result/x.c", 'w') as file:
+                    file.write('const char *url = "http://example.com";\n/**\n * f - x\n */\n'
+                               'int f(void);\n')
+                self.assertTrue(verifyCommentedFile("x.c", original))
+            finally:
+                os.chdir(cwd)
+
+    def test_spliceComments(self):
+        lines = source.splitlines(keepends=True)
+        add = lines.index("int add(int a, int b)\n")
+        hello = lines.index("void hello(void)\n")
+        insertions = [(add, "/**\n * add - adds\n"), (hello, "/**\n * hello - hi\n */\n")]
+        pieces, rejected = spliceComments(lines, insertions)
+        # The unterminated comment would swallow code, so it is left out
+        self.assertEqual(rejected, [add])
+        self.assertEqual(b"".join(pieces).decode('utf8'),
+                         "".join(lines[:hello]) + insertions[1][1] + "".join(lines[hello:]))
+
     #No Return
     def test_parse(self):
         parse("ftrace.c")
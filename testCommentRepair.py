@@ -0,0 +1,101 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+import unittest
+
+from commentRepair import repairComment
+from functionRecord import functionRecord
+from lamacoopDocgen import checkedResponse, responsePasses
+
+record = functionRecord("int kfoo_set(struct kfoo *dev, unsigned long flags, int mode)\n"
+                        "{\n\tif (mode)\n\t\tdev->flags = flags;\n\treturn 0;\n}\n")
+
+body = """ * @dev: - the device
+ * @flags: - new flags
+ * @mode: - the mode
+ *
+ * Function Expectations:
+ * - if @mode is non zero the flags of @dev are replaced by @flags
+ * - otherwise nothing changes
+ * - returns 0
+"""
+
+class testCommentRepair(unittest.TestCase):
+
+    def test_missing_closer_and_prose(self):
+        response = ("Sure, here is the comment:\n```c\n/**\n * kfoo_set - set the flags\n"
+                    + body + "```\nHope this helps!")
+        self.assertFalse(responsePasses(response, record))
+        repaired = repairComment(response, record)
+        self.assertTrue(repaired.startswith("/**\n * kfoo_set - set the flags\n"))
+        self.assertTrue(repaired.endswith(" * - returns 0\n */"))
+        self.assertTrue(responsePasses(repaired, record))
+
+    def test_missing_opener(self):
+        response = " * kfoo_set - set the flags\n" + body + " */"
+        self.assertTrue(responsePasses(repairComment(response, record), record))
+
+    def test_title_and_tags(self):
+        response = ("/**\n * Set the flags of a device\n"
+                    + body.replace("@dev:", "@devv:").replace("@mode:", "@mdoe:") + " */")
+        repaired = repairComment(response, record)
+        self.assertIn(" * kfoo_set - Set the flags of a device\n", repaired)
+        self.assertIn(" * @dev: - the device\n", repaired)
+        self.assertIn(" * @mode: - the mode\n", repaired)
+        self.assertTrue(responsePasses(repaired, record))
+
+    def test_reflow(self):
+        long = "- if @mode is non zero " + "the flags are replaced " * 6 + "by @flags"
+        response = "/**\n * kfoo_set - set the flags\n" + body.replace(
+            "- if @mode is non zero the flags of @dev are replaced by @flags", long) + " */"
+        repaired = repairComment(response, record)
+        lines = repaired.split("\n")
+        self.assertTrue(all(len(line) <= 80 for line in lines))
+        # Continuation lines of a bullet are indented under its text
+        bullet = next(i for i, line in enumerate(lines) if line.startswith(" * - if @mode"))
+        self.assertTrue(lines[bullet + 1].startswith(" *   flags"))
+
+    def test_reflow_passing(self):
+        # Over-wide but otherwise valid, accepted and still wrapped
+        long = "- if @mode is non zero " + "the flags are replaced " * 6 + "by @flags"
+        response = "/**\n * kfoo_set - set the flags\n" + body.replace(
+            "- if @mode is non zero the flags of @dev are replaced by @flags", long) + " */"
+        self.assertTrue(responsePasses(response, record))
+        checked, passed = checkedResponse(response, record)
+        self.assertTrue(passed)
+        self.assertTrue(all(len(line) <= 80 for line in checked.split("\n")))
+        # A comment that fits is returned untouched
+        fits = "/**\n * kfoo_set - set the flags\n" + body + " */"
+        self.assertEqual(checkedResponse(fits, record), (fits, True))
+
+    def test_not_mechanical(self):
+        # An undocumented parameter needs the model, repair leaves it failing
+        response = "/**\n * kfoo_set - set the flags\n" + body.replace(
+            " * @flags: - new flags\n", "").replace("by @flags", "by the new ones") + " */"
+        self.assertEqual(checkedResponse(response, record), (response, False))
+        self.assertIsNone(repairComment("", record))
+
+if __name__ == '__main__':
+    unittest.main()
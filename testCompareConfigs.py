@@ -0,0 +1,102 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+import re
+import threading
+import unittest
+
+from ollama import ChatResponse, Message
+
+import lamacoopDocgen
+from compareConfigs import compareConfigs, formatComparison, parseConfig, percentile
+from functionRecord import iterFunctionRecords
+
+code = "".join(f"int scale{i}(int a, int b)\n{{\n\tint c = a * {i};\n\treturn c + b;\n}}\n"
+               for i in range(6))
+
+class ModelClient:
+    """
+    Stands in for Ollama: "good" answers with a valid comment, anything else
+    with one that fails validation.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.options = []
+
+    def chat(self, model, messages, options, **kwargs):
+        with self.lock:
+            self.options.append((model, options['temperature']))
+        name = re.findall(r'int (scale\d+)\(', messages[-1]['content'])[-1]
+        if model == "good":
+            content = (f"/**\n * {name} - scale and add\n * @a: value to scale\n"
+                       " * @b: offset\n *\n * Function Expectations:\n * - multiplies @a\n"
+                       " * - adds @b\n * - no overflow check\n * - returns the result\n */")
+        else:
+            content = "I think this function scales a number."
+        return ChatResponse(model=model, done_reason='stop', prompt_eval_count=300,
+                            eval_count=60, message=Message(role='assistant', content=content))
+
+class testCompareConfigs(unittest.TestCase):
+
+    def test_parseConfig(self):
+        self.assertEqual(parseConfig("cool:temperature=0.1,cascade=true,model=devstral"),
+                         {'name': "cool", 'temperature': 0.1, 'cascade': True,
+                          'model': "devstral"})
+        self.assertEqual(parseConfig("plain"), {'name': "plain"})
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.95), 95)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_compare(self):
+        records = list(iterFunctionRecords(code, "scale.c"))
+        client = ModelClient()
+        saved = lamacoopDocgen._client, lamacoopDocgen._cassette, lamacoopDocgen.TEMPERATURE
+        lamacoopDocgen._client, lamacoopDocgen._cassette = client, None
+        try:
+            rows = compareConfigs([{'name': "good", 'model': "good", 'temperature': 0.1},
+                                   {'name': "bad", 'model': "bad", 'reprompts': 0}],
+                                  records, "Document this function", workers=3)
+        finally:
+            lamacoopDocgen._client, lamacoopDocgen._cassette = saved[:2]
+        self.assertEqual(lamacoopDocgen.TEMPERATURE, saved[2])
+        self.assertEqual(lamacoopDocgen.REPROMPTS, 1)
+
+        good, bad = rows
+        self.assertEqual(good['passRate'], 1.0)
+        self.assertEqual(bad['passRate'], 0.0)
+        self.assertEqual(good['calls'], 6)
+        self.assertEqual(good['tokensPerFunction'], 360)
+        self.assertIn(("good", 0.1), client.options)
+        self.assertIn(("bad", saved[2]), client.options)
+        self.assertLessEqual(good['p50'], good['p95'])
+        table = formatComparison(rows)
+        self.assertIn("100%", table.splitlines()[1])
+        self.assertIn("0%", table.splitlines()[2])
+
+if __name__ == '__main__':
+    unittest.main()
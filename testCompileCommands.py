@@ -0,0 +1,81 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+import json
+import os
+import tempfile
+import unittest
+
+from compileCommands import includeDirs, iterTreeFunctions
+
+files = {
+    "a.c": '#include <stdio.h>\n#include "inc/x.h"\nint a(void)\n{\n\treturn x();\n}\n',
+    "b.c": '#include <x.h>\n#ifdef CONFIG_Y\n#include <y.h>\n#endif\nint b(void)\n{\n\treturn 1;\n}\n',
+    "unbuilt.c": 'int unbuilt(void)\n{\n\treturn 0;\n}\n',
+    "inc/x.h": '#include "y.h"\nstatic inline int x(void)\n{\n\treturn y();\n}\n',
+    "inc/y.h": 'static inline int y(void)\n{\n\treturn 2;\n}\n',
+}
+
+class testCompileCommands(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        root = self.directory.name
+        for name, code in files.items():
+            os.makedirs(os.path.dirname(os.path.join(root, name)), exist_ok=True)
+            with open(os.path.join(root, name), 'w') as file:
+                file.write(code)
+        commands = [
+            {"directory": root, "file": "a.c", "command": "cc -Iinc -c a.c"},
+            {"directory": root, "file": "b.c", "arguments": ["cc", "-I", "inc", "-c", "b.c"]},
+            {"directory": root, "file": "b.c", "arguments": ["cc", "-I", "inc", "-c", "b.c"]},
+        ]
+        self.commandsFile = os.path.join(root, "compile_commands.json")
+        with open(self.commandsFile, 'w') as file:
+            json.dump(commands, file)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_includeDirs(self):
+        entry = {"directory": "/src", "command": "cc -Iinc -isystem /usr/x -iquote q -c a.c"}
+        self.assertEqual(includeDirs(entry), ["/src/inc", "/usr/x", "/src/q"])
+
+    def test_headers_once(self):
+        result = dict(iterTreeFunctions(self.commandsFile))
+        self.assertEqual(list(result), ["a.c", "b.c", "inc/x.h", "inc/y.h"])
+        allFuncs = [f for funcs in result.values() for f in funcs]
+        self.assertEqual(len(allFuncs), 4)
+        self.assertEqual(result["inc/y.h"][0].name, "y")
+
+    def test_missing_file(self):
+        os.remove(os.path.join(self.directory.name, "b.c"))
+        with self.assertLogs('lamacoop', 'WARNING') as logs:
+            result = dict(iterTreeFunctions(self.commandsFile))
+        self.assertNotIn("b.c", result)
+        self.assertIn("Skipping", logs.output[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from docgenDaemon import DocgenState, UnixHTTPConnection, makeServer, submitJob
+from lamacoopDocgen import extractFunctions, functionHash
+
+code = """
+int add(int a, int b)
+{
+    return a + b;
+}
+"""
+
+class testDaemon(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.socketPath = os.path.join(self.directory.name, "docgen.sock")
+        self.state = DocgenState("prompt.txt")
+        self.server = makeServer(self.state, self.socketPath)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.directory.cleanup()
+
+    def test_status(self):
+        result = submitJob('status', {}, self.socketPath)
+        self.assertEqual(result['cached'], 0)
+        self.assertIn('document', result['jobs'])
+
+    # Served from the warm cache, so no model is needed
+    def test_document_cached(self):
+        funcHash = functionHash(extractFunctions(code)[0], "add.c")
+        self.state.cache[funcHash] = "/**\n * add - adds\n */"
+        result = submitJob('document', {'fileName': "add.c", 'code': code},
+                           self.socketPath)
+        self.assertEqual(len(result['functions']), 1)
+        self.assertTrue(result['functions'][0]['cached'])
+        self.assertEqual(result['functions'][0]['response'], "/**\n * add - adds\n */")
+
+    def test_unknown_job(self):
+        result = submitJob('nothing', {}, self.socketPath)
+        self.assertIn('error', result)
+
+    def test_path_outside_rejected(self):
+        for fileName in ("../victim.txt", "/etc/passwd", "a/../../victim.txt"):
+            result = submitJob('splice', {'fileName': fileName}, self.socketPath)
+            self.assertIn('error', result)
+        result = submitJob('document', {'fileName': "add.c", 'path': "../add.c"},
+                           self.socketPath)
+        self.assertIn('error', result)
+
+    # What a cross-site form or fetch without a preflight can send
+    def test_plain_text_rejected(self):
+        connection = UnixHTTPConnection(self.socketPath)
+        try:
+            connection.request('POST', '/splice', body=json.dumps({'fileName': "add.c"}),
+                               headers={'Content-Type': 'text/plain'})
+            response = connection.getresponse()
+            self.assertEqual(response.status, 415)
+        finally:
+            connection.close()
+
+    def test_token(self):
+        self.state.token = "secret"
+        result = submitJob('document', {'fileName': "add.c", 'code': ""}, self.socketPath)
+        self.assertIn('X-Lamacoop-Token', result['error'])
+        result = submitJob('document', {'fileName': "add.c", 'code': ""}, self.socketPath,
+                           token="secret")
+        self.assertEqual(result['functions'], [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -23,10 +23,21 @@
 #   6180 Guardian Gtwy, Ste 102
 #   Aberdeen Proving Ground, MD 21005
 
+import contextlib
+import io
 import unittest
+import lamacoopDocgen
 from lamacoopDocgen import chunkString, extractFunctions, removeComments, callAI
+from lamacoopDocgen import getClient, configureClient, KEEPALIVE
+from lamacoopDocgen import functionComplexity, responsePasses, iterFunctions
+from lamacoopDocgen import outputBudget, finishResponse, BUDGETPERPARAM, MAXBUDGET
+from ollama import ChatResponse, Message
 from promptGenerator import generate
 
+# Answers to the queries below. The one checked in is a hand-written stub
+# (model "stub"), not devstral output, record real ones with LAMACOOP_RECORD
+TESTCASSETTE = "cassettes"
+
 class testDocgen(unittest.TestCase):
 
     def test_chunkString_basic(self):
@@ -83,6 +94,98 @@ class testDocgen(unittest.TestCase):
         self.assertEqual(len(functions), 2)
         self.assertTrue('void hello()' in functions[0])
         self.assertTrue('int add(int a, int b)' in functions[1])
+    def test_iterFunctions_containers(self):
+        c_code = """
+#ifdef CONFIG_A
+static int a(void)
+{
+    return 1;
+}
+#else
+static int b(void)
+{
+    return """ + "(" * 2000 + "0" + ")" * 2000 + """;
+}
+#endif
+"""
+        functions = iterFunctions(c_code)
+        self.assertTrue(next(functions).startswith("static int a(void)"))
+        self.assertTrue(next(functions).startswith("static int b(void)"))
+        self.assertEqual(list(functions), [])
+    def test_functionComplexity(self):
+        simple = "int get(struct s *p)\n{\n\treturn p->x;\n}\n"
+        branchy = """
+int pick(int a, int b)
+{
+    if (a && b)
+        return 1;
+    for (;;)
+        break;
+    return a ? a : b;
+}
+"""
+        self.assertEqual(functionComplexity(simple), 1)
+        self.assertEqual(functionComplexity(branchy), 5)
+    def test_responsePasses_rejects_missing(self):
+        code = "int add(int a, int b)\n{\n\treturn a + b;\n}\n"
+        self.assertFalse(responsePasses(None, code))
+        self.assertFalse(responsePasses("no comment here", code))
+    def test_responsePasses_kerneldoc(self):
+        code = "int add(int a, int b)\n{\n\treturn a + b;\n}\n"
+        comment = ("/**\n * add - add two numbers\n * @a: first\n * @b: second\n *\n"
+                   " * Functions Expectations:\n * - sums\n * - a and b\n * - no overflow check\n"
+                   " * - returns the sum\n */")
+        self.assertTrue(responsePasses(comment, code))
+    def test_responsePasses_quiet(self):
+        code = "int add(int a, int b)\n{\n\treturn a + b;\n}\n"
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.assertFalse(responsePasses("/**\n * sub - wrong name\n */", code))
+            self.assertFalse(responsePasses("/**\n * add - no params\n */", code))
+        self.assertEqual(output.getvalue(), "")
+    def test_cascade_accepts_draft(self):
+        # A well formed /** draft passes, so the large model is never asked
+        code = "int add(int a, int b)\n{\n\treturn a + b;\n}\n"
+        comment = ("/**\n * add - add two numbers\n * @a: first\n * @b: second\n *\n"
+                   " * Functions Expectations:\n * - sums\n * - a and b\n * - no overflow check\n"
+                   " * - returns the sum\n */")
+        models = []
+        def draft(prompt, code, verbose, model=None, budget=None, context=None):
+            models.append(model)
+            return comment
+        saved = lamacoopDocgen.callAI
+        lamacoopDocgen.callAI = draft
+        try:
+            response = lamacoopDocgen.cascadeAI("Document this", code, False)
+        finally:
+            lamacoopDocgen.callAI = saved
+        self.assertEqual(response, comment)
+        self.assertEqual(models, [lamacoopDocgen.DRAFTMODEL])
+    def test_outputBudget(self):
+        none = "int zero(void)\n{\n\treturn 0;\n}\n"
+        two = "int add(int a, int b)\n{\n\treturn a + b;\n}\n"
+        self.assertEqual(outputBudget(two) - outputBudget(none), 2 * BUDGETPERPARAM)
+        huge = "int f(void)\n{\n" + "\tx++;\n" * 5000 + "}\n"
+        self.assertEqual(outputBudget(huge), MAXBUDGET)
+    def test_finishResponse(self):
+        def response(content, reason):
+            return ChatResponse(message=Message(role='assistant', content=content),
+                                done_reason=reason)
+        self.assertEqual(finishResponse(response("/**\n * f - x\n ", 'stop')),
+                         "/**\n * f - x\n */")
+        self.assertEqual(finishResponse(response("/** f */", 'stop')), "/** f */")
+        self.assertEqual(finishResponse(response("/**\n * f -", 'length')), "/**\n * f -")
+        # A natural end is 'stop' as well, only an open comment gets closed
+        self.assertEqual(finishResponse(response("This adds two numbers.", 'stop')),
+                         "This adds two numbers.")
+        self.assertEqual(finishResponse(response("/** f */\nThat is all.", 'stop')),
+                         "/** f */\nThat is all.")
+    def test_getClient_shared(self):
+        client = getClient()
+        self.assertIs(getClient(), client)
+        configureClient(keepAlive="10m")
+        self.assertIsNot(getClient(), client)
+        configureClient(keepAlive=KEEPALIVE)
     def test_callAI(self):
         promptFile = """
 Fill in the above block comment with information from the following code 
@@ -97,7 +200,17 @@ static const char *ftrace_call_replace(unsigned long ip, unsigned long addr)
                """
         prompt = generate(code, promptFile)
         expected = "ftrace_call_replace - "
-        response = callAI(prompt,code,False) 
+        # Offline from the checked-in stub unless the environment already
+        # picked a cassette. The stub only shows that callAI hands back what
+        # the model said, not that devstral says it
+        own = lamacoopDocgen._cassette is None
+        if own:
+            lamacoopDocgen.configureCassette(TESTCASSETTE, 'replay')
+        try:
+            response = callAI(prompt,code,False) 
+        finally:
+            if own:
+                lamacoopDocgen.configureCassette(None)
         # print(response)
         self.assertTrue(expected in response)
 
@@ -0,0 +1,138 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+import lamacoopDocgen
+from docgenWatch import InotifyWatcher, PollingWatcher, WatchSession, reparse
+from functionRecord import parseCode
+
+def function(name: str, offset: int) -> str:
+    return f"int {name}(int a, int b)\n{{\n\tint c = a + {offset};\n\treturn c * b;\n}}\n"
+
+def comment(name: str) -> str:
+    return (f"/**\n * {name} - offset and scale\n * @a: value\n * @b: factor\n *\n"
+            " * Function Expectations:\n * - adds an offset to @a\n * - multiplies by @b\n"
+            " * - no overflow check\n * - returns the product\n */")
+
+class testDocgenWatch(unittest.TestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.directory = tempfile.TemporaryDirectory()
+        shutil.copy("promptContext.yaml", self.directory.name)
+        os.chdir(self.directory.name)
+        os.makedirs("source")
+        self.prompted = []
+        self.lock = threading.Lock()
+
+        def stubCallAI(prompt, code, verbose, model=None, budget=None, context=None):
+            name = re.match(r'int (\w+)\(', code).group(1)
+            with self.lock:
+                self.prompted.append(name)
+            return comment(name)
+
+        self.saved = lamacoopDocgen.callAI, lamacoopDocgen.REUSECOMMENTS
+        lamacoopDocgen.callAI, lamacoopDocgen.REUSECOMMENTS = stubCallAI, False
+
+    def tearDown(self):
+        lamacoopDocgen.callAI, lamacoopDocgen.REUSECOMMENTS = self.saved
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+    def write(self, text: str) -> None:
+        with open("source/drv.c", 'w') as file:
+            file.write(text)
+
+    def test_reparse(self):
+        old = (function("first", 1) + function("second", 2)).encode()
+        new = (function("first", 1) + function("second", 20)).encode()
+        tree = reparse(parseCode(old), old, new)
+        self.assertEqual(str(tree.root_node), str(parseCode(new).root_node))
+
+    def test_only_changed_functions(self):
+        self.write(function("first", 1) + "\n" + function("second", 2))
+        session = WatchSession("Document this function")
+        self.assertEqual(len(session.update("drv.c")), 2)
+        self.assertEqual(sorted(self.prompted), ['first', 'second'])
+        with open("result/drv.c") as file:
+            self.assertEqual(file.read().count("offset and scale"), 2)
+
+        self.prompted.clear()
+        self.assertEqual(session.update("drv.c"), [])
+
+        self.write(function("first", 1) + "\n" + function("second", 7))
+        changed = session.update("drv.c")
+        self.assertEqual([record.name for record in changed], ['second'])
+        self.assertEqual(self.prompted, ['second'])
+        with open("result/drv.c") as file:
+            result = file.read()
+        self.assertEqual(result.count("offset and scale"), 2)
+        self.assertIn("a + 7", result)
+
+        # Reverting is answered from Functions/ without a query
+        self.prompted.clear()
+        self.write(function("first", 1) + "\n" + function("second", 2))
+        self.assertEqual(session.update("drv.c"), [])
+        self.assertEqual(self.prompted, [])
+
+    def test_patch(self):
+        self.write(function("first", 1))
+        session = WatchSession("Document this function", patch="drv.patch")
+        session.update("drv.c")
+        with open("drv.patch") as file:
+            self.assertIn("first - offset and scale", file.read())
+        self.assertFalse(os.path.exists("result/drv.c"))
+
+    def watcherSees(self, watcher) -> set:
+        def save():
+            time.sleep(0.1)
+            self.write(function("first", 3))
+        threading.Thread(target=save).start()
+        try:
+            return watcher.wait(timeout=5)
+        finally:
+            watcher.close()
+
+    def test_polling(self):
+        self.write(function("first", 1))
+        watcher = PollingWatcher(["source/drv.c"])
+        self.assertEqual(self.watcherSees(watcher), {"source/drv.c"})
+
+    @unittest.skipUnless(sys.platform.startswith('linux'), "inotify is Linux only")
+    def test_inotify(self):
+        self.write(function("first", 1))
+        watcher = InotifyWatcher(["source/drv.c"])
+        self.assertEqual(self.watcherSees(watcher), {"source/drv.c"})
+
+if __name__ == '__main__':
+    unittest.main()
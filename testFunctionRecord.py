@@ -0,0 +1,81 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+import unittest
+
+from functionRecord import FunctionRecord, functionRecord, functionHash, iterFunctionRecords
+from functionRecord import iterWindowedRecords
+
+code = """
+static const char *ftrace_call_replace(unsigned long ip, unsigned long addr)
+{
+	return text_gen_insn(CALL_INSN_OPCODE, (void *)ip, (void *)addr);
+}
+
+static int __init register_cb(void (*cb)(int, void *), char __user *buf, ...)
+{
+	return 0;
+}
+
+void noargs(void)
+{
+}
+"""
+
+class testFunctionRecord(unittest.TestCase):
+
+    def test_fields(self):
+        record = next(iterFunctionRecords(code, "ftrace.c"))
+        self.assertEqual(record.name, "ftrace_call_replace")
+        self.assertEqual(record.parameterNames, ("ip", "addr"))
+        self.assertEqual(record.parameters, ("unsigned long ip", "unsigned long addr"))
+        self.assertEqual(record.returnType, "const char*")
+        self.assertEqual(code.encode('utf8')[record.startByte:record.endByte].decode('utf8'),
+                         record.code)
+        self.assertEqual(record.hash, functionHash(record.code, "ftrace.c"))
+
+    def test_function_pointer_params(self):
+        records = list(iterFunctionRecords(code))
+        self.assertEqual(records[1].name, "register_cb")
+        self.assertEqual(records[1].parameterNames, ("cb", "buf", "..."))
+        self.assertEqual(records[2].parameterNames, ())
+
+    def test_slots(self):
+        record = functionRecord(code)
+        self.assertIs(functionRecord(record), record)
+        self.assertFalse(hasattr(record, '__dict__'))
+        self.assertIsNone(functionRecord("int x;"))
+
+    def test_windowed(self):
+        source = ("#ifdef CONFIG_X\n" + code + "#endif\nstruct s { int a; };\n" + code * 3).encode('utf8')
+        whole = [(r.name, r.startByte, r.hash) for r in iterFunctionRecords(source.decode('utf8'), "x.c")]
+        for window in (16, 100, 1 << 20):
+            records = list(iterWindowedRecords(source, "x.c", window))
+            self.assertEqual([(r.name, r.startByte, r.hash) for r in records], whole)
+            for record in records:
+                self.assertEqual(source[record.startByte:record.endByte].decode('utf8'), record.code)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+import unittest
+
+import lamacoopDocgen
+from functionRecord import functionRecord
+from longFunctions import bodySegments, countTokens, signature, summaryStub
+
+cases = "".join(f"\tcase CMD_{i}:\n\t\tret = dev_cmd_{i}(dev, arg);\n\t\tbreak;\n"
+                for i in range(400))
+ioctl = ("long dev_ioctl(struct file *file, unsigned int cmd, unsigned long arg)\n{\n"
+         "\tstruct dev *dev = file->private_data;\n\tlong ret = 0;\n\n"
+         "\tswitch (cmd) {\n" + cases + "\tdefault:\n\t\tret = -ENOTTY;\n\t}\n"
+         "\treturn ret;\n}\n")
+
+comment = ("/**\n * dev_ioctl - dispatch device commands\n * @file: open device\n"
+           " * @cmd: command number\n * @arg: command argument\n *\n"
+           " * Function Expectations:\n * - looks up the device of @file\n"
+           " * - runs the handler for @cmd\n * - passes @arg to the handler\n"
+           " * - returns -ENOTTY for unknown commands\n * - returns the handler result\n"
+           " * - takes no locks itself\n */")
+
+class testLongFunctions(unittest.TestCase):
+
+    def setUp(self):
+        self.record = functionRecord(ioctl, "dev.c")
+
+    def test_segments(self):
+        segments = bodySegments(self.record, 500)
+        self.assertGreater(len(segments), 5)
+        for segment in segments:
+            self.assertLessEqual(countTokens(segment), 500)
+        # Split only between statements, nothing lost or repeated
+        self.assertEqual("".join("".join(segments).split()),
+                         "".join(ioctl[ioctl.index("{") + 1:ioctl.rindex("}")].split()))
+        self.assertIn("switch (cmd)", segments[0])
+        self.assertTrue(segments[1].lstrip().startswith("case"))
+
+    def test_short_function(self):
+        record = functionRecord("int add(int a, int b)\n{\n\treturn a + b;\n}\n")
+        self.assertEqual(bodySegments(record, 500), ["\treturn a + b;"])
+        self.assertEqual(signature(record), "int add(int a, int b)")
+
+    def test_stub(self):
+        stub = summaryStub(self.record, ["sets up */ the device", "dispatches cmd"])
+        self.assertTrue(stub.startswith(signature(self.record) + "\n{"))
+        self.assertIn("/* Part 2 of 2: dispatches cmd */", stub)
+        self.assertEqual(stub.count("*/"), 2)
+        self.assertIsNotNone(functionRecord(stub))
+
+    def test_map_reduce(self):
+        queries = []
+
+        def stubCallAI(prompt, code, verbose, model=None, budget=None, context=None):
+            queries.append((code, context))
+            if context is not None:
+                return "Handles commands " + code.split("CMD_")[1].split(":")[0] + " onwards*/"
+            return comment
+
+        saved = lamacoopDocgen.callAI, lamacoopDocgen.CONTEXTWINDOW
+        lamacoopDocgen.callAI, lamacoopDocgen.CONTEXTWINDOW = stubCallAI, 4096
+        try:
+            prompt = "Document this function"
+            self.assertTrue(lamacoopDocgen.isOversized(self.record, prompt))
+            self.assertFalse(lamacoopDocgen.isOversized(
+                functionRecord("int add(int a, int b)\n{\n\treturn a + b;\n}\n"), prompt))
+            response = lamacoopDocgen.documentOversized(self.record, prompt, False)
+        finally:
+            lamacoopDocgen.callAI, lamacoopDocgen.CONTEXTWINDOW = saved
+
+        self.assertEqual(response, comment)
+        summaries, final = queries[:-1], queries[-1]
+        self.assertEqual(len(summaries), len(bodySegments(self.record,
+                                                          lamacoopDocgen.SEGMENTTOKENS)))
+        self.assertIsNone(final[1])
+        self.assertIn("Part 1 of", final[0])
+        self.assertNotIn("dev_cmd_0(", final[0])
+
+    # A near-duplicate match doesn't send the whole oversized function in an
+    # adapt request, it is summarized like any other
+    def test_oversized_match(self):
+        queries = []
+
+        def stubCallAI(prompt, code, verbose, model=None, budget=None, context=None):
+            queries.append(prompt)
+            if context is not None:
+                return "Handles commands " + code.split("CMD_")[1].split(":")[0] + " onwards*/"
+            return comment
+
+        saved = lamacoopDocgen.callAI, lamacoopDocgen.CONTEXTWINDOW
+        lamacoopDocgen.callAI, lamacoopDocgen.CONTEXTWINDOW = stubCallAI, 4096
+        try:
+            prompt = "Document this function"
+            response = lamacoopDocgen.queryRecord(self.record, prompt, False,
+                                                  lamacoopDocgen.estimatedTokens(self.record, prompt),
+                                                  (comment, 0.9, None))
+        finally:
+            lamacoopDocgen.callAI, lamacoopDocgen.CONTEXTWINDOW = saved
+
+        self.assertEqual(response, comment)
+        self.assertEqual(len(queries), len(bodySegments(self.record,
+                                                        lamacoopDocgen.SEGMENTTOKENS)) + 1)
+        self.assertNotIn(comment, "".join(queries))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+import unittest
+
+import lamacoopDocgen
+from functionRecord import functionRecord
+from nearDuplicates import NearDuplicateIndex, normalizedTokens
+from runMetrics import METRICS
+
+x86 = functionRecord("""static int x86_set_mode(struct dev *dev, int mode)
+{
+	if (mode > 3)
+		return -EINVAL;
+	dev->regs->mode = mode;
+	writel(mode, dev->base + 0x10);
+	return 0;
+}""")
+
+arm = functionRecord("""static int arm_set_mode(struct dev *d, int m)
+{
+	if (m > 3)
+		return -EINVAL;
+	d->regs->mode = m;
+	writel(m, d->base + 0x10);
+	return 0;
+}""")
+
+mips = functionRecord("""static int mips_set_mode(struct dev *dev, int mode)
+{
+	if (mode > 3)
+		return -EINVAL;
+	dev->regs->mode = mode;
+	writel(mode, dev->base + 0x18);
+	return 0;
+}""")
+
+unrelated = functionRecord("""static void list_reset(struct list *head)
+{
+	head->next = head;
+	head->prev = head;
+}""")
+
+comment = """/**
+ * x86_set_mode - set the mode register, see x86_set_mode_locked()
+ * @dev: device to program
+ * @mode: mode to set
+ *
+ * Functions Expectations:
+ * - returns -EINVAL when @mode is out of range
+ * - stores @mode in the cached registers
+ * - writes @mode to the hardware
+ * - returns 0 otherwise
+ */"""
+
+class testNearDuplicates(unittest.TestCase):
+
+    def test_normalized(self):
+        self.assertEqual(normalizedTokens(x86), normalizedTokens(arm))
+        # The member named like the parameter is left alone
+        self.assertIn('mode', normalizedTokens(arm))
+
+    def test_query(self):
+        index = NearDuplicateIndex()
+        index.add(x86, comment)
+        self.assertIsNone(index.query(unrelated))
+
+        text, score, substituted = index.query(arm)
+        self.assertEqual(score, 1.0)
+        self.assertIn(" * arm_set_mode - set the mode register, see x86_set_mode_locked()", substituted)
+        self.assertIn(" * @d: device to program", substituted)
+        self.assertIn("when @m is out of range", substituted)
+        self.assertIn("set the mode register", substituted)
+
+        # A different constant is still a near-duplicate but needs adapting
+        text, score, substituted = index.query(mips)
+        self.assertEqual(text, comment)
+        self.assertIsNone(substituted)
+
+    def test_eviction(self):
+        index = NearDuplicateIndex(maxEntries=2)
+        index.add(x86, comment)
+        index.add(unrelated, "/** list_reset */")
+        # Matching x86 keeps it, so list_reset is the one evicted
+        self.assertIsNotNone(index.query(arm))
+        index.add(mips, comment)
+        self.assertEqual(len(index), 2)
+        self.assertIsNone(index.query(unrelated))
+        self.assertIsNotNone(index.query(arm))
+        self.assertTrue(all(index.buckets.values()))
+
+    def test_substitutedComment(self):
+        lamacoopDocgen.NEARDUPLICATES.add(x86, comment)
+        before = METRICS.asDict()['shortcuts'].get('substituted', 0)
+        match = lamacoopDocgen.NEARDUPLICATES.query(arm)
+        response = lamacoopDocgen.substitutedComment(arm, match)
+        self.assertTrue(response.startswith("/**\n * arm_set_mode - "))
+        self.assertEqual(METRICS.asDict()['shortcuts']['substituted'], before + 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+import threading
+import time
+import unittest
+
+from pipeline import runLanes, runPipeline
+
+class testPipeline(unittest.TestCase):
+
+    def test_all_consumed(self):
+        results = {}
+        count = runPipeline(range(100), lambda n: n * n,
+                            lambda n, square: results.__setitem__(n, square), workers=4)
+        self.assertEqual(count, 100)
+        self.assertEqual(results, {n: n * n for n in range(100)})
+
+    def test_bounded(self):
+        # Items pulled from the source but not yet consumed never exceed the
+        # queues plus one item in hand per worker and the consumer
+        lock = threading.Lock()
+        state = {'pulled': 0, 'consumed': 0, 'most': 0}
+
+        def items():
+            for n in range(200):
+                with lock:
+                    state['pulled'] += 1
+                    state['most'] = max(state['most'], state['pulled'] - state['consumed'])
+                yield n
+
+        def consume(n, result):
+            time.sleep(0.001)
+            with lock:
+                state['consumed'] += 1
+
+        runPipeline(items(), lambda n: n, consume, workers=2, depth=3)
+        self.assertEqual(state['consumed'], 200)
+        self.assertLessEqual(state['most'], 3 + 3 + 2 + 1 + 1)
+
+    def test_error(self):
+        def process(n):
+            if n == 5:
+                raise ValueError("bad function")
+            return n
+        with self.assertRaises(ValueError):
+            runPipeline(range(1000), process, lambda n, result: None, workers=3)
+
+    def test_side_lane(self):
+        # Slow items go to the side lane while the rest keep flowing
+        finished = []
+        lock = threading.Lock()
+
+        def process(n):
+            if n % 10 == 0:
+                time.sleep(0.05)
+            return n
+
+        def consume(n, result):
+            with lock:
+                finished.append(n)
+
+        count = runLanes(range(50), lambda n: n % 10 == 0, process, consume,
+                         workers=2, sideWorkers=1)
+        self.assertEqual(count, 50)
+        self.assertEqual(sorted(finished), list(range(50)))
+        self.assertEqual(finished[-1] % 10, 0)
+
+    def test_side_lane_error(self):
+        def process(n):
+            if n == 20:
+                raise ValueError(n)
+            return n
+
+        with self.assertRaises(ValueError):
+            runLanes(range(50), lambda n: n % 10 == 0, process, lambda n, r: None,
+                     workers=2, sideWorkers=1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+import json
+import os
+import pstats
+import tempfile
+import unittest
+
+import profiling
+from profiling import span, complete, startProfiling, stopProfiling
+
+class testProfiling(unittest.TestCase):
+
+    def test_off_by_default(self):
+        with span('extract', file="a.c"):
+            pass
+        self.assertEqual(profiling._tracer.events(), [])
+
+    def test_trace(self):
+        startProfiling()
+        with span('function', function="f"):
+            with span('llm', model="devstral"):
+                sum(range(1000))
+        complete('queue', 1.0, 1.5)
+        with tempfile.TemporaryDirectory() as directory:
+            paths = stopProfiling(directory)
+            self.assertEqual(sorted(os.path.basename(p) for p in paths),
+                             ["cpu.prof", "cpu.txt", "trace.json"])
+            with open(os.path.join(directory, "trace.json")) as file:
+                events = json.load(file)['traceEvents']
+        byName = {event['name']: event for event in events}
+        self.assertEqual(set(byName), {'function', 'llm', 'queue'})
+        self.assertEqual(byName['llm']['ph'], 'X')
+        self.assertEqual(byName['llm']['args'], {'model': "devstral"})
+        self.assertAlmostEqual(byName['queue']['dur'], 0.5e6)
+        # The inner span lies within the outer one
+        self.assertGreaterEqual(byName['llm']['ts'], byName['function']['ts'])
+        self.assertLessEqual(byName['llm']['ts'] + byName['llm']['dur'],
+                             byName['function']['ts'] + byName['function']['dur'])
+        # Profiling is off again afterwards
+        self.assertIsInstance(profiling._tracer, profiling.NullTracer)
+
+    def test_function_spans(self):
+        # promptFuncs groups every function's stages under one span, and
+        # the CPU profile covers its worker threads
+        import lamacoopDocgen
+        from functionRecord import iterFunctionRecords
+        code = "".join(f"int f{i}(int a)\n{{\n\tint b = a;\n\treturn b + {i};\n}}\n"
+                       for i in range(3))
+        lamacoopDocgen.prompt = "Document this function."
+        lamacoopDocgen.write = lamacoopDocgen.verbose = False
+        saved = lamacoopDocgen.callAI, lamacoopDocgen.REUSECOMMENTS
+        lamacoopDocgen.callAI = lambda *args, **kwargs: None
+        lamacoopDocgen.REUSECOMMENTS = False
+        startProfiling()
+        with tempfile.TemporaryDirectory() as directory:
+            try:
+                lamacoopDocgen.promptFuncs(list(iterFunctionRecords(code, "f.c")))
+                events = profiling._tracer.events()
+            finally:
+                lamacoopDocgen.callAI, lamacoopDocgen.REUSECOMMENTS = saved
+                stopProfiling(directory)
+            profiled = {name for _, _, name in
+                        pstats.Stats(os.path.join(directory, "cpu.prof")).stats}
+        functions = [e['args']['function'] for e in events if e['name'] == 'function']
+        self.assertEqual(sorted(functions), ['f0', 'f1', 'f2'])
+        self.assertTrue({'generate', 'documentRecord'} <= profiled, profiled)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,202 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from ollama import ChatResponse, Message
+
+import lamacoopDocgen
+from functionRecord import iterFunctionRecords
+from lamacoopDocgen import estimatedTokens, scheduleRecords
+from promptGenerator import generate
+from runBudget import (RunBudget, isExported, loadRemaining,
+                       parseDuration, prioritize, writeRemaining)
+from runMetrics import METRICS, RunMetrics
+
+code = ("static int helper(int a)\n{\n\treturn a;\n}\n"
+        "int api_small(int a)\n{\n\treturn a;\n}\n"
+        "int api_large(int a, int b)\n{\n\tint c = a + b;\n\treturn c * 2;\n}\n")
+
+def response(tokens: int) -> ChatResponse:
+    return ChatResponse(message=Message(role='assistant'), done_reason='stop',
+                        prompt_eval_count=tokens // 2, eval_count=tokens // 2)
+
+def runBudgeted(records: list, maxTokens: int, templates: bool = False) -> tuple:
+    """
+    promptFuncs over records with a stub model at 2000 tokens per call,
+    far faster than the pipeline can prefetch. Returns the budget, the
+    functions documented, the records left and the tokens used.
+    """
+    def chat(model, messages, options, **kwargs):
+        time.sleep(0.01)
+        return response(2000)
+
+    # prompt, write and verbose are only set by main
+    lamacoopDocgen.prompt = "Document this function."
+    lamacoopDocgen.write = lamacoopDocgen.verbose = False
+    saved = {name: getattr(lamacoopDocgen, name)
+             for name in ['chat', 'TEMPLATES', 'REUSECOMMENTS', 'REPROMPTS']}
+    overrides = {'chat': chat, 'TEMPLATES': templates, 'REUSECOMMENTS': False, 'REPROMPTS': 0}
+    for name, value in overrides.items():
+        setattr(lamacoopDocgen, name, value)
+    METRICS.reset()
+    try:
+        budget = RunBudget(maxTokens=maxTokens)
+        remaining = []
+        documented = lamacoopDocgen.promptFuncs(records, budget, remaining)
+        used = METRICS.totals()['tokens']
+    finally:
+        for name, value in saved.items():
+            setattr(lamacoopDocgen, name, value)
+        METRICS.reset()
+    return budget, documented, remaining, used
+
+class testRunBudget(unittest.TestCase):
+
+    def setUp(self):
+        self.records = list(iterFunctionRecords(code, "a.c"))
+        self.other = list(iterFunctionRecords("static void hot(void)\n{\n}\n", "hot.c"))
+
+    def test_duration(self):
+        self.assertEqual(parseDuration("90"), 90)
+        self.assertEqual(parseDuration("45m"), 2700)
+        self.assertEqual(parseDuration("1.5h"), 5400)
+        with self.assertRaises(ValueError):
+            parseDuration("soon")
+
+    def test_priority(self):
+        self.assertFalse(isExported(self.records[0]))
+        self.assertTrue(isExported(self.records[1]))
+        names = [r.name for r in prioritize(self.records + self.other)]
+        self.assertEqual(names, ['api_large', 'api_small', 'helper', 'hot'])
+        names = [r.name for r in prioritize(self.records + self.other, {"hot.c"})]
+        self.assertEqual(names[0], 'hot')
+
+    def test_token_budget(self):
+        metrics = RunMetrics()
+        budget = RunBudget(maxTokens=250, metrics=metrics)
+        first = budget.reserve(100)
+        self.assertEqual(first, 100)
+        # The first function is still in flight, its reservation counts
+        second = budget.reserve(100)
+        self.assertEqual(second, 100)
+
+        # A third only fits once one in flight is done, so it waits for that
+        # instead of ending the run
+        third = []
+        waiter = threading.Thread(target=lambda: third.append(budget.reserve(100)))
+        waiter.start()
+        waiter.join(0.2)
+        self.assertTrue(waiter.is_alive())
+        metrics.recordCall('devstral', 1.0, response(20))
+        budget.settle(first)
+        waiter.join(5)
+        self.assertEqual(third, [100])
+        self.assertIsNone(budget.stopReason)
+
+        # What was used leaves no room, that ends it
+        metrics.recordCall('devstral', 1.0, response(200))
+        budget.settle(second)
+        budget.settle(third[0])
+        self.assertIsNone(budget.reserve(100))
+        self.assertIn("token budget", budget.stopReason)
+        self.assertIsNone(budget.reserve(1))
+
+    def test_average_cost(self):
+        metrics = RunMetrics()
+        budget = RunBudget(maxTokens=1000, metrics=metrics)
+        budget.settle(budget.reserve(10))
+        metrics.recordCall('devstral', 1.0, response(400))
+        # A finished function used 400, more than the estimate of 10
+        reservation = budget.reserve(10)
+        self.assertEqual(reservation, 400)
+        metrics.recordCall('devstral', 1.0, response(400))
+        budget.settle(reservation)
+        self.assertIsNone(budget.reserve(10))
+
+    def test_time_budget(self):
+        metrics = RunMetrics()
+        budget = RunBudget(maxSeconds=5, metrics=metrics)
+        self.assertIsNotNone(budget.reserve(0))
+        metrics.recordCall('devstral', 10.0, response(100))
+        self.assertIsNone(budget.reserve(0))
+        self.assertIn("time budget", budget.stopReason)
+
+    def test_remaining_resume(self):
+        metrics = RunMetrics()
+        budget = RunBudget(maxTokens=100, metrics=metrics)
+        remaining = []
+        started = []
+        for record in prioritize(self.records):
+            reservation = budget.reserve(50)
+            if reservation is None:
+                remaining.append(record)
+                continue
+            started.append(record)
+            metrics.recordCall('devstral', 1.0, response(60))
+            budget.settle(reservation)
+        self.assertEqual([r.name for r in started], ['api_large'])
+        self.assertEqual([r.name for r in remaining], ['api_small', 'helper'])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "left", "run.json")
+            writeRemaining(path, remaining, budget.stopReason)
+            resume = loadRemaining(path)
+        self.assertEqual(resume, {r.hash for r in remaining})
+        resumed = scheduleRecords(iter(self.records), resume=resume)
+        self.assertEqual([r.name for r in resumed], ['helper', 'api_small'])
+
+    def test_budget_at_dispatch(self):
+        code = "".join(f"int f{i}(int a)\n{{\n\treturn a + {i};\n}}\n" for i in range(100))
+        records = list(iterFunctionRecords(code, "many.c"))
+        budget, documented, remaining, used = runBudgeted(records, 20000)
+        # Every function reserves the few-shot prefix and more, above the
+        # 2000 it uses, so nothing in flight can overshoot
+        self.assertLessEqual(used, 20000)
+        self.assertGreater(documented, 0)
+        self.assertEqual(used, 2000 * documented)
+        self.assertEqual(documented + len(remaining), len(records))
+        self.assertIn("token budget", budget.stopReason)
+
+    # Template comments cost nothing, so they are never charged or left over
+    def test_templates_free(self):
+        getters = "".join(f"int dev_mode{i}(const struct dev *dev)\n{{\n\treturn dev->m{i};\n}}\n"
+                          for i in range(20))
+        queried = "".join(f"int f{i}(int a)\n{{\n\treturn a + {i};\n}}\n" for i in range(3))
+        records = list(iterFunctionRecords(queried + getters, "mixed.c"))
+        # Room for one query at a time
+        currentPrompt = generate(records[0], "Document this function.")
+        maxTokens = estimatedTokens(records[0], currentPrompt) + 500
+        budget, documented, remaining, used = runBudgeted(records, maxTokens, templates=True)
+        self.assertEqual(used, 2000)
+        self.assertEqual(documented, 21)
+        self.assertEqual(sorted(r.name for r in remaining), ['f1', 'f2'])
+
+if __name__ == '__main__':
+    unittest.main()
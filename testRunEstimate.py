@@ -0,0 +1,84 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+import json
+import os
+import tempfile
+import unittest
+
+from functionRecord import iterFunctionRecords
+from runEstimate import countTokens, estimateRun
+
+code = """
+int add(int a, int b)
+{
+    return a + b;
+}
+
+void hello(void)
+{
+    printf("Hello, world!");
+}
+"""
+
+class testRunEstimate(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.metricsDir = os.path.join(self.directory.name, "metrics")
+        os.makedirs(self.metricsDir)
+        self.funcs = list(iterFunctionRecords(code, "add.c"))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_countTokens(self):
+        self.assertEqual(countTokens("return a + b;"), 6)
+
+    def test_defaults_without_history(self):
+        estimate = estimateRun([("add.c", self.funcs)], "prompt",
+                               metricsDir=self.metricsDir)
+        self.assertFalse(estimate['rates']['runs'])
+        self.assertEqual(estimate['totals']['functions'], 2)
+        self.assertGreater(estimate['totals']['seconds'], 0)
+
+    def test_measured(self):
+        run = {'models': {'devstral': {'calls': 10, 'seconds': 100.0,
+                                       'promptTokens': 10000, 'promptSeconds': 10.0,
+                                       'evalTokens': 2000, 'evalSeconds': 80.0}},
+               'wallSeconds': 25.0}
+        with open(os.path.join(self.metricsDir, "run.json"), 'w') as file:
+            json.dump(run, file)
+
+        estimate = estimateRun([("add.c", self.funcs)], "prompt", model='devstral',
+                               metricsDir=self.metricsDir)
+        self.assertEqual(estimate['rates']['evalRate'], 25.0)
+        self.assertEqual(estimate['rates']['parallelism'], 4.0)
+        # Output is calibrated to the 200 tokens per call measured before,
+        # for both functions
+        self.assertEqual(estimate['totals']['outputTokens'], 400)
+
+if __name__ == '__main__':
+    unittest.main()
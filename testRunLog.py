@@ -0,0 +1,94 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+import io
+import os
+import tempfile
+import unittest
+
+from runLog import LOG, PAYLOADLOG, Progress, configureLogging
+
+class testRunLog(unittest.TestCase):
+
+    def tearDown(self):
+        for handler in PAYLOADLOG.handlers:
+            handler.close()
+        configureLogging('info', stream=io.StringIO())
+
+    def test_levels(self):
+        stream = io.StringIO()
+        configureLogging('quiet', stream=stream)
+        LOG.info("documented")
+        LOG.warning("prompt failed")
+        self.assertEqual(stream.getvalue(), "prompt failed\n")
+
+        stream = io.StringIO()
+        configureLogging('debug', stream=stream)
+        LOG.debug("escalating")
+        self.assertIn("DEBUG escalating", stream.getvalue())
+
+    def test_payloads(self):
+        stream = io.StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "payload.log")
+            configureLogging('info', path, stream=stream)
+            PAYLOADLOG.debug("prompt:\n%s", "int add(int a, int b)")
+            for handler in PAYLOADLOG.handlers:
+                handler.flush()
+            with open(path) as file:
+                self.assertIn("int add(int a, int b)", file.read())
+        self.assertEqual(stream.getvalue(), "")
+
+        configureLogging('debug', stream=stream)
+        PAYLOADLOG.debug("dropped")
+        self.assertEqual(stream.getvalue(), "")
+
+    def test_progress(self):
+        stream = io.StringIO()
+        progress = Progress(stream=stream)
+        progress.discover(10)
+        progress.advance()
+        self.assertEqual(stream.getvalue().count("\n"), 1)
+        self.assertIn("1/10+ functions", stream.getvalue())
+        # Redrawn at most every LOGSECONDS when stderr isn't a terminal
+        progress.advance(4)
+        self.assertEqual(stream.getvalue().count("\n"), 1)
+
+        progress.allDiscovered()
+        progress.samples.clear()
+        progress.samples.extend([(0.0, 0), (10.0, 5)])
+        self.assertEqual(progress.line(), "5/10 functions, 0.50/s, ETA 0:00:10")
+        progress.close()
+        self.assertIn("5 functions in", stream.getvalue())
+
+    def test_progress_disabled(self):
+        stream = io.StringIO()
+        progress = Progress(3, stream=stream, enabled=False)
+        progress.advance()
+        progress.close()
+        self.assertEqual(stream.getvalue(), "")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+import unittest
+
+from ollama import ChatResponse, Message
+
+from runMetrics import RunMetrics
+
+class testRunMetrics(unittest.TestCase):
+
+    def test_tiers(self):
+        metrics = RunMetrics()
+        metrics.recordTier('draft', True, 1.0)
+        metrics.recordTier('draft', False, 1.0)
+        metrics.recordTier('escalated', True, 6.0)
+        data = metrics.asDict()
+        self.assertEqual(data['tiers']['draft']['attempts'], 2)
+        self.assertEqual(data['tiers']['draft']['passed'], 1)
+        # One accepted draft saves a 6s call, minus 2s spent drafting
+        self.assertAlmostEqual(data['timeSaved'], 4.0)
+        self.assertIn("tier draft: 1/2 passed", metrics.summary())
+
+    def test_no_large_calls(self):
+        metrics = RunMetrics()
+        metrics.recordTier('draft', True, 1.0)
+        self.assertIsNone(metrics.timeSaved())
+        metrics.recordCall('devstral', 2.0)
+        self.assertEqual(metrics.asDict()['models']['devstral']['failures'], 1)
+
+    def test_truncated(self):
+        metrics = RunMetrics()
+        metrics.recordCall('devstral', 1.0, ChatResponse(message=Message(role='assistant'),
+                                                         done_reason='length', eval_count=10))
+        metrics.recordCall('devstral', 1.0, ChatResponse(message=Message(role='assistant'),
+                                                         done_reason='stop', eval_count=5))
+        self.assertEqual(metrics.asDict()['models']['devstral']['truncated'], 1)
+        self.assertIn("1 truncated", metrics.summary())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from functionRecord import iterFunctionRecords
+from lamacoopDocgen import scheduleRecords
+from sharding import (MANIFEST, inShard, mergeShards, parseShard, shardOf,
+                      writeManifest)
+
+code = "".join(f"int f{i}(int a)\n{{\n\treturn a + {i};\n}}\n" for i in range(40))
+
+class testSharding(unittest.TestCase):
+
+    def setUp(self):
+        self.records = list(iterFunctionRecords(code, "a.c"))
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_parse(self):
+        self.assertEqual(parseShard("0/4"), (0, 4))
+        self.assertEqual(parseShard("3/4"), (3, 4))
+        for text in ["4/4", "-1/4", "1/0", "1", "a/b"]:
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parseShard(text)
+
+    def test_partition(self):
+        shards = [list(inShard(self.records, (index, 4))) for index in range(4)]
+        hashes = [record.hash for shard in shards for record in shard]
+        self.assertEqual(sorted(hashes), sorted(record.hash for record in self.records))
+        # 40 functions over 4 shards, none left empty
+        self.assertTrue(all(shards))
+        # Stable: the same function lands in the same shard every time
+        for index, shard in enumerate(shards):
+            for record in shard:
+                self.assertEqual(shardOf(record.hash, 4), index)
+        self.assertEqual(list(inShard(self.records, None)), self.records)
+
+    def test_schedule(self):
+        owned: list = []
+        records = list(scheduleRecords(iter(self.records), shard=(1, 3), owned=owned))
+        self.assertEqual(records, list(inShard(self.records, (1, 3))))
+        self.assertEqual(owned, [(r.hash, "a.c", r.name) for r in records])
+
+    def shardOutput(self, index: int, count: int, response=None) -> str:
+        directory = os.path.join(self.directory.name, f"shard{index}")
+        os.makedirs(directory)
+        records = list(inShard(self.records, (index, count)))
+        for number, record in enumerate(records):
+            # The first function of every shard got no response
+            text = "" if number == 0 else response or f"/** {record.name} */\n"
+            with open(os.path.join(directory, record.hash + "-ai.c"), 'w') as file:
+                file.write(text)
+        writeManifest(directory, (index, count),
+                      [(r.hash, r.fileName, r.name) for r in records])
+        return directory
+
+    def test_merge(self):
+        directories = [self.shardOutput(index, 3) for index in range(3)]
+        store = os.path.join(self.directory.name, "Functions")
+        merged = mergeShards(directories, store)
+        self.assertEqual(merged['shards'], 3)
+        self.assertEqual(merged['missing'], [])
+        self.assertEqual(merged['files'], ["a.c"])
+        self.assertEqual(merged['undocumented'], 3)
+        self.assertEqual(merged['documented'], 37)
+        self.assertEqual(len(os.listdir(store)), 37)
+        # Merging again finds the same responses already there, and a
+        # directory given twice counts once
+        again = mergeShards(directories + [directories[0] + "/"], store)
+        self.assertEqual((again['documented'], again['undocumented'], again['conflicts']),
+                         (37, 3, 0))
+
+    def test_merge_nothing(self):
+        store = os.path.join(self.directory.name, "Functions")
+        with self.assertRaises(ValueError):
+            mergeShards([], store)
+        # Told to expect 4 shards, the 3 there leave one missing
+        directories = [self.shardOutput(index, 3) for index in range(3)]
+        with self.assertRaises(ValueError):
+            mergeShards(directories, store, expected=4)
+
+    def test_merge_command(self):
+        # No manifests, as when the CI artifacts never arrived
+        result = subprocess.run([sys.executable, os.path.abspath("sharding.py"),
+                                 os.path.join(self.directory.name, "shard*")],
+                                cwd=self.directory.name, capture_output=True, text=True)
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("No shard manifests", result.stderr)
+
+    def test_dumb_rejected(self):
+        result = subprocess.run([sys.executable, "lamacoopDocgen.py", "a.c", "prompt.txt",
+                                 "-d", "--shard", "0/2"], capture_output=True, text=True)
+        self.assertEqual(result.returncode, 2)
+        self.assertIn("--shard", result.stderr)
+
+    def test_missing_and_conflicts(self):
+        first = self.shardOutput(0, 2)
+        store = os.path.join(self.directory.name, "Functions")
+        merged = mergeShards([first], store)
+        self.assertEqual(merged['missing'], [1])
+        with open(os.path.join(first, MANIFEST), 'r') as file:
+            manifest = file.read()
+        second = os.path.join(self.directory.name, "rerun")
+        os.makedirs(second)
+        for name in os.listdir(first):
+            with open(os.path.join(second, name), 'w') as file:
+                file.write(manifest if name == MANIFEST else "/** different */\n")
+        again = mergeShards([second], store)
+        self.assertEqual(again['conflicts'], merged['documented'])
+        self.assertEqual(again['documented'], 0)
+        writeManifest(second, (0, 3), [])
+        with self.assertRaises(ValueError):
+            mergeShards([first, second], store)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+import unittest
+
+from functionRecord import functionRecord
+from lamacoopDocgen import responsePasses, templateResponse
+from runMetrics import METRICS
+from templateComments import classify, templateComment
+
+getter = "static inline int dev_mode(const struct dev *dev)\n{\n\treturn dev->regs.mode;\n}\n"
+setter = "static void dev_set_mode(struct dev *dev, int mode)\n{\n\tdev->mode = mode;\n}\n"
+wrapper = ("int kfoo_open(struct inode *inode, struct file *file, int flags, int mode, void *data)\n"
+           "{\n\treturn __kfoo_open(inode, file, flags, mode, data);\n}\n")
+stub = "static void arch_noop(struct pt_regs *regs, unsigned long ip)\n{\n\t/* nothing to do */\n}\n"
+
+class testTemplateComments(unittest.TestCase):
+
+    def test_classify(self):
+        self.assertEqual(classify(functionRecord(getter)), ('getter', "dev->regs.mode"))
+        self.assertEqual(classify(functionRecord(setter)), ('setter', ("dev->mode", "mode")))
+        self.assertEqual(classify(functionRecord(wrapper)), ('wrapper', "__kfoo_open"))
+        self.assertEqual(classify(functionRecord(stub)), ('empty', None))
+
+    def test_not_trivial(self):
+        for code in ["int add(int a, int b)\n{\n\treturn a + b;\n}\n",
+                     # Forwards only some of its parameters
+                     "int f(int a, int b)\n{\n\treturn g(a);\n}\n",
+                     # Returns a member of a global, not of a parameter
+                     "int f(void)\n{\n\treturn state.count;\n}\n",
+                     "int f(struct s *p)\n{\n\tp->n++;\n\treturn p->n;\n}\n"]:
+            self.assertIsNone(classify(functionRecord(code)), code)
+
+    def test_comments_pass(self):
+        for code in (getter, setter, wrapper, stub):
+            record = functionRecord(code)
+            comment = templateComment(record)
+            self.assertTrue(responsePasses(comment, record), comment)
+            self.assertTrue(all(len(line) <= 80 for line in comment.split("\n")))
+
+    def test_counted(self):
+        before = METRICS.asDict()['shortcuts'].get('template', 0)
+        self.assertIsNotNone(templateResponse(functionRecord(getter)))
+        self.assertIsNone(templateResponse(functionRecord("int add(int a, int b)\n{\n\treturn a + b;\n}\n")))
+        self.assertEqual(METRICS.asDict()['shortcuts']['template'], before + 1)
+        self.assertIn("template", METRICS.summary())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,242 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from docgenWorkers import jobsFor
+from functionRecord import iterFunctionRecords
+from lamacoopDocgen import responsePasses
+from workQueue import RemoteQueue, WorkQueue, filesystemType, makeQueueServer, openQueue
+
+# Two statements each, so no template comment short-cuts the model
+code = "".join(f"int sum{i}(int a, int b)\n{{\n\tint c = a + {i};\n\treturn c + b;\n}}\n"
+               for i in range(8))
+
+class StandInModel(BaseHTTPRequestHandler):
+    """
+    Answers Ollama's /api/chat with a valid comment for the function at the
+    end of the prompt.
+    """
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        name = re.findall(r'int (sum\d+)\(', request['messages'][-1]['content'])[-1]
+        self.server.names.append(name)
+        comment = (f"/**\n * {name} - add with an offset\n * @a: first\n * @b: second\n"
+                   " *\n * Function Expectations:\n * - adds a constant to @a\n"
+                   " * - adds @b\n * - no overflow check\n * - returns the sum\n */")
+        payload = json.dumps({'model': request['model'], 'created_at': "2025-01-01T00:00:00Z",
+                              'message': {'role': 'assistant', 'content': comment},
+                              'done': True, 'done_reason': 'stop',
+                              'prompt_eval_count': 100, 'eval_count': 40}).encode('utf8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+class testWorkQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "jobs.db")
+        self.records = list(iterFunctionRecords(code, "sum.c"))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_claim_complete(self):
+        queue = WorkQueue(self.path)
+        self.assertEqual(queue.enqueue(jobsFor(self.records, "prompt")), 8)
+        self.assertEqual(queue.enqueue(jobsFor(self.records, "prompt")), 0)
+        first = queue.claim("w1")
+        second = queue.claim("w2")
+        self.assertEqual((first['name'], second['name']), ('sum0', 'sum1'))
+        self.assertIn("sum0 - ", first['prompt'])
+        self.assertTrue(queue.complete(first['hash'], "w1", "/** */", True))
+        self.assertFalse(queue.complete(first['hash'], "w2", "/** */", True))
+        queue.release(second['hash'], "w2")
+        self.assertEqual(queue.counts(), {'queued': 7, 'leased': 0, 'done': 1, 'failed': 0})
+        self.assertEqual(queue.results()[0]['name'], 'sum0')
+        queue.close()
+
+    def test_lease_expiry(self):
+        queue = WorkQueue(self.path, leaseSeconds=0.05, maxAttempts=2)
+        queue.enqueue(jobsFor(self.records[:1], "prompt"))
+        job = queue.claim("w1")
+        self.assertIsNone(queue.claim("w2"))
+        time.sleep(0.1)
+        # Claimed but never started, the expired lease costs no attempt
+        again = queue.claim("w2")
+        self.assertEqual(again['hash'], job['hash'])
+        self.assertEqual(again['attempts'], 0)
+        self.assertFalse(queue.attempt(job['hash'], "w1"))
+        self.assertTrue(queue.attempt(again['hash'], "w2"))
+        time.sleep(0.1)
+        # The dead worker's lease ran out, so the job is handed out again
+        third = queue.claim("w3")
+        self.assertEqual(third['attempts'], 1)
+        self.assertTrue(queue.attempt(third['hash'], "w3"))
+        time.sleep(0.1)
+        self.assertEqual(queue.counts()['failed'], 1)
+        queue.close()
+
+    def test_remote_queue(self):
+        queue = WorkQueue(self.path)
+        server = makeQueueServer(queue, "secret", '127.0.0.1', 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        # Without the token nothing is served
+        with self.assertRaises(OSError):
+            openQueue(url).counts()
+        with self.assertRaises(OSError):
+            openQueue(url, token="guess").claim("w1")
+        remote = openQueue(url, token="secret")
+        self.assertIsInstance(remote, RemoteQueue)
+        self.assertEqual(remote.enqueue(jobsFor(self.records[:2], "prompt")), 2)
+        job = remote.claim("w1")
+        self.assertEqual(job['name'], 'sum0')
+        self.assertTrue(remote.renew(job['hash'], "w1"))
+        self.assertTrue(remote.complete(job['hash'], "w1", "/** */", True))
+        self.assertEqual(remote.pending(), 1)
+        self.assertEqual(remote.results()[0]['response'], "/** */")
+        with self.assertRaises(OSError):
+            remote.call('drop')
+        job = remote.claim("w1")
+        remote.fail(job['hash'], "w1")
+        self.assertEqual(remote.counts()['failed'], 1)
+        server.shutdown()
+        server.server_close()
+        queue.close()
+
+    def test_filesystem_type(self):
+        # Whatever the test directory is on, it is known and not refused
+        self.assertIsNotNone(filesystemType(self.directory.name))
+
+    # Worker processes, two through the queue server and one opening the
+    # database directly, against a stand-in model server
+    def test_worker_processes(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StandInModel)
+        server.names = []
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        queue = WorkQueue(self.path)
+        queue.enqueue(jobsFor(self.records, "Write a comment for this function"))
+        queueServer = makeQueueServer(queue, "secret", '127.0.0.1', 0)
+        threading.Thread(target=queueServer.serve_forever, daemon=True).start()
+
+        host = f"http://127.0.0.1:{server.server_address[1]}"
+        locations = [f"http://127.0.0.1:{queueServer.server_address[1]}"] * 2 + [self.path]
+        workers = [subprocess.Popen([sys.executable, "docgenWorkers.py", "work",
+                                     "--queue", location, "--host", host,
+                                     "--worker", f"w{i}", "--maxparallel", "2",
+                                     "--token", "secret"],
+                                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+                   for i, location in enumerate(locations)]
+        for worker in workers:
+            output, _ = worker.communicate(timeout=120)
+            self.assertEqual(worker.returncode, 0, output.decode())
+        server.shutdown()
+        server.server_close()
+        queueServer.shutdown()
+        queueServer.server_close()
+
+        self.assertEqual(queue.counts(), {'queued': 0, 'leased': 0, 'done': 8, 'failed': 0})
+        records = {record.hash: record for record in self.records}
+        for result in queue.results():
+            self.assertTrue(result['passed'])
+            self.assertTrue(responsePasses(result['response'], records[result['hash']]))
+        self.assertEqual(sorted(server.names), sorted(r.name for r in self.records))
+        self.assertEqual(queue.connection.execute("SELECT MAX(attempts) FROM jobs").fetchone()[0], 1)
+        queue.close()
+
+    def test_claims_follow_limit(self):
+        # A slow model and a limit of 2, the worker never holds more than 2
+        # leases and leaves the rest of the queue to other machines
+        import docgenWorkers
+        queue = WorkQueue(self.path)
+        queue.enqueue(jobsFor(self.records, "prompt"))
+        held = []
+
+        def slowDocument(record, prompt, verbose):
+            held.append(queue.counts()['leased'])
+            time.sleep(0.02)
+            return "/** */"
+
+        saved = docgenWorkers.documentRecord, docgenWorkers.LIMITER.limit
+        docgenWorkers.documentRecord = slowDocument
+        docgenWorkers.LIMITER.limit = 2.0
+        try:
+            posted = docgenWorkers.runWorker(queue, "w1", workers=8, pollSeconds=0.01)
+        finally:
+            docgenWorkers.documentRecord, docgenWorkers.LIMITER.limit = saved
+        self.assertEqual(posted, 8)
+        self.assertLessEqual(max(held), 2)
+        queue.close()
+
+    # A job that takes several leases to document keeps its lease, and code
+    # that doesn't parse fails at once instead of going round forever
+    def test_lease_renewed(self):
+        import docgenWorkers
+        queue = WorkQueue(self.path, leaseSeconds=0.1)
+        queue.enqueue(jobsFor(self.records[:1], "prompt"))
+        stolen = []
+
+        def slowDocument(record, prompt, verbose):
+            for _ in range(5):
+                time.sleep(0.1)
+                stolen.append(queue.claim("w2"))
+            return "/** */"
+
+        saved = docgenWorkers.documentRecord
+        docgenWorkers.documentRecord = slowDocument
+        try:
+            posted = docgenWorkers.runWorker(queue, "w1", workers=1, pollSeconds=0.01,
+                                             renewSeconds=0.02)
+            self.assertEqual(posted, 1)
+            self.assertEqual([job for job in stolen if job is not None], [])
+
+            queue.enqueue([{'hash': "broken", 'file': "sum.c", 'name': "broken",
+                            'code': "", 'prompt': "prompt"}])
+            posted = docgenWorkers.runWorker(queue, "w1", workers=1, pollSeconds=0.01)
+        finally:
+            docgenWorkers.documentRecord = saved
+        self.assertEqual(posted, 0)
+        self.assertEqual(queue.counts(), {'queued': 0, 'leased': 0, 'done': 1, 'failed': 1})
+        queue.close()
+
+if __name__ == '__main__':
+    unittest.main()
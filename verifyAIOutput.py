@@ -28,6 +28,9 @@ import sys
 import subprocess
 import re
 
+# Local Libraries
+from functionRecord import FunctionRecord
+
 def getFunctionName(functionDeclaration:str) -> str:
     '''
     This function strips specifically the name from the function dclaration
@@ -39,8 +42,13 @@ def getFunctionName(functionDeclaration:str) -> str:
 
     Function Name:
         alloc_tramp
+
+    A FunctionRecord already knows its name and is returned as is.
     '''
     
+    if isinstance(functionDeclaration, FunctionRecord):
+        return functionDeclaration.name
+
     specialCharacters: str = "*&@"
     codeArguments: list = re.split(r'[\(\)]+', functionDeclaration)
     functionName: str = codeArguments[0].split(" ")[-1]
@@ -55,7 +63,8 @@ This uses the regex split which uses a regex statement, r'[\(\)]+' to
 split on either ( or ), declared as \( and \) respectively
 '''
 
-def checkFunctionHeader(functionHeader : str, generatedName : str) -> bool:
+def checkFunctionHeader(functionHeader : str, generatedName : str,
+                        quiet : bool = False) -> bool:
     functionName = getFunctionName(functionHeader)
 
 
@@ -64,36 +73,33 @@ def checkFunctionHeader(functionHeader : str, generatedName : str) -> bool:
         '''
         print("Function documentation needs added to the first line")
         '''
-        print("Function Declaration: ", functionName,"Comment: ",
-                generatedName)
+        if not quiet:
+            print("Function Declaration: ", functionName,"Comment: ",
+                    generatedName)
         return False
         
     return True
 
-# Check for argument comments
-def ArgumentComments(functionArguments: list, commentLines: list) -> bool:
-    i = 2
+# Check for argument comments. functionArguments holds parameter names, as in
+# FunctionRecord.parameterNames, or raw declarations such as "char *buf".
+# Every named parameter needs an @name somewhere in the comment. quiet skips
+# the report of what is missing.
+def ArgumentComments(functionArguments: list, commentLines: list,
+                     quiet: bool = False) -> bool:
     specialCharacters: str = "*&@"
-    argument: str = ""
+    comment: str = "*".join(commentLines)
     hasArgumentComments = True
 
-    for argument in functionArguments:
+    for number, argument in enumerate(functionArguments, start=1):
         argument: list = argument.split(" ")
-        argument: str = argument[len(argument)-1] 
-        # print("Argument: ", argument, i, "CommentLine: ", commentLines[i])
-
-        '''
-        Acts to check if there are any matching characters between 
-        specialCharacters and the argument string, trying to remove markers
-        from function arguments
-        '''
-        if any(c in specialCharacters for c in argument):
-            argument = argument[1:]
-            if("@" + argument not in commentLines[i]):
-                print("Missing argument documentation: ", i - 1)  
-                print("Argument: ", argument, "CommentLine: ", commentLines[i])
-                hasArgumentComments = False
-        i = i + 1
+        argument: str = argument[len(argument)-1].lstrip(specialCharacters)
+        if not argument or argument in ("void", "..."):
+            continue
+        if("@" + argument not in comment):
+            if not quiet:
+                print("Missing argument documentation: ", number)  
+                print("Argument: ", argument)
+            hasArgumentComments = False
     return hasArgumentComments
 
 # Check if there is a reasonable amount of lines of text expressing the 
@@ -116,6 +122,6 @@ def checkCommentFormatting(commentHead : str, commentTail : str) -> bool:
         @param commentTail: Expects string of two characters, bottom slice of comment block
         @return: bool 
 
-        # TODO Add some functionality to fix this mistake if this fails
+        commentRepair.repairComment rebuilds the block when this fails.
     """
     return (commentHead == "/*" and commentTail == "*/")
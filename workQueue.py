@@ -0,0 +1,413 @@
+# lamacoop-docgen - Python scripts for automating code and docs with LLMs
+# Copyright (C) 2025 VES LLC
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+# For inquiries, please contact by email:
+#   info@ves.solutions
+#
+# Or if you prefer, by paper mail:
+#   VES LLC
+#   6180 Guardian Gtwy, Ste 102
+#   Aberdeen Proving Ground, MD 21005
+
+"""
+Shared work queue for documenting a tree with several machines. A
+coordinator enqueues one job per function (hash, file, code and the full
+prompt) into a SQLite database. Workers claim jobs under a lease, query
+their local Ollama and post the response back. A lease that runs out,
+because its worker died or hung, puts the job back in the queue for someone
+else. Only a lease on which the model was actually queried counts as an
+attempt (see attempt), and a job with MAXATTEMPTS attempts and no result is
+marked failed.
+
+Every claim is one IMMEDIATE transaction, so two workers never get the same
+job while its lease lasts. SQLite locking (and WAL's shared memory) only
+works on a local filesystem, so the database must live on the machine that
+opens it. Processes on that machine open it directly, workers on other
+machines go through QueueServer over HTTP with a RemoteQueue, see
+openQueue. The server listens on localhost unless told otherwise and only
+takes requests carrying its shared token, see jsonHandler.py.
+"""
+
+# Standard Libraries
+import http.client
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import urllib.parse
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local Libraries
+from jsonHandler import readJSON, requestHeaders, sendJSON
+
+LEASESECONDS = 600          # How long a worker owns a claimed job
+MAXATTEMPTS = 3             # Attempts before a job is given up as failed
+BUSYSECONDS = 30            # SQLite wait for another process's lock
+QUEUEPORT = 8766            # Default port of QueueServer
+CLIENTTIMEOUT = 60          # Seconds a RemoteQueue waits for the server
+
+# Filesystem types SQLite can't lock reliably
+NETWORKFILESYSTEMS: set = {'nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'sshfs', 'fuse.sshfs',
+                           'afs', 'ceph', 'glusterfs', 'fuse.glusterfs', '9p', 'lustre'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    hash TEXT PRIMARY KEY,
+    file TEXT NOT NULL,
+    name TEXT NOT NULL,
+    code TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'queued',
+    worker TEXT,
+    leaseExpires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    response TEXT,
+    passed INTEGER,
+    seq INTEGER
+)
+"""
+STATES: tuple = ('queued', 'leased', 'done', 'failed')
+
+
+def filesystemType(path: str) -> str:
+    """
+    Type of the filesystem holding path, from /proc/mounts. None where that
+    isn't available.
+    """
+    try:
+        with open("/proc/mounts", 'r') as file:
+            mounts: list = [line.split() for line in file]
+    except OSError:
+        return None
+    path = os.path.realpath(path)
+    best, fsType = "", None
+    for fields in mounts:
+        if len(fields) < 3:
+            continue
+        mountPoint = fields[1].replace("\\040", " ")
+        inside = path == mountPoint or path.startswith(mountPoint.rstrip("/") + "/")
+        if inside and len(mountPoint) > len(best):
+            best, fsType = mountPoint, fields[2]
+    return fsType
+
+
+def workerName() -> str:
+    """
+    Default worker id, unique per process across machines.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkQueue:
+    """
+    One connection to the queue database, shared by the threads of a
+    process one transaction at a time.
+    """
+
+    def __init__(self, path: str, leaseSeconds: float = LEASESECONDS,
+                 maxAttempts: int = MAXATTEMPTS):
+        self.path = path
+        self.leaseSeconds = leaseSeconds
+        self.maxAttempts = maxAttempts
+        fsType = filesystemType(os.path.dirname(os.path.abspath(path)))
+        if fsType in NETWORKFILESYSTEMS:
+            raise ValueError(f"{path} is on {fsType}, SQLite can't lock it safely, "
+                             "keep the queue on a local disk and serve it to other machines")
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=BUSYSECONDS,
+                                          isolation_level=None, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(SCHEMA)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    @contextmanager
+    def transaction(self):
+        """
+        A write transaction, taken before reading so the reads and the
+        writes see the same queue.
+        """
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.connection
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+            self.connection.execute("COMMIT")
+
+    def enqueue(self, jobs) -> int:
+        """
+        Add jobs, dicts with hash, file, name, code and prompt. A hash already
+        in the queue is left as it is. Returns how many were added.
+        """
+        added = 0
+        with self.transaction() as connection:
+            seq = connection.execute("SELECT COALESCE(MAX(seq), 0) FROM jobs").fetchone()[0]
+            for job in jobs:
+                seq += 1
+                cursor = connection.execute(
+                    "INSERT OR IGNORE INTO jobs (hash, file, name, code, prompt, seq) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (job['hash'], job['file'], job['name'], job['code'], job['prompt'], seq))
+                added += cursor.rowcount
+        return added
+
+    def expireLeases(self, connection, now: float) -> None:
+        """
+        Requeue jobs whose lease ran out, or fail them after maxAttempts
+        attempts.
+        """
+        connection.execute(
+            "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+            "worker = NULL, leaseExpires = NULL "
+            "WHERE state = 'leased' AND leaseExpires < ?", (self.maxAttempts, now))
+
+    def claim(self, worker: str) -> dict:
+        """
+        Lease the oldest queued job to worker. None when nothing is queued.
+        The claim itself isn't an attempt, a lease that runs out before the
+        worker gets to the job requeues it at no cost.
+        """
+        now = time.time()
+        with self.transaction() as connection:
+            self.expireLeases(connection, now)
+            row = connection.execute(
+                "SELECT hash, file, name, code, prompt, attempts FROM jobs "
+                "WHERE state = 'queued' ORDER BY seq LIMIT 1").fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE jobs SET state = 'leased', worker = ?, leaseExpires = ? WHERE hash = ?",
+                (worker, now + self.leaseSeconds, row['hash']))
+        return dict(row)
+
+    def attempt(self, funcHash: str, worker: str) -> bool:
+        """
+        Record that worker is about to query the model for a job, counting
+        an attempt and renewing the lease. False when the lease was lost.
+        """
+        with self.transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET leaseExpires = ?, attempts = attempts + 1 "
+                "WHERE hash = ? AND worker = ? AND state = 'leased'",
+                (time.time() + self.leaseSeconds, funcHash, worker))
+            return cursor.rowcount == 1
+
+    def renew(self, funcHash: str, worker: str) -> bool:
+        """
+        Extend worker's lease on a job. False when the lease was lost.
+        """
+        with self.transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET leaseExpires = ? "
+                "WHERE hash = ? AND worker = ? AND state = 'leased'",
+                (time.time() + self.leaseSeconds, funcHash, worker))
+            return cursor.rowcount == 1
+
+    def complete(self, funcHash: str, worker: str, response: str, passed: bool) -> bool:
+        """
+        Post a job's result. A late result from a worker whose lease expired
+        is still taken if nobody else finished the job first. False when the
+        job was already done.
+        """
+        with self.transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET state = 'done', worker = ?, leaseExpires = NULL, "
+                "response = ?, passed = ? WHERE hash = ? AND state != 'done'",
+                (worker, response, int(passed), funcHash))
+            return cursor.rowcount == 1
+
+    def fail(self, funcHash: str, worker: str) -> None:
+        """
+        Give up on a job no attempt can help, such as code that doesn't parse.
+        """
+        with self.transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET state = 'failed', worker = NULL, leaseExpires = NULL "
+                "WHERE hash = ? AND worker = ? AND state = 'leased'", (funcHash, worker))
+
+    def release(self, funcHash: str, worker: str) -> None:
+        """
+        Give a job back after a failed query, failed once it is out of attempts.
+        """
+        with self.transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+                "worker = NULL, leaseExpires = NULL "
+                "WHERE hash = ? AND worker = ? AND state = 'leased'",
+                (self.maxAttempts, funcHash, worker))
+
+    def counts(self) -> dict:
+        """
+        Number of jobs in each state, after expiring old leases.
+        """
+        with self.transaction() as connection:
+            self.expireLeases(connection, time.time())
+            rows = connection.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        counts: dict = dict.fromkeys(STATES, 0)
+        counts.update({state: number for state, number in rows})
+        return counts
+
+    def pending(self) -> int:
+        """
+        Jobs still queued or leased.
+        """
+        counts = self.counts()
+        return counts['queued'] + counts['leased']
+
+    def results(self) -> list:
+        """
+        Finished jobs in enqueue order, as dicts with hash, file, name, code,
+        response and passed.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT hash, file, name, code, response, passed FROM jobs "
+                "WHERE state = 'done' ORDER BY seq").fetchall()
+        return [dict(row) for row in rows]
+
+
+# The WorkQueue methods a RemoteQueue may call, and their arguments
+REMOTECALLS: dict = {
+    'enqueue': ('jobs',),
+    'claim': ('worker',),
+    'attempt': ('hash', 'worker'),
+    'renew': ('hash', 'worker'),
+    'complete': ('hash', 'worker', 'response', 'passed'),
+    'release': ('hash', 'worker'),
+    'fail': ('hash', 'worker'),
+    'counts': (),
+    'results': (),
+}
+
+
+class QueueHandler(BaseHTTPRequestHandler):
+    """
+    POST /<call> with the arguments as a JSON object, the reply is
+    {"result": ...}.
+    """
+
+    def do_POST(self):
+        call = self.path.strip('/')
+        if call not in REMOTECALLS:
+            sendJSON(self, 404, {'error': "unknown call " + self.path})
+            return
+        try:
+            request: dict = readJSON(self, self.server.token)
+            if request is None:
+                return
+            arguments: list = [request[name] for name in REMOTECALLS[call]]
+            sendJSON(self, 200, {'result': getattr(self.server.queue, call)(*arguments)})
+        except (ValueError, KeyError, sqlite3.Error) as e:
+            sendJSON(self, 400, {'error': repr(e)})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def makeQueueServer(queue: 'WorkQueue', token: str, host: str = '127.0.0.1',
+                    port: int = QUEUEPORT) -> ThreadingHTTPServer:
+    """
+    Serve queue to workers on other machines. Every request must carry
+    token, anyone who can post results could otherwise put any text in the
+    patches. The handler threads share the queue's one connection, which
+    serializes them per transaction.
+    """
+    if not token:
+        raise ValueError("the queue server needs a shared token")
+    server = ThreadingHTTPServer((host, port), QueueHandler)
+    server.daemon_threads = True
+    server.queue = queue
+    server.token = token
+    return server
+
+
+class RemoteQueue:
+    """
+    The WorkQueue interface over HTTP, for a queue served by makeQueueServer.
+    """
+
+    def __init__(self, url: str, token: str = None, timeout: float = CLIENTTIMEOUT):
+        parsed = urllib.parse.urlsplit(url)
+        self.host: str = parsed.hostname
+        self.port: int = parsed.port or QUEUEPORT
+        self.token: str = token
+        self.timeout = timeout
+
+    def call(self, name: str, **arguments):
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            connection.request('POST', '/' + name, body=json.dumps(arguments),
+                               headers=requestHeaders(self.token))
+            response = connection.getresponse()
+            body: dict = json.loads(response.read())
+        finally:
+            connection.close()
+        if response.status != 200:
+            raise OSError(f"queue server refused {name}: {body.get('error')}")
+        return body['result']
+
+    def close(self) -> None:
+        pass
+
+    def enqueue(self, jobs) -> int:
+        return self.call('enqueue', jobs=list(jobs))
+
+    def claim(self, worker: str) -> dict:
+        return self.call('claim', worker=worker)
+
+    def attempt(self, funcHash: str, worker: str) -> bool:
+        return self.call('attempt', hash=funcHash, worker=worker)
+
+    def renew(self, funcHash: str, worker: str) -> bool:
+        return self.call('renew', hash=funcHash, worker=worker)
+
+    def complete(self, funcHash: str, worker: str, response: str, passed: bool) -> bool:
+        return self.call('complete', hash=funcHash, worker=worker, response=response,
+                         passed=passed)
+
+    def release(self, funcHash: str, worker: str) -> None:
+        self.call('release', hash=funcHash, worker=worker)
+
+    def fail(self, funcHash: str, worker: str) -> None:
+        self.call('fail', hash=funcHash, worker=worker)
+
+    def counts(self) -> dict:
+        return self.call('counts')
+
+    def pending(self) -> int:
+        counts = self.counts()
+        return counts['queued'] + counts['leased']
+
+    def results(self) -> list:
+        return self.call('results')
+
+
+def openQueue(location: str, leaseSeconds: float = LEASESECONDS, token: str = None):
+    """
+    A RemoteQueue for an http:// URL, sending token, otherwise the local
+    database at that path.
+    """
+    if location.startswith("http://"):
+        return RemoteQueue(location, token)
+    return WorkQueue(location, leaseSeconds=leaseSeconds)